@@ -0,0 +1,52 @@
+"""Per-message cost of automod's normalize and match step as term lists grow.
+
+Run from the src folder with `python -m benchmarks.bench_automod`.
+"""
+
+import random
+import string
+import timeit
+
+from discordbot.core.match_tools import normalize_text
+from discordbot.plugins.automod import compile_terms
+
+MESSAGES = [
+    "hey does anyone know when the event starts tonight?",
+    "lol that was the best match I have seen all week",
+    "Can a moderator check the #general channel please, something weird is going on",
+    "gg",
+    # Non-ASCII messages take the slow normalization path
+    "ｆｕｌｌｗｉｄｔｈ text with a zero​width space and café",
+    "Привет всем, как дела? 😀",
+]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def main():
+    rng = random.Random(1)
+    runs = 2000
+
+    print(f"{'terms':>10} {'build (ms)':>12} {'per message (us)':>18}")
+
+    for count in (10, 100, 1000, 10000, 100000):
+        terms = [
+            ("*" if rng.random() < 0.2 else "") + random_word(rng) for _ in range(count)
+        ]
+
+        start = timeit.default_timer()
+        matcher = compile_terms(terms)
+        built = (timeit.default_timer() - start) * 1000
+
+        elapsed = timeit.timeit(
+            lambda: [matcher.match(normalize_text(m)) for m in MESSAGES], number=runs
+        )
+        per_message = elapsed / (runs * len(MESSAGES)) * 1_000_000
+
+        print(f"{count:>10} {built:>12.1f} {per_message:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Latency of creating a group, one step after another versus provision_group.
+
+Requests go through discord.py's own HTTP client to a local stand-in for the Discord
+API that answers every request after a fixed delay, so the numbers include the
+library's per-route locking. Run from the src folder with
+`python -m benchmarks.bench_groups`.
+"""
+
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+from aiohttp import web
+from discord import Forbidden
+from discord.http import HTTPClient, Route
+
+from discordbot.core.group_tools import provision_group
+
+GUILD_ID = 1
+LEADER_ID = 2
+
+
+def reply(data: dict, status: int = 200) -> web.Response:
+    # discord.py only decodes JSON when the content type has no charset
+    return web.Response(
+        body=json.dumps(data).encode(),
+        status=status,
+        headers={"Content-Type": "application/json"},
+    )
+
+
+class StandIn:
+    """Stand-in Discord API answering after <latency> seconds."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.ids = itertools.count(1000)
+        self.fail_voice = False
+        self.requests = 0
+        self.deletes = 0
+
+    async def answer(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+        if request.method == "DELETE":
+            self.deletes += 1
+            return web.Response(status=204)
+
+        if request.method == "PUT":
+            return web.Response(status=204)
+
+        body = await request.json() if request.can_read_body else {}
+
+        # Voice channels are type 2
+        if self.fail_voice and body.get("type") == 2:
+            return reply({"message": "Missing Permissions", "code": 50013}, status=403)
+
+        return reply({"id": str(next(self.ids)), **body})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self.answer)
+        return app
+
+
+class Created:
+    def __init__(self, http: HTTPClient, data: dict, role: bool = False):
+        self.http = http
+        self.id = int(data["id"])
+        self.role = role
+
+    async def delete(self, reason=None):
+        if self.role:
+            await self.http.delete_role(GUILD_ID, self.id, reason=reason)
+        else:
+            await self.http.delete_channel(self.id, reason=reason)
+
+
+class Guild:
+    """Just enough of discord.Guild for provisioning, calling the HTTP client directly."""
+
+    def __init__(self, http: HTTPClient):
+        self.http = http
+        self.default_role = Created(http, {"id": GUILD_ID}, role=True)
+
+    async def create_role(self, name, reason=None):
+        return Created(self.http, await self.http.create_role(GUILD_ID, name=name), True)
+
+    async def create_category(self, name, reason=None, overwrites=None):
+        perms = [
+            {"id": target.id, "type": 0, "allow": allow.value, "deny": deny.value}
+            for target, overwrite in (overwrites or {}).items()
+            for allow, deny in [overwrite.pair()]
+        ]
+        data = await self.http.create_channel(
+            GUILD_ID, 4, name=name, permission_overwrites=perms
+        )
+        return Created(self.http, data)
+
+    async def create_text_channel(self, name, reason=None, category=None, topic=None):
+        data = await self.http.create_channel(
+            GUILD_ID, 0, name=name, parent_id=category.id, topic=topic
+        )
+        return Created(self.http, data)
+
+    async def create_voice_channel(self, name, reason=None, category=None):
+        data = await self.http.create_channel(
+            GUILD_ID, 2, name=name, parent_id=category.id
+        )
+        return Created(self.http, data)
+
+
+class Leader:
+    def __init__(self, http: HTTPClient):
+        self.http = http
+
+    async def add_roles(self, role, reason=None):
+        await self.http.add_role(GUILD_ID, LEADER_ID, role.id, reason=reason)
+
+
+async def sequential(guild: Guild, leader: Leader, name: str, description: str):
+    """The old create command, one awaited step at a time."""
+    role = await guild.create_role(name=name)
+    category = await guild.create_category(name=name, overwrites={})
+    text = await guild.create_text_channel(
+        name=name.lower(), category=category, topic=description
+    )
+    voice = await guild.create_voice_channel(name=name, category=category)
+    await leader.add_roles(role)
+
+    return role, category, text, voice
+
+
+async def timed(create, guild: Guild, leader: Leader, runs: int) -> float:
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+
+        try:
+            await create(guild, leader, "Bench", "Benchmark group")
+        except Forbidden:
+            pass
+
+        times.append(time.perf_counter() - start)
+
+    return statistics.mean(times) * 1000
+
+
+async def main():
+    runs = 10
+    print(
+        f"{'latency (ms)':>12} {'sequential (ms)':>16} {'provision (ms)':>15} "
+        f"{'rollback (ms)':>14}"
+    )
+
+    for latency in (0.005, 0.02, 0.05):
+        server = StandIn(latency)
+        runner = web.AppRunner(server.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        Route.BASE = f"http://127.0.0.1:{port}/api/v7"
+
+        http = HTTPClient()
+        await http.static_login("token", bot=True)
+        guild, leader = Guild(http), Leader(http)
+
+        old = await timed(sequential, guild, leader, runs)
+        new = await timed(provision_group, guild, leader, runs)
+
+        server.fail_voice = True
+        server.deletes = 0
+        rollback = await timed(provision_group, guild, leader, runs)
+        assert server.deletes == 3 * runs, "rollback left resources behind"
+
+        print(f"{latency * 1000:>12.0f} {old:>16.1f} {new:>15.1f} {rollback:>14.1f}")
+
+        await http.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
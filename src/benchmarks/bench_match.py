@@ -0,0 +1,60 @@
+"""Per-message cost of TriggerMatcher as the number of triggers grows.
+
+Run from the src folder with `python -m benchmarks.bench_match`.
+"""
+
+import random
+import string
+import timeit
+
+from discordbot.core.match_tools import TriggerMatcher
+
+MESSAGES = [
+    "hey does anyone know when the event starts tonight?",
+    "lol that was the best match I have seen all week",
+    "Can a moderator check the #general channel please, something weird is going on",
+    "gg",
+    "I think the new update broke my keybinds, anyone else having that problem?",
+]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+
+
+def build(count: int, rng: random.Random) -> TriggerMatcher:
+    triggers = {}
+
+    while len(triggers) < count:
+        triggers[random_word(rng)] = rng.choice(("contains", "word"))
+
+    # A handful of regex triggers, as a real server would have
+    triggers[r"\bhttps?://\S+\.exe\b"] = "regex"
+    triggers[r"(?i)free\s+nitro"] = "regex"
+
+    matcher = TriggerMatcher(triggers)
+    # Measure the single combined regex, not the one-by-one fallback
+    assert matcher.combined is not None
+
+    return matcher
+
+
+def main():
+    rng = random.Random(1)
+    runs = 2000
+
+    print(f"{'triggers':>10} {'build (ms)':>12} {'per message (us)':>18}")
+
+    for count in (5, 50, 500, 5000, 50000):
+        start = timeit.default_timer()
+        matcher = build(count, rng)
+        built = (timeit.default_timer() - start) * 1000
+
+        elapsed = timeit.timeit(lambda: [matcher.match(m) for m in MESSAGES], number=runs)
+        per_message = elapsed / (runs * len(MESSAGES)) * 1_000_000
+
+        print(f"{count:>10} {built:>12.1f} {per_message:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from discord import Guild, AuditLogAction, AuditLogEntry
+
+
+class AuditLogCache:
+    """Short lived per-guild cache of message delete audit log entries.
+
+    Concurrent lookups for one guild share a single request, and results are reused for
+    <ttl> seconds. Discord folds repeated deletes by one moderator into a single entry
+    with a count, so deletes are matched on channel and author and the number of deletes
+    already attributed to each entry is tracked. Since that count goes up in place, a
+    delete matching nothing in the cached entries fetches them again.
+    """
+
+    def __init__(self, ttl: float = 3.0, limit: int = 25, recent: float = 30.0):
+        self.ttl = ttl
+        self.limit = limit
+        # Entries this young are new even on the first fetch for a guild
+        self.recent = recent
+
+        self.entries: Dict[int, Tuple[float, List[AuditLogEntry]]] = {}
+        self.inflight: Dict[int, asyncio.Task] = {}
+        # Guild id -> {entry id: deletes already attributed to it}
+        self.used: Dict[int, Dict[int, int]] = {}
+
+        self.stats = {"requests": 0, "hits": 0, "shared": 0}
+
+    async def fetch(self, guild: Guild) -> List[AuditLogEntry]:
+        try:
+            self.stats["requests"] += 1
+
+            entries = await guild.audit_logs(
+                limit=self.limit, action=AuditLogAction.message_delete
+            ).flatten()
+
+            self.remember(guild.id, entries)
+            self.entries[guild.id] = (time.monotonic(), entries)
+
+            return entries
+        finally:
+            self.inflight.pop(guild.id, None)
+
+    def remember(self, gid: int, entries: List[AuditLogEntry], now: datetime = None):
+        """Track attributions for <entries>, dropping entries that fell out of the log."""
+        if now is None:
+            now = datetime.utcnow()
+
+        first = gid not in self.used
+        old = self.used.get(gid, {})
+        used = {}
+
+        for entry in entries:
+            if entry.id in old:
+                used[entry.id] = old[entry.id]
+            elif first and (now - entry.created_at).total_seconds() > self.recent:
+                # Deletes from before we started watching are already accounted for
+                used[entry.id] = entry.extra.count
+            else:
+                used[entry.id] = 0
+
+        self.used[gid] = used
+
+    def cached(self, guild: Guild) -> Optional[List[AuditLogEntry]]:
+        """Get the entries fetched for <guild> in the last <ttl> seconds, if any."""
+        cached = self.entries.get(guild.id)
+
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            self.stats["hits"] += 1
+            return cached[1]
+
+        return None
+
+    async def get(self, guild: Guild, fresh: bool = False) -> List[AuditLogEntry]:
+        """Get recent delete entries for <guild>, sharing any request in flight.
+        Skip the cached entries if <fresh>.
+        """
+        if not fresh:
+            cached = self.cached(guild)
+
+            if cached is not None:
+                return cached
+
+        task = self.inflight.get(guild.id)
+
+        if task is None:
+            task = asyncio.ensure_future(self.fetch(guild))
+            self.inflight[guild.id] = task
+        else:
+            self.stats["shared"] += 1
+
+        return await asyncio.shield(task)
+
+    def match(
+        self, gid: int, entries: List[AuditLogEntry], channel_id: int, author_id: int
+    ) -> AuditLogEntry:
+        """Find the entry responsible for deleting a message, or None if the author
+        (or a bot) deleted it.
+        """
+        used = self.used.setdefault(gid, {})
+
+        for entry in entries:
+            if entry.target is None or entry.target.id != author_id:
+                continue
+            if entry.extra.channel.id != channel_id:
+                continue
+
+            if entry.extra.count > used.get(entry.id, 0):
+                used[entry.id] = used.get(entry.id, 0) + 1
+                return entry
+
+        return None
+
+    async def find_deleter(self, guild: Guild, channel_id: int, author_id: int):
+        """Get the user who deleted a message by <author_id> in <channel_id>."""
+        entries = self.cached(guild)
+        entry = None
+
+        if entries is not None:
+            entry = self.match(guild.id, entries, channel_id, author_id)
+
+        # Discord raises the count of an existing entry in place, so a cached list may
+        # not have the delete yet
+        if entry is None:
+            entries = await self.get(guild, fresh=True)
+            entry = self.match(guild.id, entries, channel_id, author_id)
+
+        return entry.user if entry is not None else None
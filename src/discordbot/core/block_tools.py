@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import json
+import time
+
+from typing import Dict, List, Optional, Set, Tuple
+from sqlitedict import SqliteDict
+
+
+def block_key(user_id: int, guild_id: int = None) -> str:
+    """Row key of a block, global blocks have no guild part."""
+    if guild_id is None:
+        return str(user_id)
+
+    return f"{user_id}:{guild_id}"
+
+
+class Blocklist:
+    """Users blocked from using commands, everywhere or in a single guild.
+
+    Blocks are stored one row per block and indexed in sets, so checking a user is a
+    constant time lookup and changing one block only writes that block. Timed blocks are
+    kept in an expiry heap and lifted by a background task.
+    """
+
+    def __init__(self, bot, filename: str, interval: float = 10.0):
+        self.bot = bot
+        self.interval = interval
+        self.task = None
+
+        self.sql_db = SqliteDict(
+            filename=filename,
+            tablename="blocklist",
+            autocommit=True,
+            encode=json.dumps,
+            decode=json.loads,
+        )
+
+        # Globally blocked user ids, and (user id, guild id) pairs of guild blocks
+        self.users: Set[int] = set()
+        self.guild_users: Set[Tuple[int, int]] = set()
+        # Heap of (expiry timestamp, row key)
+        self.expiring: List[Tuple[float, str]] = []
+
+        for key, entry in self.sql_db.items():
+            self.index(key, entry)
+
+        heapq.heapify(self.expiring)
+
+    def __len__(self) -> int:
+        return len(self.users) + len(self.guild_users)
+
+    def index(self, key: str, entry: dict):
+        user_id, _, guild_id = key.partition(":")
+
+        if guild_id:
+            self.guild_users.add((int(user_id), int(guild_id)))
+        else:
+            self.users.add(int(user_id))
+
+        if entry.get("expires") is not None:
+            self.expiring.append((entry["expires"], key))
+
+    def unindex(self, key: str):
+        user_id, _, guild_id = key.partition(":")
+
+        if guild_id:
+            self.guild_users.discard((int(user_id), int(guild_id)))
+        else:
+            self.users.discard(int(user_id))
+
+    def migrate(self, legacy: List[str]) -> int:
+        """Import the old JSON list of globally blocked user ids, returns how many."""
+        count = 0
+
+        for user_id in legacy:
+            if int(user_id) not in self.users:
+                self.add(int(user_id))
+                count += 1
+
+        return count
+
+    def is_blocked(self, user_id: int, guild_id: int = None) -> bool:
+        if user_id in self.users:
+            return True
+
+        return guild_id is not None and (user_id, guild_id) in self.guild_users
+
+    def get(self, user_id: int, guild_id: int = None) -> Optional[dict]:
+        return self.sql_db.get(block_key(user_id, guild_id))
+
+    def add(
+        self,
+        user_id: int,
+        guild_id: int = None,
+        *,
+        expires: float = None,
+        issuer: int = None,
+    ):
+        """Block a user, replacing any existing block with the same scope.
+        <expires> is a UNIX timestamp, or None for a permanent block.
+        """
+        key = block_key(user_id, guild_id)
+        entry = {"expires": expires, "issued_by": issuer}
+
+        self.sql_db[key] = entry
+        self.index(key, {})
+
+        if expires is not None:
+            heapq.heappush(self.expiring, (expires, key))
+
+    def remove(self, user_id: int, guild_id: int = None) -> bool:
+        """Lift a block, returns False if there wasn't one."""
+        key = block_key(user_id, guild_id)
+
+        try:
+            del self.sql_db[key]
+        except KeyError:
+            return False
+
+        # Any heap entry for it is skipped when it comes due
+        self.unindex(key)
+        return True
+
+    def expire(self, now: float = None) -> List[str]:
+        """Lift every block that has expired, returns their row keys."""
+        if now is None:
+            now = time.time()
+
+        expired = []
+
+        while self.expiring and self.expiring[0][0] <= now:
+            expires, key = heapq.heappop(self.expiring)
+            entry = self.sql_db.get(key)
+
+            # Removed, or replaced with a different expiry since it was queued
+            if entry is None or entry.get("expires") != expires:
+                continue
+
+            del self.sql_db[key]
+            self.unindex(key)
+            expired.append(key)
+
+        return expired
+
+    def counts(self) -> Dict[str, int]:
+        return {"global": len(self.users), "guild": len(self.guild_users)}
+
+    async def run(self):
+        while True:
+            try:
+                for key in self.expire():
+                    self.bot.log.info(f"[BLOCK] Block {key} expired")
+            except Exception as e:
+                self.bot.log.error(f"[BLOCK] Expiry error:\n    - {e}")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background expiry task if it isn't already running."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import time
+
+from typing import Dict, List, Tuple
+from sqlitedict import SqliteDict
+from discord import Message, NotFound, HTTPException
+
+# Discord only allows bulk deleting between 2 and 100 messages younger than 14 days
+BULK_MIN = 2
+BULK_MAX = 100
+BULK_AGE = 14 * 24 * 60 * 60
+
+DISCORD_EPOCH = 1420070400000
+
+
+def snowflake_timestamp(snowflake: int) -> float:
+    """Get the UNIX timestamp a Discord snowflake was created at."""
+    return ((snowflake >> 22) + DISCORD_EPOCH) / 1000
+
+
+class DeleteScheduler:
+    """Batched, persistent delayed message deletion.
+
+    Messages are queued with a due time and grouped per channel once due. Channels with
+    two or more due messages are cleared with a single bulk delete request. Pending
+    deletes are stored one row per message so they survive restarts.
+    """
+
+    def __init__(self, bot, filename: str, interval: float = 1.0):
+        self.bot = bot
+        self.interval = interval
+        self.task = None
+
+        self.sql_db = SqliteDict(
+            filename=filename, tablename="pending_deletes", autocommit=True
+        )
+
+        # Heap of (due timestamp, channel id, message id)
+        self.pending: List[Tuple[float, int, int]] = []
+
+        for key, due in self.sql_db.items():
+            channel_id, message_id = key.split(":")
+            self.pending.append((float(due), int(channel_id), int(message_id)))
+
+        heapq.heapify(self.pending)
+
+        self.stats = {"deleted": 0, "bulk_requests": 0, "single_requests": 0, "failed": 0}
+
+    @property
+    def depth(self) -> int:
+        """Number of messages waiting to be deleted."""
+        return len(self.pending)
+
+    def schedule(self, message: Message, delay: float = 0.0):
+        """Queue <message> for deletion after <delay> seconds."""
+        self.schedule_ids(message.channel.id, message.id, delay)
+
+    def schedule_ids(self, channel_id: int, message_id: int, delay: float = 0.0):
+        due = time.time() + delay
+
+        heapq.heappush(self.pending, (due, channel_id, message_id))
+        self.sql_db[f"{channel_id}:{message_id}"] = due
+
+    def pop_due(self, now: float = None) -> Dict[int, List[int]]:
+        """Remove all due messages from the queue, grouped by channel id."""
+        if now is None:
+            now = time.time()
+
+        due = {}
+
+        while self.pending and self.pending[0][0] <= now:
+            _, channel_id, message_id = heapq.heappop(self.pending)
+            due.setdefault(channel_id, []).append(message_id)
+
+        return due
+
+    def forget(self, channel_id: int, message_ids: List[int]):
+        """Remove the stored rows for messages that have been handled."""
+        for message_id in message_ids:
+            try:
+                del self.sql_db[f"{channel_id}:{message_id}"]
+            except KeyError:
+                pass
+
+    def split_bulk(self, message_ids: List[int], now: float = None):
+        """Split message ids into bulk delete chunks and ids that must be deleted alone."""
+        if now is None:
+            now = time.time()
+
+        # Leave a minute of leeway so a message doesn't age out mid-request
+        cutoff = now - BULK_AGE + 60
+        recent = [m for m in message_ids if snowflake_timestamp(m) > cutoff]
+        single = [m for m in message_ids if snowflake_timestamp(m) <= cutoff]
+
+        chunks = []
+
+        for i in range(0, len(recent), BULK_MAX):
+            chunk = recent[i : i + BULK_MAX]
+
+            if len(chunk) >= BULK_MIN:
+                chunks.append(chunk)
+            else:
+                single.extend(chunk)
+
+        return chunks, single
+
+    async def delete_channel(self, channel_id: int, message_ids: List[int]):
+        chunks, single = self.split_bulk(list(set(message_ids)))
+
+        for chunk in chunks:
+            try:
+                await self.bot.http.delete_messages(channel_id, chunk)
+                self.stats["bulk_requests"] += 1
+                self.stats["deleted"] += len(chunk)
+            except HTTPException as e:
+                # Fall back to deleting one by one so one bad id doesn't keep the rest
+                self.bot.log.warning(f"[DELETE] Bulk delete in {channel_id} failed: {e}")
+                single.extend(chunk)
+
+        for message_id in single:
+            try:
+                await self.bot.http.delete_message(channel_id, message_id)
+                self.stats["single_requests"] += 1
+                self.stats["deleted"] += 1
+            except NotFound:
+                # Already gone
+                pass
+            except HTTPException as e:
+                self.stats["failed"] += 1
+                self.bot.log.warning(f"[DELETE] Unable to delete {message_id}: {e}")
+
+    async def flush(self, now: float = None):
+        """Delete every message that is currently due."""
+        for channel_id, message_ids in self.pop_due(now).items():
+            await self.delete_channel(channel_id, message_ids)
+            self.forget(channel_id, message_ids)
+
+    async def run(self):
+        while True:
+            try:
+                await self.flush()
+            except Exception as e:
+                self.bot.log.error(f"[DELETE] Scheduler error:\n    - {e}")
+
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background deletion task if it isn't already running."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
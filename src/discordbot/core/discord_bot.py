@@ -1,5 +1,5 @@
-import sys
 import os
+import atexit
 import logging
 import shutil
 import json
@@ -8,16 +8,21 @@ from datetime import datetime
 from sqlitedict import SqliteDict
 from discord.ext import commands
 
+from discordbot.core.db_tools import update_db
 from discordbot.core.time_tools import pretty_datetime
+from discordbot.core.log_tools import LogPipeline
+from discordbot.core.policy_tools import PolicyCache
+from discordbot.core.message_tools import MessagePipeline
+from discordbot.core.delete_tools import DeleteScheduler
+from discordbot.core.block_tools import Blocklist
+from discordbot.core.plugin_tools import PluginSwitches
+from discordbot.core.send_tools import SendQueue, EmbedBatcher, Priority
 
 VERSION = "3.3.0b2"
 
 
-def get_logger(file_name) -> logging.Logger:
-    """Get an instance of Logger and set up log files."""
-    timestamp = pretty_datetime(datetime.now(), "FILE")
-    log_file = f"logs/{timestamp}_{file_name}"
-
+def get_logger(pipeline: LogPipeline) -> logging.Logger:
+    """Get an instance of Logger writing through <pipeline> and set up log files."""
     if not os.path.exists("logs"):
         try:
             os.makedirs("logs")
@@ -25,10 +30,12 @@ def get_logger(file_name) -> logging.Logger:
             print(e)
             exit()
 
+    pipeline.start()
+    atexit.register(pipeline.stop)
+
     log = logging.getLogger()
     log.setLevel(logging.INFO)
-    log.addHandler(logging.FileHandler(filename=log_file, encoding="utf-8"))
-    log.addHandler(logging.StreamHandler(sys.stdout))
+    log.addHandler(pipeline.handler)
     return log
 
 
@@ -50,8 +57,11 @@ class DiscordBot(commands.Bot):
                         "MentionCommands": False,
                         "Token": "Bot token goes here",
                         "CommandsOnEdit": True,
+                        "CommandEditWindow": 120,
                         "DeleteCommands": False,
                         "LogFile": "bot.log",
+                        "LogMaxBytes": 10485760,
+                        "LogRotateHours": 24,
                         "LogMessages": True,
                         "LogEdits": True,
                         "LogDeletes": True,
@@ -89,17 +99,25 @@ class DiscordBot(commands.Bot):
             self.mention_cmds = config["MentionCommands"]
             self.config_token = config["Token"]
             self.cmd_on_edit = config["CommandsOnEdit"]
+            self.cmd_edit_window = config.get("CommandEditWindow", 120)
             self.delete_cmds = config["DeleteCommands"]
             self.log_file = config["LogFile"]
+            self.log_max_bytes = config.get("LogMaxBytes", 10485760)
+            self.log_rotate_hours = config.get("LogRotateHours", 24)
             self.log_messages = config["LogMessages"]
             self.log_edits = config["LogEdits"]
             self.log_deletes = config["LogDeletes"]
             self.log_commands = config["LogCommands"]
             self.botmasters = config["Botmasters"]
 
-        self.log = get_logger(self.log_file)
+        self.log_pipeline = LogPipeline(
+            f"logs/{self.log_file}",
+            max_bytes=self.log_max_bytes,
+            rotate_seconds=self.log_rotate_hours * 60 * 60,
+        )
+        self.log = get_logger(self.log_pipeline)
         self.db = None
-        self.blocklist = []
+        self.blocklist = None
         self.plugins = []
         self.servers = {}
         self.first_launch = True
@@ -122,15 +140,38 @@ class DiscordBot(commands.Bot):
             autocommit=True,
         )
 
-        if "blocklist" not in self.db:
-            self.db["blocklist"] = []
-
         if "servers" not in self.db:
             self.db["servers"] = {}
 
-        self.blocklist = self.db["blocklist"]
         self.servers = self.db["servers"]
 
+        # Plugins each server has disabled, previously stored as servers booleans
+        self.plugin_switches = PluginSwitches(db_file)
+        migrated = self.plugin_switches.migrate(self.servers)
+
+        if migrated:
+            update_db(self.db, self.servers, "servers")
+            self.log.info(f"[PLUGINS] Migrated {migrated} plugin setting(s)")
+
+        # Blocked users, one row per block. Timed blocks expire once started in on_ready
+        self.blocklist = Blocklist(self, db_file)
+
+        # Older versions stored the blocklist as a single JSON list
+        if "blocklist" in self.db:
+            count = self.blocklist.migrate(self.db["blocklist"])
+            del self.db["blocklist"]
+            self.log.info(f"[BLOCK] Migrated {count} blocked user(s)")
+
+        # Delayed deletes of command invokes and confirmations, started in on_ready
+        self.deleter = DeleteScheduler(self, db_file)
+        # Outbound messages cogs opt into with queue_send, started in on_ready
+        self.send_queue = SendQueue(self)
+        self.log_batcher = EmbedBatcher(self.send_queue)
+        # Precomputed per-guild settings for event handlers
+        self.policies = PolicyCache(self)
+        # Plugins register message handlers here instead of on_message listeners
+        self.pipeline = MessagePipeline(self, self.plugin_switches.disabled)
+
         if self.mention_cmds:
             self.mode = commands.when_mentioned_or(self.config_prefix)
         else:
@@ -147,6 +188,40 @@ class DiscordBot(commands.Bot):
             **kwargs,
         )
 
+    async def close(self):
+        # Send log embeds still waiting for their batch window before disconnecting
+        self.log_batcher.flush_all()
+
+        if not await self.send_queue.drain():
+            self.log.warning(
+                f"[SEND] Closing with {self.send_queue.depth} message(s) unsent"
+            )
+
+        await super().close()
+
+    async def on_message(self, message):
+        view = await self.pipeline.dispatch(message)
+
+        # Only hand messages that could be commands to the command processor
+        if view.startswith(self.config_prefix) or (
+            self.mention_cmds and view.startswith("<@")
+        ):
+            await self.process_commands(message)
+
+    def queue_send(
+        self, destination, content: str = None, *, embed=None, priority=Priority.NORMAL
+    ):
+        """Send a message through the prioritized outbound queue.
+        Returns a future resolving to the sent Message, or None if it was dropped.
+        """
+        return self.send_queue.put(destination, content, embed=embed, priority=priority)
+
+    def log_embed(self, channel, embed, *, immediate: bool = False):
+        """Post a log embed to <channel>, batched with other log embeds for a moment.
+        Set <immediate> for moderation actions that shouldn't wait.
+        """
+        self.log_batcher.add(channel, embed, immediate)
+
     def mission_control(self) -> str:
         if self.guilds is None:
             return "Bot not initialized."
@@ -0,0 +1,55 @@
+import time
+
+from collections import OrderedDict
+
+from discordbot.core.delete_tools import snowflake_timestamp
+
+
+class EditRerunGuard:
+    """Decides whether an edited message's command should run again.
+
+    Remembers a hash of the command text last run for each recent message in a bounded
+    LRU, so edits that don't change the text (link previews unfurling, pins, embeds
+    being suppressed) are ignored. Messages older than <window> seconds never re-run.
+    """
+
+    def __init__(self, window: float = 120.0, max_size: int = 2048):
+        self.window = window
+        self.max_size = max_size
+        # Message id -> hash of the command text it last ran with
+        self.seen: "OrderedDict[int, int]" = OrderedDict()
+
+        self.stats = {"reruns": 0, "unchanged": 0, "expired": 0}
+
+    def remember(self, message_id: int, content: str):
+        self.seen[message_id] = hash(content.strip())
+        self.seen.move_to_end(message_id)
+
+        while len(self.seen) > self.max_size:
+            self.seen.popitem(last=False)
+
+    def should_rerun(
+        self, message_id: int, before: str, after: str, now: float = None
+    ) -> bool:
+        """Check and record an edit from <before> to <after>."""
+        if now is None:
+            now = time.time()
+
+        if now - snowflake_timestamp(message_id) > self.window:
+            self.stats["expired"] += 1
+            return False
+
+        digest = hash(after.strip())
+        last = self.seen.get(message_id)
+
+        # First edit since the bot saw the message, so it last ran with the original
+        if last is None:
+            last = hash(before.strip())
+
+        if digest == last:
+            self.stats["unchanged"] += 1
+            return False
+
+        self.remember(message_id, after)
+        self.stats["reruns"] += 1
+        return True
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from discordbot.core.send_tools import Priority, SendQueue
+
+# Leave room under the 2000 character message limit for the header and footer
+REPORT_LENGTH = 1800
+
+
+class RemovedMentions(NamedTuple):
+    users: frozenset
+    roles: frozenset
+    everyone: bool
+
+    def describe(self) -> str:
+        parts = [f"{u.name}#{u.discriminator}" for u in self.users]
+        parts.extend(f"@{r.name}" for r in self.roles)
+
+        if self.everyone:
+            parts.append("Everyone or Here")
+
+        return ", ".join(parts)
+
+
+def removed_mentions(former, latter=None) -> Optional[RemovedMentions]:
+    """Get the mentions in <former> that are gone from <latter>, or from a deleted
+    message if <latter> is None. Returns None if nothing was removed.
+    """
+    users = frozenset(former.mentions)
+    roles = frozenset(former.role_mentions)
+    everyone = former.mention_everyone
+
+    if latter is not None:
+        users = users - frozenset(latter.mentions)
+        roles = roles - frozenset(latter.role_mentions)
+        everyone = everyone and not latter.mention_everyone
+
+    if not (users or roles or everyone):
+        return None
+
+    return RemovedMentions(users, roles, everyone)
+
+
+class GhostReporter:
+    """Collect ghost ping reports per channel and post them as one message.
+
+    Reports for a channel are held for <window> seconds after the first one, so someone
+    deleting pings one after another produces a single summary. Each guild gets at most
+    <rate> summaries per <per> seconds, anything over that is counted and mentioned in
+    the next summary that goes out.
+    """
+
+    def __init__(
+        self, queue: SendQueue, window: float = 5.0, rate: int = 4, per: float = 60.0
+    ):
+        self.queue = queue
+        self.window = window
+        self.rate = rate
+        self.per = per
+
+        # Channel id -> (channel, report lines)
+        self.buffers: Dict[int, tuple] = {}
+        self.timers: Dict[int, asyncio.TimerHandle] = {}
+        # Guild id -> times of recent summaries
+        self.sent: Dict[int, Deque[float]] = {}
+        # Guild id -> reports dropped by the rate cap since the last summary
+        self.dropped: Dict[int, int] = {}
+
+        self.stats = {"reports": 0, "messages": 0, "dropped": 0}
+
+    def report(self, channel, author, action: str, removed: RemovedMentions):
+        line = f"{author.mention} {action} a message mentioning {removed.describe()}"
+
+        self.buffers.setdefault(channel.id, (channel, []))[1].append(line)
+        self.stats["reports"] += 1
+
+        if channel.id not in self.timers:
+            loop = asyncio.get_event_loop()
+            self.timers[channel.id] = loop.call_later(self.window, self.flush, channel.id)
+
+    def allow(self, guild_id: int, now: float = None) -> bool:
+        """Record a summary for <guild_id> if it's under the rate cap."""
+        if now is None:
+            now = time.monotonic()
+
+        sent = self.sent.setdefault(guild_id, deque())
+
+        while sent and sent[0] <= now - self.per:
+            sent.popleft()
+
+        if len(sent) >= self.rate:
+            return False
+
+        sent.append(now)
+        return True
+
+    def summarize(self, lines: List[str], dropped: int = 0) -> str:
+        text = "Ghost ping report:"
+        shown = 0
+
+        for line in lines:
+            if len(text) + len(line) + 1 > REPORT_LENGTH:
+                break
+
+            text += f"\n{line}"
+            shown += 1
+
+        hidden = len(lines) - shown + dropped
+
+        if hidden:
+            text += f"\n...and {hidden} more not shown."
+
+        return text
+
+    def flush(self, key: int, now: float = None):
+        self.timers.pop(key, None)
+        channel, lines = self.buffers.pop(key, (None, []))
+
+        if not lines:
+            return
+
+        guild_id = channel.guild.id
+
+        if not self.allow(guild_id, now):
+            self.dropped[guild_id] = self.dropped.get(guild_id, 0) + len(lines)
+            self.stats["dropped"] += len(lines)
+            return
+
+        text = self.summarize(lines, self.dropped.pop(guild_id, 0))
+        self.queue.put(channel, text, priority=Priority.LOW)
+        self.stats["messages"] += 1
@@ -0,0 +1,217 @@
+import asyncio
+
+from typing import (
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+from discord import PermissionOverwrite
+
+T = TypeVar("T")
+
+
+class GroupResources(NamedTuple):
+    role: object
+    category: object
+    text: object
+    voice: object
+
+
+class Provisioner:
+    """Create a set of related Discord objects, deleting them all again if any step
+    fails, so a half made group doesn't leave orphaned roles or channels behind.
+
+    Used as an async context manager. Everything passed through create() is deleted,
+    newest first, when the block raises.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.created: List = []
+
+    async def create(self, pending: Awaitable[T]) -> T:
+        created = await pending
+        self.created.append(created)
+        return created
+
+    @staticmethod
+    async def gather(*pending: Awaitable) -> list:
+        """Run steps concurrently, raising the first error only once every step has
+        finished, so nothing is still being created while rolling back.
+        """
+        results = await asyncio.gather(*pending, return_exceptions=True)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return results
+
+    async def rollback(self):
+        # Newest first, so channels go before their category and the category's role
+        for created in reversed(self.created):
+            try:
+                await created.delete(reason=f"{self.reason} (rollback)")
+            except Exception:
+                # Already gone, or nothing more can be done about it
+                pass
+
+        self.created.clear()
+
+    async def __aenter__(self) -> "Provisioner":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            await self.rollback()
+
+        return False
+
+
+async def provision_group(
+    guild, leader, name: str, description: str, reason: str = "Groups plugin"
+) -> GroupResources:
+    """Create a group's role, category, text and voice channel and give <leader> the
+    role. Steps start as soon as what they depend on exists: the channels and the
+    leader's role run alongside each other once the role is made.
+    """
+    async with Provisioner(reason) as provisioner:
+        role = await provisioner.create(guild.create_role(name=name, reason=reason))
+
+        async def channels():
+            ow = {
+                guild.default_role: PermissionOverwrite(read_messages=False),
+                role: PermissionOverwrite(read_messages=True),
+            }
+            category = await provisioner.create(
+                guild.create_category(name=name, reason=reason, overwrites=ow)
+            )
+            text, voice = await provisioner.gather(
+                provisioner.create(
+                    guild.create_text_channel(
+                        name=name.lower(),
+                        reason=reason,
+                        category=category,
+                        topic=description,
+                    )
+                ),
+                provisioner.create(
+                    guild.create_voice_channel(
+                        name=name, reason=reason, category=category
+                    )
+                ),
+            )
+
+            return category, text, voice
+
+        (category, text, voice), _ = await provisioner.gather(
+            channels(), leader.add_roles(role, reason="Group created.")
+        )
+
+    return GroupResources(role, category, text, voice)
+
+
+class GroupIndex:
+    """Lookups for groups by category and role, and for the groups each member is in.
+
+    Groups are identified by (guild id, group name). Membership follows the group's
+    role, so it's filled in from the role's members when a group is added and kept up
+    to date from member role changes after that.
+    """
+
+    def __init__(self):
+        # Category id -> group, role id -> group
+        self.categories: Dict[int, Tuple[int, str]] = {}
+        self.roles: Dict[int, Tuple[int, str]] = {}
+        # Group -> (category id, role id)
+        self.groups: Dict[Tuple[int, str], Tuple[int, int]] = {}
+        # Role id -> member ids, (guild id, member id) -> group names
+        self.role_members: Dict[int, Set[int]] = {}
+        self.member_groups: Dict[Tuple[int, int], Set[str]] = {}
+
+    def add(
+        self,
+        guild_id: int,
+        name: str,
+        category_id: int,
+        role_id: int,
+        member_ids: Iterable[int] = (),
+    ):
+        group = (guild_id, name)
+
+        self.groups[group] = (category_id, role_id)
+        self.categories[category_id] = group
+        self.roles[role_id] = group
+        self.role_members[role_id] = set()
+
+        for member_id in member_ids:
+            self.join(role_id, member_id)
+
+    def remove(self, guild_id: int, name: str):
+        ids = self.groups.pop((guild_id, name), None)
+
+        if ids is None:
+            return
+
+        category_id, role_id = ids
+        self.categories.pop(category_id, None)
+        self.roles.pop(role_id, None)
+
+        for member_id in self.role_members.pop(role_id, ()):
+            names = self.member_groups.get((guild_id, member_id))
+
+            if names is not None:
+                names.discard(name)
+
+                if not names:
+                    del self.member_groups[(guild_id, member_id)]
+
+    def join(self, role_id: int, member_id: int):
+        group = self.roles.get(role_id)
+
+        if group is None:
+            return
+
+        self.role_members[role_id].add(member_id)
+        self.member_groups.setdefault((group[0], member_id), set()).add(group[1])
+
+    def leave(self, role_id: int, member_id: int):
+        group = self.roles.get(role_id)
+
+        if group is None:
+            return
+
+        self.role_members[role_id].discard(member_id)
+        names = self.member_groups.get((group[0], member_id))
+
+        if names is not None:
+            names.discard(group[1])
+
+            if not names:
+                del self.member_groups[(group[0], member_id)]
+
+    def update_member(self, member_id: int, before: Set[int], after: Set[int]):
+        """Apply a member's role change, given their role ids before and after."""
+        for role_id in after - before:
+            self.join(role_id, member_id)
+
+        for role_id in before - after:
+            self.leave(role_id, member_id)
+
+    def remove_member(self, guild_id: int, member_id: int):
+        """Forget a member who left the guild."""
+        for name in self.member_groups.pop((guild_id, member_id), ()):
+            self.role_members[self.groups[(guild_id, name)][1]].discard(member_id)
+
+    def by_category(self, category_id: int) -> Optional[str]:
+        group = self.categories.get(category_id)
+        return group[1] if group is not None else None
+
+    def groups_of(self, guild_id: int, member_id: int) -> List[str]:
+        return sorted(self.member_groups.get((guild_id, member_id), ()))
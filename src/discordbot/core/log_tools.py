@@ -0,0 +1,168 @@
+import os
+import sys
+import gzip
+import queue
+import shutil
+import threading
+import time
+
+from datetime import datetime
+from logging.handlers import QueueHandler
+
+from discordbot.core.time_tools import pretty_datetime
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Non-blocking log pipeline.
+
+    Records are only enqueued on the calling thread. A writer thread drains the queue in
+    batches, writes each batch to stdout and the log file at once, and rotates the file
+    by size or age. Rotated segments are gzip compressed next to the live log.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_seconds: float = 24 * 60 * 60,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        stream=sys.stdout,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.batch_size = batch_size
+        self.stream = stream
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+
+        self.file = None
+        self.opened_at = 0.0
+        self.reported_drops = 0
+        self.thread = None
+
+        self.stats = {"written": 0, "batches": 0, "rotations": 0}
+
+    @property
+    def queued(self) -> int:
+        return self.queue.qsize()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+
+    def should_rotate(self) -> bool:
+        if self.file.tell() >= self.max_bytes:
+            return True
+
+        return time.time() - self.opened_at >= self.rotate_seconds
+
+    def segment_name(self) -> str:
+        folder, name = os.path.split(self.path)
+        timestamp = pretty_datetime(datetime.now(), "FILE")
+        segment = os.path.join(folder, f"{timestamp}_{name}")
+
+        # Several rotations may happen within the same minute
+        count = 1
+        result = segment
+
+        while os.path.exists(f"{result}.gz"):
+            result = f"{segment}.{count}"
+            count += 1
+
+        return result
+
+    def rotate(self):
+        self.file.close()
+
+        segment = self.segment_name()
+        os.replace(self.path, segment)
+
+        with open(segment, "rb") as source, gzip.open(f"{segment}.gz", "wb") as dest:
+            shutil.copyfileobj(source, dest)
+
+        os.remove(segment)
+        self.stats["rotations"] += 1
+        self.open()
+
+    def write(self, lines):
+        text = "\n".join(lines) + "\n"
+
+        self.stream.write(text)
+        self.stream.flush()
+
+        self.file.write(text)
+        self.file.flush()
+
+        self.stats["written"] += len(lines)
+        self.stats["batches"] += 1
+
+    def drain(self, block: bool = True) -> bool:
+        """Write one batch of records, returns False once the pipeline is stopped."""
+        try:
+            records = [self.queue.get(block=block, timeout=1.0 if block else None)]
+        except queue.Empty:
+            return True
+
+        while len(records) < self.batch_size:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        running = None not in records
+        lines = [r.getMessage() for r in records if r is not None]
+
+        dropped = self.dropped - self.reported_drops
+
+        if dropped > 0:
+            self.reported_drops += dropped
+            lines.append(f"[LOG] Queue overloaded, dropped {dropped} record(s).")
+
+        if lines:
+            self.write(lines)
+
+        if self.should_rotate():
+            self.rotate()
+
+        return running
+
+    def run(self):
+        while self.drain():
+            pass
+
+    def start(self):
+        self.open()
+        self.thread = threading.Thread(target=self.run, name="LogPipeline", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Flush everything still queued and close the log file."""
+        if self.thread is None:
+            return
+
+        # A blocking put so the stop marker is never dropped
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.file.close()
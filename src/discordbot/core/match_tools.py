@@ -0,0 +1,318 @@
+import re
+import unicodedata
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # Python < 3.11
+    import sre_parse
+
+MODES = ("contains", "word", "regex")
+
+# Regex triggers run on every message, so keep them short and free of nested repeats
+MAX_REGEX_LENGTH = 200
+MAX_REGEX_REPEATS = 10
+
+# Inline flags at the very start of a regex, which apply to the whole pattern
+LEADING_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+REPEATS = tuple(
+    getattr(sre_parse, name)
+    for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(sre_parse, name)
+)
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton matching many substrings in one pass over a text.
+
+    The cost of a search depends on the length of the text and the number of matches,
+    not on how many patterns the automaton was built from.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            self.add(pattern)
+
+        self.build()
+
+    def add(self, pattern: str):
+        if not pattern:
+            return
+
+        state = 0
+
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+
+            state = next_state
+
+        self.output[state] += (len(self.patterns),)
+        self.patterns.append(pattern)
+
+    def build(self):
+        """Compute failure links breadth first, merging outputs along them."""
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fallback = self.fail[state]
+
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+
+                link = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = link if link != next_state else 0
+                self.output[next_state] += self.output[self.fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start index, pattern index) for every occurrence in <text>."""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        patterns = self.patterns
+        state = 0
+
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(char, 0)
+
+            for index in output[state]:
+                yield i - len(patterns[index]) + 1, index
+
+
+# Digits and symbols commonly swapped in for letters to dodge filters
+LEETSPEAK = {
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "@": "a",
+    "$": "s",
+}
+
+# Look-alike letters NFKD doesn't decompose, mostly Cyrillic and Greek. Applied before
+# casefolding, as capitals don't always look like their own lowercase forms
+CONFUSABLES = {
+    "А": "a", "В": "b", "С": "c", "Е": "e", "Н": "h", "І": "i", "К": "k", "М": "m",
+    "О": "o", "Р": "p", "Т": "t", "Х": "x", "Α": "a", "Β": "b", "Ε": "e", "Η": "h",
+    "Ι": "i", "Κ": "k", "Μ": "m", "Ν": "n", "Ο": "o", "Ρ": "p", "Τ": "t", "Υ": "y",
+    "Χ": "x", "Ζ": "z",
+    "а": "a", "в": "b", "с": "c", "е": "e", "ё": "e", "һ": "h", "і": "i", "ј": "j",
+    "к": "k", "м": "m", "н": "h", "о": "o", "р": "p", "ѕ": "s", "т": "t", "у": "y",
+    "х": "x", "ԁ": "d", "ԛ": "q", "ԝ": "w", "α": "a", "β": "b", "ε": "e", "η": "n",
+    "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ß": "ss",
+}  # fmt: skip
+
+# Lowercasing and leetspeak in a single translate for plain ASCII text
+_ASCII_TABLE = str.maketrans(
+    {**{chr(c): chr(c + 32) for c in range(ord("A"), ord("Z") + 1)}, **LEETSPEAK}
+)
+_UNICODE_TABLE = str.maketrans({**LEETSPEAK, **CONFUSABLES})
+
+
+def normalize_text(text: str) -> str:
+    """Reduce <text> to a canonical form for filtering.
+
+    Case, compatibility forms (fullwidth, styled math letters), accents, zero-width and
+    other invisible format characters, common look-alike letters and leetspeak are all
+    folded away. Terms must be normalized the same way before matching against this.
+    """
+    if text.isascii():
+        return text.translate(_ASCII_TABLE)
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(
+        c
+        for c in decomposed
+        if not unicodedata.combining(c) and unicodedata.category(c) != "Cf"
+    )
+
+    return stripped.translate(_UNICODE_TABLE).casefold()
+
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def scope_flags(pattern: str) -> str:
+    """Turn a regex's leading inline flags into a scoped group, so "(?i)abc" becomes
+    "(?i:abc)" and the flags stay with it when it's combined with other patterns.
+    """
+    flags = ""
+    pos = 0
+    match = LEADING_FLAGS.match(pattern)
+
+    while match is not None:
+        flags += match.group(1)
+        pos = match.end()
+        match = LEADING_FLAGS.match(pattern, pos)
+
+    if not flags:
+        return pattern
+
+    # A verbose mode comment running to the end would swallow the closing bracket
+    end = "\n)" if "x" in flags else ")"
+
+    return f"(?{flags}:{pattern[pos:]}{end}"
+
+
+def regex_complexity(pattern: str) -> Optional[str]:
+    """Get an error message if <pattern> is too long or complex to run on every
+    message, or None if it's fine. Nested repeats like "(a+)+" can backtrack for
+    exponentially long on text that almost matches.
+    """
+    if len(pattern) > MAX_REGEX_LENGTH:
+        return f"Regex must be at most {MAX_REGEX_LENGTH} characters."
+
+    repeats = 0
+    # (parsed pattern, inside a repeat)
+    stack = [(sre_parse.parse(pattern), False)]
+
+    while stack:
+        parsed, repeated = stack.pop()
+
+        for op, av in parsed:
+            if op in REPEATS:
+                repeats += 1
+
+                if repeated and av[1] > 1:
+                    return "Regex can't repeat something that already repeats."
+
+                stack.append((av[2], repeated or av[1] > 1))
+            elif op is sre_parse.SUBPATTERN:
+                stack.append((av[-1], repeated))
+            elif op is sre_parse.BRANCH:
+                stack.extend((branch, repeated) for branch in av[1])
+            elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                stack.append((av[1], repeated))
+
+    if repeats > MAX_REGEX_REPEATS:
+        return f"Regex can use at most {MAX_REGEX_REPEATS} repeats."
+
+    return None
+
+
+class TriggerMatcher:
+    """Match a message against many "contains", whole "word" and "regex" triggers.
+
+    Substring and word triggers share one case-insensitive Aho-Corasick automaton and
+    regex triggers are combined into a single alternation, so both are compiled once
+    when the triggers change rather than checked one by one per message.
+    """
+
+    def __init__(self, triggers: Dict[str, str]):
+        """<triggers> maps each trigger to its mode."""
+        self.literals: List[Tuple[str, str]] = []
+        regexes: List[str] = []
+
+        for trigger, mode in triggers.items():
+            if mode == "regex":
+                regexes.append(trigger)
+            elif trigger:
+                self.literals.append((trigger, mode))
+
+        self.automaton = AhoCorasick(t.casefold() for t, _ in self.literals)
+
+        self.regexes = regexes
+        self.combined = None
+        self.separate: List[re.Pattern] = []
+
+        if regexes:
+            try:
+                self.combined = re.compile(
+                    "|".join(f"(?P<t{i}>{scope_flags(r)})" for i, r in enumerate(regexes))
+                )
+            except re.error:
+                # Patterns with their own named groups or backreferences can't be
+                # combined, fall back to searching them separately
+                self.separate = [re.compile(r) for r in regexes]
+
+    def __len__(self) -> int:
+        return len(self.literals) + len(self.regexes)
+
+    def literal_match(self, text: str) -> Optional[Tuple[int, str]]:
+        folded = text.casefold()
+
+        for start, index in self.automaton.iter_matches(folded):
+            trigger, mode = self.literals[index]
+
+            if mode == "word":
+                end = start + len(self.automaton.patterns[index])
+
+                if start > 0 and is_word_char(folded[start - 1]):
+                    continue
+                if end < len(folded) and is_word_char(folded[end]):
+                    continue
+
+            return start, trigger
+
+        return None
+
+    def regex_match(self, text: str) -> Optional[Tuple[int, str]]:
+        if self.combined is not None:
+            match = self.combined.search(text)
+
+            if match is not None:
+                return match.start(), self.regexes[int(match.lastgroup[1:])]
+
+            return None
+
+        found = None
+
+        for i, pattern in enumerate(self.separate):
+            match = pattern.search(text)
+
+            if match is not None and (found is None or match.start() < found[0]):
+                found = (match.start(), self.regexes[i])
+
+        return found
+
+    def match(self, text: str) -> Optional[str]:
+        """Get the first trigger found in <text>, if any."""
+        found = [m for m in (self.literal_match(text), self.regex_match(text)) if m]
+
+        if not found:
+            return None
+
+        return min(found)[1]
+
+
+def validate_trigger(trigger: str, mode: str) -> Optional[str]:
+    """Get an error message for an invalid trigger, or None if it's fine."""
+    if mode not in MODES:
+        return f"Mode must be one of: {', '.join(MODES)}"
+
+    if mode == "regex":
+        try:
+            # Wrapped as it will be when combined, to reject clashing group names
+            re.compile(f"(?P<t0>{scope_flags(trigger)})")
+        except re.error as e:
+            return f"Invalid regex: {e}"
+
+        return regex_complexity(trigger)
+
+    return None
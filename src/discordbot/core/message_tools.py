@@ -0,0 +1,283 @@
+import asyncio
+import re
+import time
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from discord import Message
+
+# Marker for lazily computed attributes that haven't been computed yet
+_UNSET = object()
+
+# Message links from any of the Discord clients, DMs use @me as the guild
+MESSAGE_LINK = re.compile(
+    r"<?https?://(?:(?:ptb|canary)\.)?discord(?:app)?\.com/channels/"
+    r"(\d+|@me)/(\d+)/(\d+)/?>?$"
+)
+
+
+class MessageView:
+    """Read-only view of a message that is parsed at most once.
+
+    Every handler in the pipeline gets the same view, so the content is only split,
+    and mentions only collected, the first time a handler asks for them.
+    """
+
+    __slots__ = ("message", "_tokens", "_mention_ids", "_role_mention_ids")
+
+    def __init__(self, message: Message):
+        self.message = message
+        self._tokens = _UNSET
+        self._mention_ids = _UNSET
+        self._role_mention_ids = _UNSET
+
+    @property
+    def content(self) -> str:
+        return self.message.content
+
+    @property
+    def guild_id(self) -> Optional[int]:
+        guild = self.message.guild
+        return guild.id if guild is not None else None
+
+    @property
+    def tokens(self) -> List[str]:
+        if self._tokens is _UNSET:
+            self._tokens = self.message.content.split(" ")
+
+        return self._tokens
+
+    @property
+    def first_token(self) -> str:
+        return self.tokens[0]
+
+    @property
+    def mention_ids(self) -> FrozenSet[int]:
+        if self._mention_ids is _UNSET:
+            self._mention_ids = frozenset(self.message.raw_mentions)
+
+        return self._mention_ids
+
+    @property
+    def role_mention_ids(self) -> FrozenSet[int]:
+        if self._role_mention_ids is _UNSET:
+            self._role_mention_ids = frozenset(self.message.raw_role_mentions)
+
+        return self._role_mention_ids
+
+    def startswith(self, prefix: str) -> bool:
+        return self.message.content.startswith(prefix)
+
+    def command_name(self, prefix: str) -> Optional[str]:
+        """Get the first word without <prefix>, or None if it doesn't start with it."""
+        if not self.startswith(prefix):
+            return None
+
+        return self.first_token[len(prefix) :]
+
+
+Handler = Callable[[MessageView], Awaitable[None]]
+
+
+class MessagePipeline:
+    """Routes each message to the plugins interested in it.
+
+    Handlers are registered by owner (the plugin name) and are either global, scoped to
+    a guild, or scoped to a guild and a set of first-word triggers. Messages in a guild
+    with no registrations only cost the lookups to find that out. Owners in <disabled>,
+    a guild id -> plugin names mapping, are skipped in that guild.
+    """
+
+    def __init__(self, bot, disabled: Dict[int, FrozenSet[str]] = None):
+        self.bot = bot
+        self.disabled = disabled if disabled is not None else {}
+        self.global_handlers: Dict[str, Handler] = {}
+        # Guild id -> owner -> handler
+        self.guild_handlers: Dict[int, Dict[str, Handler]] = {}
+        # Guild id -> first token -> owner -> handler
+        self.triggers: Dict[int, Dict[str, Dict[str, Handler]]] = {}
+
+        self.stats = {"messages": 0, "handled": 0}
+
+    def subscribe(
+        self,
+        owner: str,
+        handler: Handler,
+        *,
+        guild_id: int = None,
+        triggers: List[str] = None,
+    ):
+        """Register <handler> for every message, every message in a guild, or messages
+        in a guild whose first word is one of <triggers>.
+        """
+        if guild_id is None:
+            self.global_handlers[owner] = handler
+        elif triggers is None:
+            self.guild_handlers.setdefault(guild_id, {})[owner] = handler
+        else:
+            index = self.triggers.setdefault(guild_id, {})
+
+            for trigger in triggers:
+                index.setdefault(trigger, {})[owner] = handler
+
+    def unsubscribe(self, owner: str, guild_id: int = None):
+        """Remove <owner>'s handlers from one guild, or everywhere."""
+        if guild_id is None:
+            self.global_handlers.pop(owner, None)
+            guilds = set(self.guild_handlers) | set(self.triggers)
+        else:
+            guilds = {guild_id}
+
+        for gid in guilds:
+            handlers = self.guild_handlers.get(gid, {})
+            handlers.pop(owner, None)
+
+            if not handlers:
+                self.guild_handlers.pop(gid, None)
+
+            index = self.triggers.get(gid, {})
+
+            for trigger in list(index):
+                index[trigger].pop(owner, None)
+
+                if not index[trigger]:
+                    del index[trigger]
+
+            if not index:
+                self.triggers.pop(gid, None)
+
+    def handlers_for(self, view: MessageView) -> List[Handler]:
+        gid = view.guild_id
+
+        if gid is None:
+            return list(self.global_handlers.values())
+
+        scoped = [self.global_handlers, self.guild_handlers.get(gid, {})]
+
+        index = self.triggers.get(gid)
+
+        if index:
+            scoped.append(index.get(view.first_token, {}))
+
+        disabled = self.disabled.get(gid)
+
+        if disabled is None:
+            return [h for handlers in scoped for h in handlers.values()]
+
+        return [
+            h
+            for handlers in scoped
+            for owner, h in handlers.items()
+            if owner not in disabled
+        ]
+
+    async def dispatch(self, message: Message) -> MessageView:
+        view = MessageView(message)
+        self.stats["messages"] += 1
+
+        for handler in self.handlers_for(view):
+            self.stats["handled"] += 1
+
+            try:
+                await handler(view)
+            except Exception as e:
+                self.bot.log.error(f"[PIPELINE] Handler {handler.__qualname__}: {e}")
+
+        return view
+
+
+class MessageLink(NamedTuple):
+    guild_id: Optional[int]
+    channel_id: int
+    message_id: int
+
+
+def parse_message_link(text: str) -> Optional[MessageLink]:
+    """Get the ids in a message link, or None if <text> isn't one."""
+    match = MESSAGE_LINK.match(text.strip())
+
+    if match is None:
+        return None
+
+    guild, channel, message = match.groups()
+    guild_id = None if guild == "@me" else int(guild)
+
+    return MessageLink(guild_id, int(channel), int(message))
+
+
+class MessageCache:
+    """Messages fetched in the last <ttl> seconds, so a command repeated straight away
+    doesn't fetch the same message again. Owners should forget() messages as they're
+    edited or deleted, so stale content isn't reused.
+
+    Fetches of a message that is already being fetched wait on that request instead of
+    making another. At most <max_size> messages are kept, least recently used first out.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # Message id -> (expiry time, message)
+        self.entries: "OrderedDict[int, Tuple[float, Message]]" = OrderedDict()
+        # Message id -> fetch in progress
+        self.inflight: Dict[int, asyncio.Task] = {}
+
+        self.stats = {"hits": 0, "misses": 0, "shared": 0}
+
+    def get(self, message_id: int, now: float = None) -> Optional[Message]:
+        entry = self.entries.get(message_id)
+
+        if entry is None:
+            return None
+
+        if now is None:
+            now = time.monotonic()
+
+        if entry[0] <= now:
+            del self.entries[message_id]
+            return None
+
+        self.entries.move_to_end(message_id)
+        return entry[1]
+
+    def put(self, message: Message, now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        self.entries[message.id] = (now + self.ttl, message)
+        self.entries.move_to_end(message.id)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def forget(self, message_id: int):
+        """Drop a message that has been deleted or changed."""
+        self.entries.pop(message_id, None)
+
+    async def fetch(self, channel, message_id: int) -> Message:
+        """Get a message from the cache, or fetch it from <channel>."""
+        message = self.get(message_id)
+
+        if message is not None:
+            self.stats["hits"] += 1
+            return message
+
+        task = self.inflight.get(message_id)
+
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(channel.fetch_message(message_id))
+            task.add_done_callback(lambda t: self.settle(message_id, t))
+            self.inflight[message_id] = task
+        else:
+            self.stats["shared"] += 1
+
+        # Shielded so one waiter giving up doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def settle(self, message_id: int, task: asyncio.Task):
+        self.inflight.pop(message_id, None)
+
+        if not task.cancelled() and task.exception() is None:
+            self.put(task.result())
@@ -0,0 +1,78 @@
+import json
+
+from typing import Dict, FrozenSet
+from sqlitedict import SqliteDict
+
+# Per-server Core settings kept in the servers blob, everything else there that is
+# True or False used to be a plugin toggle
+CORE_SETTINGS = frozenset({"log_edits", "log_deletes", "log_channel", "report_ghosts"})
+
+
+class PluginSwitches:
+    """Which plugins each guild has disabled.
+
+    Stored one row per guild and kept in memory as a frozen set per guild, with no
+    entry at all for guilds using every plugin. Checks run on every command and message,
+    so they're a single dict lookup in the common case.
+    """
+
+    def __init__(self, filename: str):
+        self.sql_db = SqliteDict(
+            filename=filename,
+            tablename="disabled_plugins",
+            autocommit=True,
+            encode=json.dumps,
+            decode=json.loads,
+        )
+
+        # Guild id -> disabled plugin names. Shared with the message pipeline, so only
+        # ever updated in place
+        self.disabled: Dict[int, FrozenSet[str]] = {
+            int(sid): frozenset(names) for sid, names in self.sql_db.items() if names
+        }
+
+    def migrate(self, servers: dict) -> int:
+        """Move plugin toggles out of the old per-server settings, returns how many.
+        <servers> is changed in place and must be saved by the caller.
+        """
+        count = 0
+
+        for sid, settings in servers.items():
+            for name, value in list(settings.items()):
+                if name in CORE_SETTINGS or not isinstance(value, bool):
+                    continue
+
+                if not value:
+                    self.set_enabled(int(sid), name, False)
+
+                del settings[name]
+                count += 1
+
+        return count
+
+    def is_disabled(self, guild_id: int, plugin: str) -> bool:
+        disabled = self.disabled.get(guild_id)
+        return disabled is not None and plugin in disabled
+
+    def set_enabled(self, guild_id: int, plugin: str, enabled: bool):
+        disabled = set(self.disabled.get(guild_id, ()))
+
+        if enabled:
+            disabled.discard(plugin)
+        else:
+            disabled.add(plugin)
+
+        if disabled:
+            self.disabled[guild_id] = frozenset(disabled)
+            self.sql_db[str(guild_id)] = sorted(disabled)
+        else:
+            self.disabled.pop(guild_id, None)
+
+            if str(guild_id) in self.sql_db:
+                del self.sql_db[str(guild_id)]
+
+    def remove_guild(self, guild_id: int):
+        self.disabled.pop(guild_id, None)
+
+        if str(guild_id) in self.sql_db:
+            del self.sql_db[str(guild_id)]
@@ -1,13 +1,23 @@
 import json
 
-from datetime import datetime
-from discord import Game, Message, Guild, Embed, AuditLogAction, Member, User, TextChannel
+from datetime import datetime, timezone
+from discord import Game, Message, Guild, Embed, Member, User, TextChannel, Role
+from discord.abc import GuildChannel
 from discord.ext import commands
 from discord.ext.commands import Context, Cog
 
 from discordbot.core.discord_bot import DiscordBot
 from discordbot.core.db_tools import update_db
-from discordbot.core.time_tools import pretty_datetime
+from discordbot.core.time_tools import (
+    length_error,
+    pretty_datetime,
+    pretty_timedelta,
+    time_parser,
+)
+from discordbot.core.audit_tools import AuditLogCache
+from discordbot.core.message_tools import MessageView
+from discordbot.core.edit_tools import EditRerunGuard
+from discordbot.core.ghost_tools import GhostReporter, removed_mentions
 
 VERSION = "1.1b4"
 
@@ -26,6 +36,12 @@ class Core(commands.Cog):
         self.bot = bot
         self.name = "core"
         self.version = VERSION
+        self.audit_cache = AuditLogCache()
+        self.edit_guard = EditRerunGuard(window=self.bot.cmd_edit_window)
+        self.ghosts = GhostReporter(self.bot.send_queue)
+
+        if self.bot.log_messages:
+            self.bot.pipeline.subscribe(self.name, self.log_message)
 
         try:
             with open("config/config.json") as cfg:
@@ -37,7 +53,8 @@ class Core(commands.Cog):
     ## Checks
     # Global check for if the user is blocked
     async def bot_check(self, ctx):
-        return str(ctx.author.id) not in self.bot.blocklist
+        guild_id = ctx.guild.id if ctx.guild is not None else None
+        return not self.bot.blocklist.is_blocked(ctx.author.id, guild_id)
 
     ## Events
     @Cog.listener()
@@ -60,22 +77,31 @@ class Core(commands.Cog):
             self.bot.servers.pop(sid)
             update_db(self.bot.db, self.bot.servers, "servers")
 
+        self.bot.policies.invalidate(sid)
+        self.bot.plugin_switches.remove_guild(guild.id)
+
     @Cog.listener()
-    async def on_message(self, msg: Message):
-        # Log messages to the console/log file if enabled
-        if self.bot.log_messages:
-            timestamp = pretty_datetime(datetime.now(), display="TIME")
-            message = f"[{msg.guild} - #{msg.channel}] <{msg.author}>: {msg.content}"
+    async def on_guild_channel_delete(self, channel: GuildChannel):
+        # Drop snapshots holding on to a deleted log channel
+        self.bot.policies.invalidate(channel.guild.id)
+
+    @Cog.listener()
+    async def on_guild_role_delete(self, role: Role):
+        self.bot.policies.invalidate(role.guild.id)
+
+    async def log_message(self, view: MessageView):
+        # Log messages to the console/log file
+        msg = view.message
+        timestamp = pretty_datetime(datetime.now(), display="TIME")
+        message = f"[{msg.guild} - #{msg.channel}] <{msg.author}>: {msg.content}"
 
-            self.bot.log.info(f"-{timestamp}- {message}")
+        self.bot.log.info(f"-{timestamp}- {message}")
 
     @Cog.listener()
     async def on_message_edit(self, former: Message, latter: Message):
         if former.author.id == self.bot.user.id:
             return
 
-        sid = str(former.guild.id) if former.guild is not None else None
-
         # Embeds cause message edit events even if the user didn't edit them
         if former.content == latter.content and former.embeds != latter.embeds:
             return
@@ -88,56 +114,37 @@ class Core(commands.Cog):
             self.bot.log.info(f"[BEFORE] <{former.author}>: {former.content}")
             self.bot.log.info(f"[AFTER] <{latter.author}>: {latter.content}")
 
-        # Process the commands from the message afterwards if enabled
-        if self.bot.cmd_on_edit:
+        # Process the commands from the message afterwards if enabled, but only if the
+        # text actually changed since it last ran
+        if self.bot.cmd_on_edit and self.edit_guard.should_rerun(
+            latter.id, former.content, latter.content
+        ):
             await self.bot.process_commands(latter)
 
         # If this is a DM, we don't need to try and log to channel or report ghosts
-        if sid is not None:
-            # Check if the server should report mention deletes
-            try:
-                report_ghosts = self.bot.servers[sid]["report_ghosts"]
-            except KeyError:
-                # This server is not configured.
-                report_ghosts = False
-
-            if report_ghosts:
-                title = f"A message from {former.author.mention} was edited removing"
+        if former.guild is not None:
+            policy = self.bot.policies.get(former.guild)
 
-                difference = [m for m in former.mentions if m not in latter.mentions]
-                mentions = [f"{m.name}#{m.discriminator}" for m in difference]
+            if policy.report_ghosts:
+                removed = removed_mentions(former, latter)
 
-                if difference:
-                    await former.channel.send(f"{title} mention(s) from: {mentions}")
-                elif former.mention_everyone and not latter.mention_everyone:
-                    await former.channel.send(f"{title} an Everyone or Here mention")
-                elif former.role_mentions != latter.role_mentions:
-                    former.mentions = former.role_mentions - latter.role_mentions
-                    mentions = [f"{r.name}" for r in former.mentions]
-                    await former.channel.send(f"{title} role mention(s): {mentions}")
+                if removed is not None:
+                    self.ghosts.report(former.channel, former.author, "edited", removed)
 
             # Log the edit to a channel if the server has it set up
-            try:
-                if self.bot.servers[sid]["log_edits"]:
-                    guild = former.guild
-                    channel = guild.get_channel(int(self.bot.servers[sid]["log_channel"]))
-
-                    embed = Embed(title="Message Edited", color=0xFF0000)
-                    embed.add_field(
-                        name=f"By {former.author.name}#{former.author.discriminator}",
-                        value=f"In {former.channel.mention}. UID: {former.author.id}",
-                    )
-                    embed.add_field(name="Before", value=former.content, inline=False)
-                    embed.add_field(name="After", value=latter.content, inline=False)
-
-                    await channel.send(embed=embed)
-            except KeyError:
-                pass
+            if policy.log_edits and policy.log_channel is not None:
+                embed = Embed(title="Message Edited", color=0xFF0000)
+                embed.add_field(
+                    name=f"By {former.author.name}#{former.author.discriminator}",
+                    value=f"In {former.channel.mention}. UID: {former.author.id}",
+                )
+                embed.add_field(name="Before", value=former.content, inline=False)
+                embed.add_field(name="After", value=latter.content, inline=False)
+
+                self.bot.log_embed(policy.log_channel, embed)
 
     @Cog.listener()
     async def on_message_delete(self, msg: Message):
-        sid = str(msg.guild.id) if msg.guild is not None else None
-
         # Log the delete to the console/log file if enabled
         if self.bot.log_deletes:
             timestamp = pretty_datetime(datetime.now(), display="TIME")
@@ -148,54 +155,36 @@ class Core(commands.Cog):
             self.bot.log.info(f"{header} {content}")
 
         # If this is a DM, we don't need to try and log to channel or report ghosts
-        if sid is not None:
-            # Check if the server should report mention deletes
-            try:
-                report_ghosts = self.bot.servers[sid]["report_ghosts"]
-            except KeyError:
-                # This server is not configured.
-                report_ghosts = False
+        if msg.guild is not None:
+            policy = self.bot.policies.get(msg.guild)
 
-            if report_ghosts and msg.author.id != self.bot.user.id:
-                title = f"A message from {msg.author.mention} was removed mentioning"
+            if policy.report_ghosts and msg.author.id != self.bot.user.id:
+                removed = removed_mentions(msg)
 
-                if len(msg.mentions) > 0:
-                    mentions = [f"{m.name}#{m.discriminator}" for m in msg.mentions]
-                    await msg.channel.send(f"{title}: {mentions}")
-                elif msg.mention_everyone:
-                    await msg.channel.send(f"{title}: Everyone or Here")
-                elif len(msg.role_mentions) > 0:
-                    mentions = [f"{r.name}" for r in msg.role_mentions]
-                    await msg.channel.send(f"{title} role: {mentions}")
+                if removed is not None:
+                    self.ghosts.report(msg.channel, msg.author, "deleted", removed)
 
             # Log the delete to a channel if the server has it set up
-            try:
-                if self.bot.servers[sid]["log_deletes"]:
-                    # Try to get the user who deleted the message, not reliable
-                    action = await msg.guild.audit_logs(
-                        limit=1, action=AuditLogAction.message_delete
-                    ).flatten()
-
-                    who = action[0].user
-
-                    guild = msg.guild
-                    channel = guild.get_channel(int(self.bot.servers[sid]["log_channel"]))
-
-                    embed = Embed(title="Message Deleted", color=0xFF0000)
-                    embed.add_field(
-                        name="Last message delete action performed by:",
-                        value=f"{who.name}#{who.discriminator} or a bot",
-                        inline=False,
-                    )
-                    embed.add_field(
-                        name=f"Author - {msg.author.name}#{msg.author.discriminator}",
-                        value=f"From {msg.channel.mention} - UID: {msg.author.id}",
-                    )
-                    embed.add_field(name="Message", value=msg.content, inline=False)
-
-                    await channel.send(embed=embed)
-            except KeyError:
-                pass
+            if policy.log_deletes and policy.log_channel is not None:
+                # Deletes with no matching audit log entry were by the author or a bot
+                who = await self.audit_cache.find_deleter(
+                    msg.guild, msg.channel.id, msg.author.id
+                )
+
+                if who is not None:
+                    deleted_by = f"{who.name}#{who.discriminator}"
+                else:
+                    deleted_by = "The author or a bot"
+
+                embed = Embed(title="Message Deleted", color=0xFF0000)
+                embed.add_field(name="Deleted by:", value=deleted_by, inline=False)
+                embed.add_field(
+                    name=f"Author - {msg.author.name}#{msg.author.discriminator}",
+                    value=f"From {msg.channel.mention} - UID: {msg.author.id}",
+                )
+                embed.add_field(name="Message", value=msg.content, inline=False)
+
+                self.bot.log_embed(policy.log_channel, embed)
 
     @Cog.listener()
     async def on_command(self, ctx: Context):
@@ -212,10 +201,7 @@ class Core(commands.Cog):
             self.bot.log.info(f"{header} by `{author}` in `{location}`")
 
         if self.bot.delete_cmds:
-            try:
-                await ctx.message.delete(delay=2)
-            except Exception as e:
-                self.bot.log.warning(f"Unable to delete command message:\n    - {e}")
+            self.bot.deleter.schedule(ctx.message, 2)
 
     @Cog.listener()
     async def on_command_error(self, ctx: Context, error):
@@ -284,6 +270,35 @@ class Core(commands.Cog):
 
         embed.add_field(name="Plugins", value=f"[{', '.join(self.bot.plugins)}]")
         embed.add_field(name="Servers", value=str(len(self.bot.servers)))
+        embed.add_field(name="Pending Deletes", value=str(self.bot.deleter.depth))
+
+        blocks = self.bot.blocklist.counts()
+        embed.add_field(
+            name="Blocked Users",
+            value=f"global: {blocks['global']}, server: {blocks['guild']}",
+        )
+
+        queue = self.bot.send_queue
+        depths = ", ".join(f"{k}: {v}" for k, v in queue.lane_depths().items())
+        embed.add_field(
+            name="Send Queue",
+            value=f"{depths}\ncoalesced: {queue.stats['coalesced']}, "
+            f"dropped: {queue.stats['dropped']}",
+            inline=False,
+        )
+
+        pipeline = self.bot.log_pipeline
+        embed.add_field(
+            name="Log Queue",
+            value=f"queued: {pipeline.queued}, dropped: {pipeline.dropped}",
+        )
+
+        edits = self.edit_guard.stats
+        embed.add_field(
+            name="Edit Reruns",
+            value=f"run: {edits['reruns']}, "
+            f"suppressed: {edits['unchanged'] + edits['expired']}",
+        )
 
         # Just in case something happened initializing the app info
         if self.bot.app_info is not None:
@@ -297,30 +312,81 @@ class Core(commands.Cog):
 
     @commands.command(aliases=["bl"])
     @is_botmaster()
-    async def block(self, ctx: Context, target: User, block: bool = True):
-        """Add or remove a user from the block list.
+    async def block(
+        self,
+        ctx: Context,
+        target: User,
+        block: bool = True,
+        length: int = None,
+        span: str = "days",
+    ):
+        """Add or remove a user from the block list everywhere.
+        Add a length and span to block for a limited time, e.g. `block @user yes 3 days`
         Botmaster required.
         """
-        uid = str(target.id)
+        await self.set_block(ctx, target, block, length, span)
 
-        if uid in self.bot.blocklist:
-            # Trying to block a user who is already blocked
-            if block:
-                await ctx.send(f":anger: {target.name} is already blocked.")
-            # Unblock a user.
-            else:
-                self.bot.blocklist.remove(uid)
+    @commands.command(aliases=["gbl"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def guildblock(
+        self,
+        ctx: Context,
+        target: Member,
+        block: bool = True,
+        length: int = None,
+        span: str = "days",
+    ):
+        """Block or unblock a member from using commands on this server.
+        Add a length and span to block for a limited time, e.g. `gbl @user yes 1 day`
+        MUST HAVE SERVER ADMINISTRATOR PERMISSION
+        """
+        if target == ctx.author:
+            await ctx.send(":anger: You can't block yourself.")
+            return
+
+        await self.set_block(ctx, target, block, length, span, ctx.guild.id)
+
+    async def set_block(
+        self,
+        ctx: Context,
+        target: User,
+        block: bool,
+        length: int,
+        span: str,
+        guild_id: int = None,
+    ):
+        blocklist = self.bot.blocklist
+
+        if not block:
+            if blocklist.remove(target.id, guild_id):
                 await ctx.send(f":white_check_mark: {target.name} unblocked.")
-        else:
-            # Add a user to the blocklist
-            if block:
-                self.bot.blocklist.append(uid)
-                await ctx.send(f":white_check_mark: {target.name} blocked.")
-            # Trying to remove a user who is not blocklisted
             else:
                 await ctx.send(f":anger: {target.name} is not blocked.")
+            return
+
+        # Blocking again with a length changes how long the existing block lasts
+        if length is None and blocklist.get(target.id, guild_id) is not None:
+            await ctx.send(f":anger: {target.name} is already blocked.")
+            return
+
+        expires = None
+        duration = ""
+
+        if length is not None:
+            error = length_error(length, span)
+
+            if error is not None:
+                await ctx.send(f":anger: {error}")
+                return
+
+            now = datetime.now(tz=timezone.utc)
+            future = time_parser(span, length, now)
+            expires = future.timestamp()
+            duration = f" for {pretty_timedelta(future - now)}"
 
-        update_db(self.bot.db, self.bot.blocklist, "blocklist")
+        blocklist.add(target.id, guild_id, expires=expires, issuer=ctx.author.id)
+        await ctx.send(f":white_check_mark: {target.name} blocked{duration}.")
 
     @commands.group(name="logs", aliases=["log"])
     @commands.guild_only()
@@ -366,6 +432,7 @@ class Core(commands.Cog):
 
         self.bot.servers[sid]["log_edits"] = enabled
         update_db(self.bot.db, self.bot.servers, "servers")
+        self.bot.policies.invalidate(sid)
 
         await ctx.send(f":white_check_mark: Logging message edits set to {enabled}.")
 
@@ -383,6 +450,7 @@ class Core(commands.Cog):
 
         self.bot.servers[sid]["log_deletes"] = enabled
         update_db(self.bot.db, self.bot.servers, "servers")
+        self.bot.policies.invalidate(sid)
 
         await ctx.send(f":white_check_mark: Logging message deletes set to {enabled}.")
 
@@ -400,6 +468,7 @@ class Core(commands.Cog):
 
         self.bot.servers[sid]["log_channel"] = str(channel.id)
         update_db(self.bot.db, self.bot.servers, "servers")
+        self.bot.policies.invalidate(sid)
 
         await ctx.send(f":white_check_mark: Logging channel set to {channel.mention}.")
 
@@ -419,6 +488,7 @@ class Core(commands.Cog):
 
         self.bot.servers[sid]["report_ghosts"] = enabled
         update_db(self.bot.db, self.bot.servers, "servers")
+        self.bot.policies.invalidate(sid)
 
         await ctx.send(f":white_check_mark: Ghost reporting set to {enabled}.")
 
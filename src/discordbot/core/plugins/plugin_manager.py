@@ -24,21 +24,18 @@ class PluginManager(Cog):
         self.version = VERSION
 
     async def bot_check(self, ctx: Context):
-        try:
-            sid = str(ctx.guild.id)
-        except AttributeError:
-            # Assume all plugins are available in a direct message
+        # Assume all plugins are available in a direct message
+        if ctx.guild is None:
             return True
 
+        # Plugins default to enabled, so most servers have nothing to look up
+        disabled = ctx.bot.plugin_switches.disabled.get(ctx.guild.id)
+
         # Not a plugin
-        if ctx.cog is None:
+        if disabled is None or ctx.cog is None:
             return True
 
-        try:
-            return ctx.bot.servers[sid][ctx.cog.__class__.__name__.lower()]
-        except KeyError:
-            # Plugin will default to enabled if not set by a server admin
-            return True
+        return getattr(ctx.cog, "name", ctx.cog.qualified_name.lower()) not in disabled
 
     def copy_plugin_if_needed(self, name: str):
         # Check if this is running from a pyinstaller executable
@@ -165,11 +162,7 @@ class PluginManager(Cog):
             await ctx.send(f":anger: No plugin {name} is loaded.")
             return
         else:
-            sid = str(ctx.guild.id)
-
-            self.bot.servers[sid][name] = True
-
-            update_db(self.bot.db, self.bot.servers, "servers")
+            self.bot.plugin_switches.set_enabled(ctx.guild.id, name, True)
             await ctx.send(f":white_check_mark: Plugin {name} enabled on your server.")
 
     @cmd_plugins.command(name="disable")
@@ -182,11 +175,7 @@ class PluginManager(Cog):
             await ctx.send(f":anger: No plugin {name} is loaded.")
             return
         else:
-            sid = str(ctx.guild.id)
-
-            self.bot.servers[sid][name] = False
-
-            update_db(self.bot.db, self.bot.servers, "servers")
+            self.bot.plugin_switches.set_enabled(ctx.guild.id, name, False)
             await ctx.send(f":white_check_mark: Plugin {name} disabled on your server.")
 
 
@@ -0,0 +1,83 @@
+from typing import Callable, Dict, NamedTuple, Optional
+from discord import Guild, Role, TextChannel
+
+
+class GuildPolicy(NamedTuple):
+    """Immutable snapshot of what a guild has configured, read by event handlers."""
+
+    version: int = 0
+    # Core settings
+    report_ghosts: bool = False
+    log_edits: bool = False
+    log_deletes: bool = False
+    log_channel: Optional[TextChannel] = None
+    # Filled in by the Admin plugin when it's loaded
+    mod_log: bool = False
+    mod_log_channel: Optional[TextChannel] = None
+    mute_role: Optional[Role] = None
+
+
+def resolve_channel(guild: Guild, channel_id) -> Optional[TextChannel]:
+    if channel_id is None:
+        return None
+
+    return guild.get_channel(int(channel_id))
+
+
+class PolicyCache:
+    """Per-guild GuildPolicy snapshots, rebuilt only after that guild's config changes.
+
+    Plugins with their own settings register a provider, a function taking a Guild and
+    returning a dict of GuildPolicy fields.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.policies: Dict[int, GuildPolicy] = {}
+        self.versions: Dict[int, int] = {}
+        self.providers: Dict[str, Callable[[Guild], dict]] = {}
+
+    def add_provider(self, name: str, provider: Callable[[Guild], dict]):
+        self.providers[name] = provider
+        self.invalidate_all()
+
+    def remove_provider(self, name: str):
+        self.providers.pop(name, None)
+        self.invalidate_all()
+
+    def build(self, guild: Guild) -> GuildPolicy:
+        settings = self.bot.servers.get(str(guild.id), {})
+
+        fields = {
+            "report_ghosts": bool(settings.get("report_ghosts", False)),
+            "log_edits": bool(settings.get("log_edits", False)),
+            "log_deletes": bool(settings.get("log_deletes", False)),
+            "log_channel": resolve_channel(guild, settings.get("log_channel")),
+        }
+
+        for name, provider in self.providers.items():
+            try:
+                fields.update(provider(guild))
+            except Exception as e:
+                self.bot.log.error(f"[POLICY] {name} provider failed for {guild.id}: {e}")
+
+        version = self.versions.get(guild.id, 0) + 1
+        self.versions[guild.id] = version
+
+        return GuildPolicy(version=version, **fields)
+
+    def get(self, guild: Guild) -> GuildPolicy:
+        """Get the current policy for <guild>, building it if needed."""
+        policy = self.policies.get(guild.id)
+
+        if policy is None:
+            policy = self.policies[guild.id] = self.build(guild)
+
+        return policy
+
+    def invalidate(self, guild_id):
+        """Mark a guild's policy stale after its config changed."""
+        self.policies.pop(int(guild_id), None)
+
+    def invalidate_all(self):
+        self.policies.clear()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+from typing import AbstractSet, Iterable, List, Optional, Tuple
+from discord import HTTPException, NotFound
+
+from discordbot.core.delete_tools import BULK_AGE, BULK_MAX, BULK_MIN, snowflake_timestamp
+
+
+class PurgeJob:
+    """Delete messages from one or more channels, optionally only from some authors.
+
+    Up to <concurrency> channels are scanned at once, each looking through its latest
+    <limit> messages. Matches younger than 14 days are bulk deleted 100 at a time, older
+    ones go through one shared lane deleting a message every <single_delay> seconds, as
+    Discord's single delete limit is per guild. Authors are matched against a set of ids
+    worked out up front, so authors who have left still match.
+    """
+
+    def __init__(
+        self,
+        http,
+        channels: Iterable,
+        limit: int,
+        authors: Optional[AbstractSet[int]] = None,
+        *,
+        before=None,
+        concurrency: int = 3,
+        single_delay: float = 1.0,
+        now: float = None,
+    ):
+        self.http = http
+        self.channels = list(channels)
+        self.limit = limit
+        self.authors = authors
+        self.before = before
+        self.concurrency = concurrency
+        self.single_delay = single_delay
+
+        if now is None:
+            now = time.time()
+
+        # Leave a minute of leeway so a message doesn't age out mid-request
+        self.cutoff = now - BULK_AGE + 60
+        self.cancelled = False
+        self.single: Optional[asyncio.Queue] = None
+
+        # (channel, error) for channels that couldn't be read
+        self.errors: List[Tuple[object, HTTPException]] = []
+        self.stats = {"scanned": 0, "deleted": 0, "failed": 0, "channels": 0}
+
+    def matches(self, message) -> bool:
+        return self.authors is None or message.author.id in self.authors
+
+    def cancel(self):
+        """Stop scanning and drop any single deletes still waiting."""
+        self.cancelled = True
+
+    async def run(self) -> dict:
+        self.single = asyncio.Queue()
+        lane = asyncio.create_task(self.single_lane())
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def scan(channel):
+            async with semaphore:
+                await self.purge_channel(channel)
+
+        try:
+            await asyncio.gather(*(scan(c) for c in self.channels))
+            await self.single.join()
+        finally:
+            lane.cancel()
+
+        return self.stats
+
+    async def purge_channel(self, channel):
+        chunk = []
+
+        try:
+            async for message in channel.history(limit=self.limit, before=self.before):
+                if self.cancelled:
+                    break
+
+                self.stats["scanned"] += 1
+
+                if not self.matches(message):
+                    continue
+
+                if snowflake_timestamp(message.id) > self.cutoff:
+                    chunk.append(message.id)
+
+                    if len(chunk) >= BULK_MAX:
+                        await self.bulk_delete(channel.id, chunk)
+                        chunk = []
+                else:
+                    self.single.put_nowait((channel.id, message.id))
+        except HTTPException as e:
+            self.errors.append((channel, e))
+
+        if chunk and not self.cancelled:
+            await self.bulk_delete(channel.id, chunk)
+
+        self.stats["channels"] += 1
+
+    async def bulk_delete(self, channel_id: int, message_ids: List[int]):
+        if len(message_ids) >= BULK_MIN:
+            try:
+                await self.http.delete_messages(channel_id, message_ids)
+                self.stats["deleted"] += len(message_ids)
+                return
+            except HTTPException:
+                # Fall back to deleting one by one so one bad id doesn't keep the rest
+                pass
+
+        for message_id in message_ids:
+            self.single.put_nowait((channel_id, message_id))
+
+    async def single_lane(self):
+        while True:
+            channel_id, message_id = await self.single.get()
+
+            try:
+                if not self.cancelled:
+                    await self.http.delete_message(channel_id, message_id)
+                    self.stats["deleted"] += 1
+                    await asyncio.sleep(self.single_delay)
+            except NotFound:
+                # Already gone
+                pass
+            except Exception:
+                # Transport errors too, as a lane that stops leaves run() waiting forever
+                self.stats["failed"] += 1
+            finally:
+                self.single.task_done()
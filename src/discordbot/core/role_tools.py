@@ -0,0 +1,199 @@
+import asyncio
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import (
+    Awaitable,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+def reaction_diff(
+    reactors: Set[int], holders: Set[int], removals: bool = False
+) -> Tuple[List[int], List[int]]:
+    """Work out who should gain and lose a reaction role.
+
+    Returns (user ids to give the role, user ids to take it from). Holders who haven't
+    reacted are only included when <removals> is set, as they may have been given the
+    role some other way.
+    """
+    add = sorted(reactors - holders)
+    remove = sorted(holders - reactors) if removals else []
+
+    return add, remove
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    batch = []
+
+    for item in items:
+        batch.append(item)
+
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+class RoleChangeQueue:
+    """Per-guild queues of reaction role changes, applied by one paced worker each.
+
+    A change that reverses one still waiting in the queue (reacting then un-reacting)
+    cancels it instead of being queued, so neither reaches Discord. Members who asked
+    to be notified get one digest of their applied changes per <digest> seconds.
+    """
+
+    def __init__(
+        self,
+        apply: Callable[[int, int, int, bool], Awaitable[bool]],
+        notify: Callable[[int, int, List[int], List[int]], Awaitable[None]],
+        interval: float = 0.5,
+        digest: float = 10.0,
+    ):
+        """<apply> makes a change and returns whether anything changed, <notify> sends
+        a member the role ids they were given and lost.
+        """
+        self.apply = apply
+        self.notify = notify
+        self.interval = interval
+        self.digest = digest
+
+        # Guild id -> (member id, role id) -> (give, notify), in arrival order
+        self.pending: Dict[int, "OrderedDict[Tuple[int, int], Tuple[bool, bool]]"] = {}
+        self.workers: Dict[int, asyncio.Task] = {}
+        # (guild id, member id) -> (role ids given, role ids taken)
+        self.digests: Dict[Tuple[int, int], Tuple[List[int], List[int]]] = {}
+
+        self.stats = {"queued": 0, "cancelled": 0, "applied": 0, "failed": 0}
+
+    @property
+    def depth(self) -> int:
+        return sum(len(p) for p in self.pending.values())
+
+    def put(self, guild_id: int, member_id: int, role_id: int, give: bool, notify: bool):
+        pending = self.pending.setdefault(guild_id, OrderedDict())
+        key = (member_id, role_id)
+        waiting = pending.get(key)
+
+        if waiting is not None and waiting[0] != give:
+            del pending[key]
+            self.stats["cancelled"] += 1
+        elif waiting is None:
+            pending[key] = (give, notify)
+            self.stats["queued"] += 1
+
+        if guild_id not in self.workers:
+            self.workers[guild_id] = asyncio.create_task(self.work(guild_id))
+
+    async def work(self, guild_id: int):
+        pending = self.pending[guild_id]
+
+        try:
+            while pending:
+                (member_id, role_id), (give, notify) = pending.popitem(last=False)
+
+                try:
+                    changed = await self.apply(guild_id, member_id, role_id, give)
+                except Exception:
+                    self.stats["failed"] += 1
+                    changed = False
+
+                if changed:
+                    self.stats["applied"] += 1
+
+                    if notify:
+                        self.record(guild_id, member_id, role_id, give)
+
+                await asyncio.sleep(self.interval)
+        finally:
+            self.pending.pop(guild_id, None)
+            self.workers.pop(guild_id, None)
+
+    def record(self, guild_id: int, member_id: int, role_id: int, give: bool):
+        key = (guild_id, member_id)
+
+        if key not in self.digests:
+            self.digests[key] = ([], [])
+            asyncio.get_event_loop().call_later(self.digest, self.send_digest, key)
+
+        given, taken = self.digests[key]
+        same, opposite = (given, taken) if give else (taken, given)
+
+        # Given and taken again within the digest isn't worth mentioning
+        if role_id in opposite:
+            opposite.remove(role_id)
+        else:
+            same.append(role_id)
+
+    def send_digest(self, key: Tuple[int, int]):
+        given, taken = self.digests.pop(key, ([], []))
+
+        if given or taken:
+            asyncio.create_task(self.notify(key[0], key[1], given, taken))
+
+    def cancel(self):
+        for worker in self.workers.values():
+            worker.cancel()
+
+
+def split_role_names(
+    text: str, assignable: Container[str]
+) -> Tuple[List[str], List[str]]:
+    """Split a comma-separated list of role names into (assignable, unknown) names.
+
+    Names are lowercased and duplicates dropped. Text that is itself an assignable name
+    is kept whole, so roles with commas in their names still work.
+    """
+    text = text.strip().lower()
+
+    if text in assignable:
+        return [text], []
+
+    names = list(dict.fromkeys(n.strip() for n in text.split(",") if n.strip()))
+
+    return [n for n in names if n in assignable], [
+        n for n in names if n not in assignable
+    ]
+
+
+def select_members(
+    members: Iterable,
+    *,
+    has_role: int = None,
+    joined_after: datetime = None,
+    joined_before: datetime = None,
+    bots: bool = None,
+) -> List[int]:
+    """Get the ids of cached members matching every filter that was given."""
+    selected = []
+
+    for member in members:
+        if bots is not None and member.bot != bots:
+            continue
+
+        if has_role is not None and not any(r.id == has_role for r in member.roles):
+            continue
+
+        joined = member.joined_at
+
+        if joined_after is not None and (joined is None or joined < joined_after):
+            continue
+
+        if joined_before is not None and (joined is None or joined > joined_before):
+            continue
+
+        selected.append(member.id)
+
+    return selected
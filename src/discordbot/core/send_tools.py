@@ -0,0 +1,335 @@
+import asyncio
+
+from collections import deque
+from enum import IntEnum
+from typing import Dict, List, Set
+
+from discord import Embed
+from discord.http import Route
+
+# Discord's message length limit
+MESSAGE_LIMIT = 2000
+# Discord's limits for embeds in a single message
+EMBEDS_PER_MESSAGE = 10
+EMBED_TOTAL_LIMIT = 6000
+FIELD_VALUE_LIMIT = 1024
+# Only plain messages shorter than this are merged with their neighbours
+COALESCE_LENGTH = 300
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+def clamp_embed(embed: Embed) -> Embed:
+    """Truncate field values so <embed> fits within Discord's size limits."""
+    fields = embed.to_dict().get("fields", [])
+
+    for i, field in enumerate(fields):
+        if len(field["value"]) > FIELD_VALUE_LIMIT:
+            value = field["value"][: FIELD_VALUE_LIMIT - 3] + "..."
+            embed.set_field_at(i, name=field["name"], value=value, inline=field["inline"])
+
+    # Cut the longest field until the whole embed fits
+    while len(embed) > EMBED_TOTAL_LIMIT and fields:
+        fields = embed.to_dict()["fields"]
+        i, field = max(enumerate(fields), key=lambda f: len(f[1]["value"]))
+
+        if len(field["value"]) <= 3:
+            # Nothing left to cut, the title or footer is too long on its own
+            break
+
+        keep = max(len(field["value"]) - (len(embed) - EMBED_TOTAL_LIMIT) - 3, 0)
+        value = field["value"][:keep] + "..."
+        embed.set_field_at(i, name=field["name"], value=value, inline=field["inline"])
+
+    return embed
+
+
+def batch_embeds(embeds: List[Embed]) -> List[List[Embed]]:
+    """Group embeds into as few messages as Discord's per-message limits allow."""
+    batches = []
+    batch = []
+    size = 0
+
+    for embed in embeds:
+        length = len(clamp_embed(embed))
+
+        if batch and (
+            len(batch) >= EMBEDS_PER_MESSAGE or size + length > EMBED_TOTAL_LIMIT
+        ):
+            batches.append(batch)
+            batch = []
+            size = 0
+
+        batch.append(embed)
+        size += length
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+class SendItem:
+    __slots__ = (
+        "destination",
+        "key",
+        "content",
+        "embed",
+        "embeds",
+        "priority",
+        "futures",
+    )
+
+    def __init__(
+        self,
+        destination,
+        content: str,
+        embed: Embed,
+        priority: Priority,
+        embeds: List[Embed] = None,
+    ):
+        self.destination = destination
+        # Context and Message objects send to their channel, everything else to itself
+        self.key = getattr(destination, "channel", destination).id
+        self.content = content
+        self.embed = embed
+        self.embeds = embeds
+        self.priority = priority
+        self.futures = [asyncio.get_event_loop().create_future()]
+
+    @property
+    def mergeable(self) -> bool:
+        return (
+            self.embed is None
+            and self.embeds is None
+            and self.content is not None
+            and len(self.content) < COALESCE_LENGTH
+        )
+
+    def merge(self, other: "SendItem") -> bool:
+        """Fold <other> into this item if both are short plain messages to one place."""
+        if other.key != self.key or not (self.mergeable and other.mergeable):
+            return False
+
+        content = f"{self.content}\n{other.content}"
+
+        if len(content) > MESSAGE_LIMIT:
+            return False
+
+        self.content = content
+        self.futures.extend(other.futures)
+        return True
+
+
+class SendQueue:
+    """Prioritized outbound message queue.
+
+    Messages wait in one lane per priority and the highest lane is always served first.
+    Consecutive short messages to the same channel in a lane are coalesced into one.
+    Sends to a channel keep their order, while different channels send concurrently.
+    When the queue is full, low priority messages are dropped to make room.
+    """
+
+    def __init__(self, bot, max_size: int = 500, concurrency: int = 4):
+        self.bot = bot
+        self.max_size = max_size
+        self.lanes = [deque() for _ in Priority]
+        self.locks: Dict[int, asyncio.Lock] = {}
+        self.semaphore = None
+        self.wakeup = None
+        self.concurrency = concurrency
+        self.task = None
+        # Deliveries in flight, kept so drain() can wait for them
+        self.delivering: Set[asyncio.Task] = set()
+
+        self.stats = {"sent": 0, "coalesced": 0, "dropped": 0, "failed": 0}
+
+    @property
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def lane_depths(self) -> Dict[str, int]:
+        return {p.name.lower(): len(self.lanes[p]) for p in Priority}
+
+    def make_room(self, priority: Priority) -> bool:
+        """Drop the oldest message of a lower priority, return False if there is none."""
+        for lane in reversed(Priority):
+            if lane <= priority:
+                break
+
+            if self.lanes[lane]:
+                dropped = self.lanes[lane].popleft()
+
+                for future in dropped.futures:
+                    future.set_result(None)
+
+                self.stats["dropped"] += len(dropped.futures)
+                return True
+
+        return False
+
+    def put(
+        self,
+        destination,
+        content: str = None,
+        *,
+        embed: Embed = None,
+        embeds: List[Embed] = None,
+        priority: Priority = Priority.NORMAL,
+    ) -> asyncio.Future:
+        """Queue a message, returns a future for the sent Message or None if dropped."""
+        item = SendItem(destination, content, embed, priority, embeds)
+
+        # High priority messages are never dropped, even when over the limit
+        if self.depth >= self.max_size and not self.make_room(priority):
+            if priority != Priority.HIGH:
+                self.stats["dropped"] += 1
+                item.futures[0].set_result(None)
+                return item.futures[0]
+
+        lane = self.lanes[priority]
+
+        if lane and lane[-1].merge(item):
+            self.stats["coalesced"] += 1
+        else:
+            lane.append(item)
+
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+        return item.futures[0]
+
+    def next_item(self) -> SendItem:
+        for lane in self.lanes:
+            if lane:
+                return lane.popleft()
+
+        return None
+
+    async def deliver(self, item: SendItem):
+        lock = self.locks.setdefault(item.key, asyncio.Lock())
+
+        try:
+            async with lock:
+                if item.embeds is not None:
+                    message = await self.send_embeds(item)
+                else:
+                    message = await item.destination.send(item.content, embed=item.embed)
+
+                self.stats["sent"] += 1
+        except Exception as e:
+            message = None
+            self.stats["failed"] += 1
+            self.bot.log.warning(f"[SEND] Unable to send to {item.key}: {e}")
+        finally:
+            self.semaphore.release()
+
+        for future in item.futures:
+            if not future.done():
+                future.set_result(message)
+
+    async def send_embeds(self, item: SendItem) -> dict:
+        # Messageable.send only takes a single embed, so post the payload directly
+        route = Route("POST", "/channels/{channel_id}/messages", channel_id=item.key)
+        payload = {"embeds": [e.to_dict() for e in item.embeds]}
+
+        if item.content is not None:
+            payload["content"] = item.content
+
+        return await self.bot.http.request(route, json=payload)
+
+    async def run(self):
+        while True:
+            # Wait for a free slot before picking, so late high priority messages still
+            # jump ahead of everything that is waiting
+            await self.semaphore.acquire()
+
+            item = self.next_item()
+
+            while item is None:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                item = self.next_item()
+
+            # Tasks take the channel lock in creation order, which keeps sends in order
+            task = asyncio.create_task(self.deliver(item))
+            self.delivering.add(task)
+            task.add_done_callback(self.delivering.discard)
+
+    def start(self):
+        """Start the background send task if it isn't already running."""
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.task = asyncio.create_task(self.run())
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Wait up to <timeout> seconds for queued and in flight messages to be sent,
+        returns False if some were still waiting."""
+        if self.task is None or self.task.done():
+            return self.depth == 0
+
+        pending = {f for lane in self.lanes for item in lane for f in item.futures}
+        pending |= self.delivering
+
+        if not pending:
+            return True
+
+        _, waiting = await asyncio.wait(pending, timeout=timeout)
+        return not waiting
+
+
+class EmbedBatcher:
+    """Buffer embeds per channel and send them as multi-embed messages.
+
+    Embeds for a channel are held for <window> seconds after the first one arrives,
+    then flushed through the send queue in as few messages as the limits allow.
+    """
+
+    def __init__(self, queue: SendQueue, window: float = 2.0):
+        self.queue = queue
+        self.window = window
+        self.buffers: Dict[int, list] = {}
+        self.timers: Dict[int, asyncio.TimerHandle] = {}
+        self.stats = {"embeds": 0, "messages": 0}
+
+    @property
+    def depth(self) -> int:
+        return sum(len(b) for b in self.buffers.values())
+
+    def add(self, channel, embed: Embed, immediate: bool = False):
+        """Buffer <embed> for <channel>, flushing it at once if <immediate>."""
+        self.buffers.setdefault(channel.id, []).append((channel, embed))
+        self.stats["embeds"] += 1
+
+        if immediate:
+            self.flush(channel.id, Priority.HIGH)
+        elif channel.id not in self.timers:
+            loop = asyncio.get_event_loop()
+            self.timers[channel.id] = loop.call_later(self.window, self.flush, channel.id)
+
+    def flush(self, key: int, priority: Priority = Priority.NORMAL):
+        timer = self.timers.pop(key, None)
+
+        if timer is not None:
+            timer.cancel()
+
+        buffered = self.buffers.pop(key, [])
+
+        if not buffered:
+            return
+
+        channel = buffered[0][0]
+
+        for batch in batch_embeds([embed for _, embed in buffered]):
+            self.queue.put(channel, embeds=batch, priority=priority)
+            self.stats["messages"] += 1
+
+    def flush_all(self):
+        """Queue everything still buffered, used when the bot closes."""
+        for key in list(self.buffers):
+            self.flush(key)
@@ -0,0 +1,174 @@
+import sys
+
+from collections import OrderedDict, deque
+from typing import Deque, Hashable, List, NamedTuple, Optional, Tuple
+
+# The duplicates buffer holds up to this many times the rule's limit, so other
+# messages sent in between can't push earlier copies out
+DUPLICATES_CAP = 10
+
+
+class SpamRule(NamedTuple):
+    """How many messages, mentions or duplicate messages are allowed within a window."""
+
+    messages: int = 6
+    messages_per: float = 5.0
+    mentions: int = 10
+    mentions_per: float = 15.0
+    duplicates: int = 4
+    duplicates_per: float = 30.0
+
+
+class UserWindow:
+    """Fixed-size ring buffers of one user's recent activity in one guild.
+
+    The message and mention buffers hold at most as many entries as their limit, so a
+    full buffer whose oldest entry is still inside the window means the limit was hit.
+    Duplicates are compared across every message in their window instead, as copies
+    may be interleaved with other messages.
+    """
+
+    __slots__ = ("rule", "last_seen", "messages", "mentions", "duplicates")
+
+    def __init__(self, rule: SpamRule):
+        self.rule = rule
+        self.last_seen = 0.0
+        # (timestamp, channel id, message id)
+        self.messages: Deque[Tuple[float, int, int]] = deque(maxlen=rule.messages)
+        # (timestamp, mention count), only for messages with mentions
+        self.mentions: Deque[Tuple[float, int]] = deque(maxlen=rule.mentions)
+        # (timestamp, content hash)
+        self.duplicates: Deque[Tuple[float, int]] = deque(
+            maxlen=rule.duplicates * DUPLICATES_CAP
+        )
+
+    def add(self, now: float, channel_id: int, message_id: int, mentions: int, digest):
+        self.last_seen = now
+        self.messages.append((now, channel_id, message_id))
+
+        if mentions:
+            self.mentions.append((now, mentions))
+
+        # Messages with no text (attachments, stickers, embeds) are never duplicates
+        if digest is not None:
+            duplicates = self.duplicates
+            since = now - self.rule.duplicates_per
+
+            while duplicates and duplicates[0][0] < since:
+                duplicates.popleft()
+
+            duplicates.append((now, digest))
+
+    def check(self, now: float, digest) -> Optional[str]:
+        """Get the reason this window counts as spam, or None."""
+        rule = self.rule
+        messages = self.messages
+
+        if len(messages) == rule.messages and now - messages[0][0] <= rule.messages_per:
+            return f"{rule.messages} messages in {rule.messages_per:g}s"
+
+        since = now - rule.mentions_per
+        mentions = sum(count for stamp, count in self.mentions if stamp >= since)
+
+        if mentions >= rule.mentions:
+            return f"{mentions} mentions in {rule.mentions_per:g}s"
+
+        if digest is None:
+            return None
+
+        since = now - rule.duplicates_per
+        duplicates = sum(
+            1 for stamp, other in self.duplicates if other == digest and stamp >= since
+        )
+
+        if duplicates >= rule.duplicates:
+            return f"{duplicates} duplicate messages in {rule.duplicates_per:g}s"
+
+        return None
+
+    def recent(self) -> List[Tuple[int, int]]:
+        """Get (channel id, message id) of the messages still in the buffer."""
+        return [(channel_id, message_id) for _, channel_id, message_id in self.messages]
+
+    def size(self) -> int:
+        """Approximate memory used by this window in bytes."""
+        size = sys.getsizeof(self)
+
+        for buffer in (self.messages, self.mentions, self.duplicates):
+            size += sys.getsizeof(buffer)
+            size += sum(sys.getsizeof(entry) for entry in buffer)
+
+        return size
+
+
+class SpamDetector:
+    """Sliding-window spam detection for every active (guild, user) pair.
+
+    Windows are kept in least recently active order, so idle ones are evicted from the
+    front in constant time per message and memory stays bounded by <max_users>.
+    """
+
+    def __init__(self, idle: float = 120.0, max_users: int = 20000):
+        self.idle = idle
+        self.max_users = max_users
+        self.windows: "OrderedDict[Hashable, UserWindow]" = OrderedDict()
+
+        self.stats = {"checked": 0, "flagged": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    def evict(self, now: float):
+        windows = self.windows
+        cutoff = now - self.idle
+
+        while windows:
+            key, window = next(iter(windows.items()))
+
+            if window.last_seen >= cutoff and len(windows) <= self.max_users:
+                break
+
+            del windows[key]
+            self.stats["evicted"] += 1
+
+    def check(
+        self,
+        key: Hashable,
+        rule: SpamRule,
+        now: float,
+        channel_id: int,
+        message_id: int,
+        mentions: int,
+        content: str,
+    ) -> Optional[str]:
+        """Record a message and get the reason its author is spamming, or None."""
+        self.stats["checked"] += 1
+
+        window = self.windows.get(key)
+
+        # A changed rule means the buffers need different sizes, so start over
+        if window is None or window.rule is not rule:
+            window = self.windows[key] = UserWindow(rule)
+
+        self.windows.move_to_end(key)
+
+        normalized = content.casefold().strip()
+        digest = hash(normalized) if normalized else None
+        window.add(now, channel_id, message_id, mentions, digest)
+
+        self.evict(now)
+
+        reason = window.check(now, digest)
+
+        if reason is not None:
+            self.stats["flagged"] += 1
+
+        return reason
+
+    def pop(self, key: Hashable) -> Optional[UserWindow]:
+        """Stop tracking <key>, returning its window if it had one."""
+        return self.windows.pop(key, None)
+
+    def memory(self) -> int:
+        """Approximate memory used by all windows in bytes."""
+        return sys.getsizeof(self.windows) + sum(w.size() for w in self.windows.values())
@@ -1,4 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+SPANS = ("seconds", "minutes", "hours", "days", "weeks", "months", "years", "max")
 
 
 def pretty_datetime(dt: datetime, display: str = "FULL") -> str:
@@ -57,3 +60,18 @@ def time_parser(span: str, length: int, dt: datetime) -> datetime:
         raise KeyError("Time parser length/span is not valid.")
 
     return dt + case()
+
+
+def length_error(length: int, span: str) -> Optional[str]:
+    """Get an error message for a length/span combo time_parser can't use, or None."""
+    if length <= 0:
+        return "Length must be more than 0."
+
+    try:
+        time_parser(span, length, datetime.now(tz=timezone.utc))
+    except KeyError:
+        return f"Span must be one of: {', '.join(SPANS)}"
+    except OverflowError:
+        return "That length is too long."
+
+    return None
@@ -66,6 +66,10 @@ def main():
 
             bot.first_launch = False
 
+        bot.deleter.start()
+        bot.blocklist.start()
+        bot.send_queue.start()
+
         bot.log.info(bot.mission_control())
 
         # Ensure all currently joined severs are registered
@@ -5,13 +5,15 @@ import json
 
 from datetime import datetime, timedelta, timezone
 from sqlitedict import SqliteDict
-from discord import Member, Role, TextChannel, Embed, Object
+from discord import Member, Role, TextChannel, Embed, Object, Guild
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from discordbot.core.discord_bot import DiscordBot
 from discordbot.core.db_tools import update_db
 from discordbot.core.time_tools import pretty_datetime, pretty_timedelta, time_parser
+from discordbot.core.send_tools import Priority
+from discordbot.core.policy_tools import resolve_channel
 
 VERSION = "2.7b6"
 
@@ -182,29 +184,45 @@ class Admin(commands.Cog):
         self.warn_db = self.sql_db["warns"]
         self.mute_db = self.sql_db["mutes"]
 
+        self.bot.policies.add_provider("admin", self.policy_settings)
+
         asyncio.create_task(self.task_scheduler())
 
+    def policy_settings(self, guild: Guild) -> dict:
+        """Admin's fields for the guild's policy snapshot."""
+        settings = self.db.get(str(guild.id), {})
+        mute_role = settings.get("mute_role")
+
+        return {
+            "mod_log": bool(settings.get("log", False)),
+            "mod_log_channel": resolve_channel(guild, settings.get("log_channel")),
+            "mute_role": guild.get_role(int(mute_role)) if mute_role else None,
+        }
+
+    def cog_unload(self):
+        self.bot.policies.remove_provider("admin")
+
     async def log_to_channel(self, ctx: Context, target: Member, info: str = None):
         """Send an embed-formatted log of an event to a channel."""
-        sid = str(ctx.guild.id)
-        channel = None
-        enabled = True
-        action = ctx.message.content
+        self.log_action(
+            ctx.guild, ctx.author, ctx.command.name, ctx.message.content, target, info
+        )
 
-        if sid in self.db:
-            try:
-                channel = ctx.guild.get_channel(int(self.db[sid]["log_channel"]))
-            except KeyError:
-                channel = None
-            try:
-                enabled = self.db[sid]["log"]
-            except KeyError:
-                enabled = False
-        else:
-            channel = ctx.channel
-            enabled = False
+    def log_action(
+        self,
+        guild: Guild,
+        actor: Member,
+        name: str,
+        action: str,
+        target: Member,
+        info: str = None,
+    ):
+        """Log a moderation action by <actor> to the server's log channel, if enabled.
+        Also used by other plugins taking automatic actions.
+        """
+        policy = self.bot.policies.get(guild)
 
-        if not enabled:
+        if not policy.mod_log or policy.mod_log_channel is None:
             return
 
         if info is None:
@@ -212,17 +230,14 @@ class Admin(commands.Cog):
 
         tag = f"{target.name}#{target.discriminator} ({target.id})"
 
-        embed = Embed(
-            title=f"{ctx.author.name}#{ctx.author.discriminator} {ctx.command.name}",
-            color=0xFF0000,
-        )
-        embed.set_thumbnail(url=str(ctx.author.avatar_url))
+        embed = Embed(title=f"{actor.name}#{actor.discriminator} {name}", color=0xFF0000)
+        embed.set_thumbnail(url=str(actor.avatar_url))
         embed.add_field(name="Action", value=action, inline=False)
         embed.add_field(name="Target", value=tag)
         embed.add_field(name="Info", value=info)
         embed.set_footer(text=pretty_datetime(datetime.now()))
 
-        await channel.send(embed=embed)
+        self.bot.log_embed(policy.mod_log_channel, embed, immediate=True)
 
     @commands.group()
     @commands.has_permissions(administrator=True)
@@ -280,6 +295,7 @@ class Admin(commands.Cog):
             channel = ctx.message.channel
 
         update_db(self.sql_db, self.db, "admin")
+        self.bot.policies.invalidate(sid)
 
         embed = Embed(title="Log Settings", color=0xFF0000)
         embed.add_field(name="Enabled", value=str(enabled))
@@ -302,6 +318,7 @@ class Admin(commands.Cog):
         self.db[sid]["mute_role"] = str(role.id)
 
         update_db(self.sql_db, self.db, "admin")
+        self.bot.policies.invalidate(sid)
 
         await ctx.send(f":white_check_mark: Mute role set to: {role.name}.")
 
@@ -314,12 +331,14 @@ class Admin(commands.Cog):
         """
         embed = await embed_builder("Kicked", target, reason)
 
-        await target.send(embed=embed)
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
 
         await target.kick(reason=reason)
 
         tag = f"{target.name}#{target.discriminator}"
-        await ctx.send(f":white_check_mark: Kicked {tag} for {reason}")
+        await self.bot.queue_send(
+            ctx, f":white_check_mark: Kicked {tag} for {reason}", priority=Priority.HIGH
+        )
         await self.log_to_channel(ctx, target, reason)
 
     @commands.command(aliases=["sban"])
@@ -333,13 +352,17 @@ class Admin(commands.Cog):
         """
         embed = await embed_builder("Kicked", target, reason)
 
-        await target.send(embed=embed)
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
 
         await target.ban(reason=f"Softbanned: {reason}", delete_message_days=purge)
         await target.unban(reason="Softban removal")
 
         tag = f"{target.name}#{target.discriminator}"
-        await ctx.send(f":white_check_mark: Softbanned {tag} for {reason}")
+        await self.bot.queue_send(
+            ctx,
+            f":white_check_mark: Softbanned {tag} for {reason}",
+            priority=Priority.HIGH,
+        )
         await self.log_to_channel(ctx, target, reason)
 
     @commands.command()
@@ -353,12 +376,14 @@ class Admin(commands.Cog):
         """
         embed = await embed_builder("Permanently Banned", target, reason)
 
-        await target.send(embed=embed)
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
 
         await target.ban(reason=reason, delete_message_days=purge)
 
         tag = f"{target.name}#{target.discriminator}"
-        await ctx.send(f":white_check_mark: Banned {tag} for {reason}")
+        await self.bot.queue_send(
+            ctx, f":white_check_mark: Banned {tag} for {reason}", priority=Priority.HIGH
+        )
         await self.log_to_channel(ctx, target, reason)
 
     @commands.command()
@@ -370,7 +395,9 @@ class Admin(commands.Cog):
         Ban member permission required.
         """
         await ctx.guild.ban(Object(int(tid)), reason=reason, delete_message_days=purge)
-        await ctx.send(f":white_check_mark: Banned {tid} for {reason}")
+        await self.bot.queue_send(
+            ctx, f":white_check_mark: Banned {tid} for {reason}", priority=Priority.HIGH
+        )
 
     @commands.command(aliases=["tban"])
     @commands.has_permissions(ban_members=True)
@@ -395,7 +422,7 @@ class Admin(commands.Cog):
 
         embed = await embed_builder("Temporarily Banned", target, reason, length)
 
-        await target.send(embed=embed)
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
 
         await target.ban(reason=reason, delete_message_days=0)
 
@@ -408,7 +435,11 @@ class Admin(commands.Cog):
         update_db(self.sql_db, self.tempban_db, "temp_bans")
 
         tag = f"{target.name}#{target.discriminator}"
-        await ctx.send(f":white_check_mark: Tempbanned {tag} for {reason}")
+        await self.bot.queue_send(
+            ctx,
+            f":white_check_mark: Tempbanned {tag} for {reason}",
+            priority=Priority.HIGH,
+        )
         await self.log_to_channel(ctx, target, reason)
 
     @commands.command()
@@ -422,7 +453,20 @@ class Admin(commands.Cog):
         Use "max" as the span for pseudo-permanence (10 years).
         Kick member permission required.
         """
-        sid = str(ctx.guild.id)
+        warn_count = await self.apply_warn(target, ctx.author, length, span, reason)
+
+        await self.bot.queue_send(
+            ctx,
+            f":warning: Warning {warn_count} issued to {target.name} for {reason}",
+            priority=Priority.HIGH,
+        )
+        await self.log_to_channel(ctx, target, reason)
+
+    async def apply_warn(
+        self, target: Member, issuer: Member, length: int, span: str, reason: str
+    ) -> int:
+        """Record a warning and notify <target>, returns the warning's number."""
+        sid = str(target.guild.id)
         uid = str(target.id)
         warn_count = 1
 
@@ -440,10 +484,9 @@ class Admin(commands.Cog):
 
         embed = await embed_builder("Warned", target, reason, length)
 
-        await target.send(embed=embed)
-        await target.send(f":warning: This is warning #{warn_count}.")
-        await ctx.send(
-            f":warning: Warning {warn_count} issued to {target.name} for {reason}"
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
+        await self.bot.queue_send(
+            target, f":warning: This is warning #{warn_count}.", priority=Priority.HIGH
         )
 
         if uid not in self.warn_db[sid]:
@@ -459,14 +502,14 @@ class Admin(commands.Cog):
         warn_count = db_check(warn_count)
 
         warning = {
-            "issued_by": str(ctx.author.id),
+            "issued_by": str(issuer.id),
             "reason": reason,
             "expires": str(future.timestamp()),
         }
         self.warn_db[sid][uid][str(warn_count)] = warning
 
         update_db(self.sql_db, self.warn_db, "warns")
-        await self.log_to_channel(ctx, target, reason)
+        return warn_count
 
     @commands.group()
     @commands.guild_only()
@@ -548,9 +591,15 @@ class Admin(commands.Cog):
         for i, w in self.warn_db[sid][tid].items():
             if i == str(number):
                 del self.warn_db[sid][tid][i]
-                await ctx.send(f":white_check_mark: Warn #{i} (`{w['reason']}`) removed.")
-                await target.send(
-                    f"Warn #{i} for `{w['reason']}` in {ctx.guild.name} has been removed."
+                await self.bot.queue_send(
+                    ctx,
+                    f":white_check_mark: Warn #{i} (`{w['reason']}`) removed.",
+                    priority=Priority.HIGH,
+                )
+                await self.bot.queue_send(
+                    target,
+                    f"Warn #{i} for `{w['reason']}` in {ctx.guild.name} has been removed.",
+                    priority=Priority.HIGH,
                 )
                 break
 
@@ -565,16 +614,32 @@ class Admin(commands.Cog):
         Use "max" as the span for pseudo-permanence (10 years).
         Kick member permission required.
         """
-        sid = str(ctx.guild.id)
-        uid = str(target.id)
-        mute_role = None
+        time = await self.apply_mute(target, ctx.author, length, span, reason)
 
-        try:
-            mute_role = ctx.guild.get_role(int(self.db[sid]["mute_role"]))
-        except KeyError:
+        if time is None:
             await ctx.send(":anger: Server has no mute role set.")
             return
 
+        await self.bot.queue_send(
+            ctx,
+            f":white_check_mark: {target.name} muted for {reason}, expires in {time}",
+            priority=Priority.HIGH,
+        )
+        await self.log_to_channel(ctx, target, reason)
+
+    async def apply_mute(
+        self, target: Member, issuer: Member, length: int, span: str, reason: str
+    ) -> str:
+        """Give <target> the mute role until it expires.
+        Returns the mute's length as text, or None if the server has no mute role.
+        """
+        sid = str(target.guild.id)
+        uid = str(target.id)
+        mute_role = self.bot.policies.get(target.guild).mute_role
+
+        if mute_role is None:
+            return None
+
         if sid not in self.mute_db:
             self.mute_db[sid] = {}
 
@@ -582,19 +647,14 @@ class Admin(commands.Cog):
         now = datetime.now(tz=timezone.utc)
         future = time_parser(span, length, now)
         length = future - now
-        time = pretty_timedelta(length)
 
         embed = await embed_builder("Muted", target, reason, length)
 
-        await target.send(embed=embed)
-        await ctx.send(
-            f":white_check_mark: {target.name} muted for {reason}, expires in {time}"
-        )
-
+        await self.bot.queue_send(target, embed=embed, priority=Priority.HIGH)
         await target.add_roles(mute_role)
 
         mute = {
-            "issued_by": str(ctx.author.id),
+            "issued_by": str(issuer.id),
             "reason": reason,
             "expires": str(future.timestamp()),
         }
@@ -602,7 +662,7 @@ class Admin(commands.Cog):
         self.mute_db[sid][uid] = mute
 
         update_db(self.sql_db, self.mute_db, "mutes")
-        await self.log_to_channel(ctx, target, reason)
+        return pretty_timedelta(length)
 
     @commands.command()
     @commands.has_permissions(kick_members=True)
@@ -629,8 +689,14 @@ class Admin(commands.Cog):
             await ctx.send(":anger: This member is not muted.")
             return
 
-        await target.send(f":speaking_head: You have been unmuted in {ctx.guild.name}.")
-        await ctx.send(f":speaking_head: Unmuted {target.name}.")
+        await self.bot.queue_send(
+            target,
+            f":speaking_head: You have been unmuted in {ctx.guild.name}.",
+            priority=Priority.HIGH,
+        )
+        await self.bot.queue_send(
+            ctx, f":speaking_head: Unmuted {target.name}.", priority=Priority.HIGH
+        )
 
         await target.remove_roles(mute_role)
         del self.mute_db[sid][uid]
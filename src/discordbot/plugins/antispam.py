@@ -0,0 +1,276 @@
+import os
+import shutil
+import json
+import time
+
+from datetime import datetime
+from typing import Dict
+from sqlitedict import SqliteDict
+from discord import Member, Embed
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from discordbot.core.discord_bot import DiscordBot
+from discordbot.core.db_tools import update_db
+from discordbot.core.time_tools import length_error, pretty_datetime
+from discordbot.core.message_tools import MessageView
+from discordbot.core.spam_tools import SpamDetector, SpamRule
+
+VERSION = "1.0b1"
+
+# Setting name -> (count field, window field) of SpamRule
+LIMITS = {
+    "messages": ("messages", "messages_per"),
+    "mentions": ("mentions", "mentions_per"),
+    "duplicates": ("duplicates", "duplicates_per"),
+}
+
+
+class Antispam(commands.Cog):
+    """Anti-spam plugin.
+
+    Mutes members who send too many messages, mentions or duplicate messages in a short
+    time, using the Admin plugin's mute role.
+    """
+
+    def __init__(self, bot: DiscordBot):
+        self.bot = bot
+        self.name = "antispam"
+        self.version = VERSION
+        self.backup = True
+
+        try:
+            with open("config/config.json") as cfg:
+                self.backup = json.load(cfg)["BackupDB"]
+        except Exception as error:
+            self.bot.log.error(f"Error loading from config file:\n    - {error}")
+
+        db_file = "db/antispam.sql"
+
+        if os.path.exists(db_file) and self.backup:
+            timestamp = pretty_datetime(datetime.now(), display="FILE")
+            try:
+                shutil.copyfile(db_file, f"db/backups/antispam-{timestamp}.sql")
+            except IOError as e:
+                error_file = f"db/backups/antispam-{timestamp}.sql"
+                self.bot.log.error(f"Unable to create file {error_file}\n    - {e}")
+
+        self.sql_db = SqliteDict(
+            filename=db_file,
+            tablename="antispam",
+            autocommit=True,
+            encode=json.dumps,
+            decode=json.loads,
+        )
+
+        if "servers" not in self.sql_db:
+            self.sql_db["servers"] = {}
+
+        self.db = self.sql_db["servers"]
+
+        self.detector = SpamDetector()
+        # Server id -> rule, only for servers with antispam enabled
+        self.rules: Dict[str, SpamRule] = {}
+        self.stats = {"actions": 0, "check_ns": 0}
+
+        for sid in self.db:
+            self.rebuild(sid)
+
+    def rebuild(self, sid: str):
+        """Rebuild a server's rule and (un)subscribe it after its settings change."""
+        settings = self.db.get(sid, {})
+
+        self.bot.pipeline.unsubscribe(self.name, int(sid))
+
+        if settings.get("enabled", False):
+            self.rules[sid] = SpamRule(**settings.get("rule", {}))
+            self.bot.pipeline.subscribe(self.name, self.check, guild_id=int(sid))
+        else:
+            self.rules.pop(sid, None)
+
+    def cog_unload(self):
+        self.bot.pipeline.unsubscribe(self.name)
+
+    async def check(self, view: MessageView):
+        msg = view.message
+
+        if msg.author.bot or not isinstance(msg.author, Member):
+            return
+
+        try:
+            rule = self.rules[str(msg.guild.id)]
+        except KeyError:
+            return
+
+        start = time.perf_counter_ns()
+        key = (msg.guild.id, msg.author.id)
+        mentions = len(view.mention_ids) + len(view.role_mention_ids)
+
+        if msg.mention_everyone:
+            mentions += 1
+
+        reason = self.detector.check(
+            key, rule, time.monotonic(), msg.channel.id, msg.id, mentions, msg.content
+        )
+        self.stats["check_ns"] += time.perf_counter_ns() - start
+
+        if reason is None:
+            return
+
+        # Start counting from scratch, so the rest of a burst doesn't trigger again
+        window = self.detector.pop(key)
+
+        if msg.author.guild_permissions.manage_messages:
+            return
+
+        await self.take_action(msg, window, reason)
+
+    async def take_action(self, msg, window, reason: str):
+        settings = self.db[str(msg.guild.id)]
+        target = msg.author
+
+        self.stats["actions"] += 1
+
+        for channel_id, message_id in window.recent():
+            self.bot.deleter.schedule_ids(channel_id, message_id)
+
+        admin = self.bot.get_cog("Admin")
+
+        if admin is None:
+            return
+
+        reason = f"Antispam: {reason}"
+        length, span = settings.get("length", [10, "minutes"])
+        me = msg.guild.me
+        action = "mute"
+
+        if await admin.apply_mute(target, me, length, span, reason) is None:
+            # No mute role set up, the spam is still deleted
+            action = "delete"
+
+        admin.log_action(msg.guild, me, self.name, action, target, reason)
+
+    def update(self, sid: str):
+        update_db(self.sql_db, self.db, "servers")
+        self.rebuild(sid)
+
+    @commands.group()
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def antispam(self, ctx: Context):
+        """Automatically mute members who spam messages, mentions or duplicates.
+
+        Run without arguments to view current server settings.
+        Server administrator permission required.
+        """
+        if ctx.invoked_subcommand is not None:
+            return
+
+        settings = self.db.get(str(ctx.guild.id), {})
+        rule = SpamRule(**settings.get("rule", {}))
+        length, span = settings.get("length", [10, "minutes"])
+
+        embed = Embed(title="Antispam Settings", color=0x7289DA)
+        embed.add_field(name="Enabled", value=str(settings.get("enabled", False)))
+        embed.add_field(name="Mute Length", value=f"{length} {span}")
+
+        for name, (count, per) in LIMITS.items():
+            value = f"{getattr(rule, count)} in {getattr(rule, per):g}s"
+            embed.add_field(name=name.capitalize(), value=value)
+
+        embed.set_footer(text=pretty_datetime(datetime.now()))
+
+        await ctx.send(embed=embed)
+
+    @antispam.command(name="enable")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def antispam_enable(self, ctx: Context, enabled: bool):
+        """Enable or disable antispam on the server.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        self.db.setdefault(sid, {})["enabled"] = enabled
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Antispam enabled: {enabled}.")
+
+    @antispam.command(name="limit")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def antispam_limit(self, ctx: Context, kind: str, count: int, seconds: float):
+        """Set how many messages, mentions or duplicates are allowed in a time window.
+        For example `antispam limit mentions 10 15` allows 10 mentions in 15 seconds.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+        kind = kind.lower()
+
+        if kind not in LIMITS:
+            await ctx.send(f":anger: Limit must be one of: {', '.join(LIMITS)}")
+            return
+
+        if count < 2 or count > 100 or seconds <= 0 or seconds > 600:
+            await ctx.send(":anger: Count must be 2-100, and seconds at most 600.")
+            return
+
+        count_field, per_field = LIMITS[kind]
+        rule = self.db.setdefault(sid, {}).setdefault("rule", {})
+        rule[count_field] = count
+        rule[per_field] = seconds
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Limit set to {count} {kind} in {seconds:g}s.")
+
+    @antispam.command(name="mute")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def antispam_mute(self, ctx: Context, length: int, span: str):
+        """Set how long spammers are muted for, e.g. `antispam mute 10 minutes`.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+        error = length_error(length, span)
+
+        if error is not None:
+            await ctx.send(f":anger: {error}")
+            return
+
+        self.db.setdefault(sid, {})["length"] = [length, span]
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Spammers will be muted for {length} {span}.")
+
+    @antispam.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def antispam_stats(self, ctx: Context):
+        """See how much the spam detector is tracking, and what it costs.
+        Server administrator permission required.
+        """
+        stats = self.detector.stats
+        checked = stats["checked"]
+        cost = self.stats["check_ns"] / checked / 1000 if checked else 0
+        memory = self.detector.memory() / 1024
+
+        embed = Embed(title="Antispam Stats", color=0x7289DA)
+        embed.add_field(name="Checked", value=str(checked))
+        embed.add_field(name="Flagged", value=str(stats["flagged"]))
+        embed.add_field(name="Actions", value=str(self.stats["actions"]))
+        embed.add_field(name="Tracked Members", value=str(len(self.detector)))
+        embed.add_field(name="Evicted", value=str(stats["evicted"]))
+        embed.add_field(name="Memory", value=f"{memory:.1f}KiB")
+        embed.add_field(name="Cost Per Message", value=f"{cost:.1f}µs")
+        embed.set_footer(text=pretty_datetime(datetime.now()))
+
+        await ctx.send(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(Antispam(bot))
+
+
+def teardown(bot):
+    bot.cogs["Antispam"].sql_db.close()
+    bot.remove_cog("Antispam")
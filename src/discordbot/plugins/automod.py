@@ -0,0 +1,325 @@
+import os
+import shutil
+import json
+import time
+
+from datetime import datetime
+from typing import Dict, List
+from sqlitedict import SqliteDict
+from discord import Member, Embed
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from discordbot.core.discord_bot import DiscordBot
+from discordbot.core.db_tools import update_db
+from discordbot.core.time_tools import length_error, pretty_datetime
+from discordbot.core.message_tools import MessageView
+from discordbot.core.match_tools import TriggerMatcher, normalize_text
+
+VERSION = "1.0b1"
+
+ACTIONS = ("delete", "warn", "mute")
+
+
+def compile_terms(terms: List[str]) -> TriggerMatcher:
+    """Compile a server's terms into one matcher over normalized text.
+
+    Terms starting with * match anywhere in a word, others only as whole words.
+    """
+    triggers = {}
+
+    for term in terms:
+        if term.startswith("*"):
+            triggers[normalize_text(term[1:])] = "contains"
+        else:
+            triggers.setdefault(normalize_text(term), "word")
+
+    return TriggerMatcher(triggers)
+
+
+class Automod(commands.Cog):
+    """Automatic moderation plugin.
+
+    Deletes messages containing banned terms, optionally warning or muting the author
+    through the Admin plugin.
+    """
+
+    def __init__(self, bot: DiscordBot):
+        self.bot = bot
+        self.name = "automod"
+        self.version = VERSION
+        self.backup = True
+
+        try:
+            with open("config/config.json") as cfg:
+                self.backup = json.load(cfg)["BackupDB"]
+        except Exception as error:
+            self.bot.log.error(f"Error loading from config file:\n    - {error}")
+
+        db_file = "db/automod.sql"
+
+        if os.path.exists(db_file) and self.backup:
+            timestamp = pretty_datetime(datetime.now(), display="FILE")
+            try:
+                shutil.copyfile(db_file, f"db/backups/automod-{timestamp}.sql")
+            except IOError as e:
+                error_file = f"db/backups/automod-{timestamp}.sql"
+                self.bot.log.error(f"Unable to create file {error_file}\n    - {e}")
+
+        self.sql_db = SqliteDict(
+            filename=db_file,
+            tablename="automod",
+            autocommit=True,
+            encode=json.dumps,
+            decode=json.loads,
+        )
+
+        if "servers" not in self.sql_db:
+            self.sql_db["servers"] = {}
+
+        self.db = self.sql_db["servers"]
+
+        # Server id -> compiled terms, only for servers with automod enabled
+        self.matchers: Dict[str, TriggerMatcher] = {}
+        self.stats = {"checked": 0, "matched": 0, "actions": 0, "check_ns": 0}
+
+        for sid in self.db:
+            self.rebuild(sid)
+
+    def rebuild(self, sid: str):
+        """Recompile a server's terms and (un)subscribe it after its settings change."""
+        settings = self.db.get(sid, {})
+
+        self.bot.pipeline.unsubscribe(self.name, int(sid))
+
+        if settings.get("enabled", False) and settings.get("terms"):
+            self.matchers[sid] = compile_terms(settings["terms"])
+            self.bot.pipeline.subscribe(self.name, self.check, guild_id=int(sid))
+        else:
+            self.matchers.pop(sid, None)
+
+    def cog_unload(self):
+        self.bot.pipeline.unsubscribe(self.name)
+
+    async def check(self, view: MessageView):
+        msg = view.message
+
+        if msg.author.bot or not isinstance(msg.author, Member):
+            return
+
+        sid = str(msg.guild.id)
+
+        try:
+            matcher = self.matchers[sid]
+        except KeyError:
+            return
+
+        start = time.perf_counter_ns()
+        term = matcher.match(normalize_text(view.content))
+        self.stats["check_ns"] += time.perf_counter_ns() - start
+        self.stats["checked"] += 1
+
+        if term is None:
+            return
+
+        self.stats["matched"] += 1
+
+        # Only look at permissions once something matched, it's not free
+        if msg.author.guild_permissions.manage_messages:
+            return
+
+        await self.take_action(msg, term)
+
+    async def take_action(self, msg, term: str):
+        settings = self.db[str(msg.guild.id)]
+        action = settings.get("action", "delete")
+        target = msg.author
+
+        self.stats["actions"] += 1
+        self.bot.deleter.schedule(msg)
+
+        admin = self.bot.get_cog("Admin")
+
+        if admin is None:
+            return
+
+        reason = f"Automod: banned term `{term}`"
+        length, span = settings.get("length", [1, "day"])
+        me = msg.guild.me
+
+        if action == "warn":
+            await admin.apply_warn(target, me, length, span, reason)
+        elif action == "mute":
+            if await admin.apply_mute(target, me, length, span, reason) is None:
+                # No mute role set up, fall back to only deleting
+                action = "delete"
+
+        admin.log_action(msg.guild, me, self.name, action, target, reason)
+
+    def update(self, sid: str):
+        update_db(self.sql_db, self.db, "servers")
+        self.rebuild(sid)
+
+    @commands.group()
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod(self, ctx: Context):
+        """Filter banned terms out of your server.
+
+        Run without arguments to view current server settings.
+        Server administrator permission required.
+        """
+        if ctx.invoked_subcommand is not None:
+            return
+
+        settings = self.db.get(str(ctx.guild.id), {})
+        length, span = settings.get("length", [1, "day"])
+
+        embed = Embed(title="Automod Settings", color=0x7289DA)
+        embed.add_field(name="Enabled", value=str(settings.get("enabled", False)))
+        embed.add_field(name="Action", value=settings.get("action", "delete"))
+        embed.add_field(name="Length", value=f"{length} {span}")
+        embed.add_field(name="Terms", value=str(len(settings.get("terms", []))))
+        embed.set_footer(text=pretty_datetime(datetime.now()))
+
+        await ctx.send(embed=embed)
+
+    @automod.command(name="enable")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_enable(self, ctx: Context, enabled: bool):
+        """Enable or disable automod on the server.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        self.db.setdefault(sid, {})["enabled"] = enabled
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Automod enabled: {enabled}.")
+
+    @automod.command(name="action")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_action(
+        self, ctx: Context, action: str, length: int = 1, span: str = "day"
+    ):
+        """Set what happens to messages with a banned term: delete, warn or mute.
+        Warn and mute also delete the message, and need the Admin plugin.
+        Length and span set how long warnings and mutes last, e.g. `mute 10 minutes`.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+        action = action.lower()
+
+        if action not in ACTIONS:
+            await ctx.send(f":anger: Action must be one of: {', '.join(ACTIONS)}")
+            return
+
+        # Checked now, rather than when automod next tries to warn or mute someone
+        error = length_error(length, span)
+
+        if error is not None:
+            await ctx.send(f":anger: {error}")
+            return
+
+        settings = self.db.setdefault(sid, {})
+        settings["action"] = action
+        settings["length"] = [length, span]
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Automod action set to {action}.")
+
+    @automod.command(name="add", aliases=["a"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_add(self, ctx: Context, *terms: str):
+        """Add banned terms, separated by spaces. Use quotes for terms with spaces.
+        Start a term with * to match it inside other words too, e.g. `*badword`.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+        settings = self.db.setdefault(sid, {})
+        current = settings.setdefault("terms", [])
+
+        added = [t for t in dict.fromkeys(terms) if t.strip("*") and t not in current]
+        current.extend(added)
+        self.update(sid)
+
+        # Don't leave the terms themselves sitting in the channel
+        if not self.bot.delete_cmds:
+            self.bot.deleter.schedule(ctx.message)
+
+        await ctx.send(f":white_check_mark: Added {len(added)} term(s).")
+
+    @automod.command(name="remove", aliases=["r", "del", "delete"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_remove(self, ctx: Context, *terms: str):
+        """Remove banned terms, separated by spaces.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+        current = self.db.get(sid, {}).get("terms", [])
+        removed = set(terms) & set(current)
+
+        if not removed:
+            await ctx.send(":anger: None of those terms are banned.")
+            return
+
+        self.db[sid]["terms"] = [t for t in current if t not in removed]
+        self.update(sid)
+
+        await ctx.send(f":white_check_mark: Removed {len(removed)} term(s).")
+
+    @automod.command(name="terms")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_terms(self, ctx: Context, page: int = 1):
+        """DM yourself a page of the server's banned terms.
+        Server administrator permission required.
+        """
+        terms = self.db.get(str(ctx.guild.id), {}).get("terms", [])
+        start = (page - 1) * 50 if page > 1 else 0
+
+        if not terms[start : start + 50]:
+            await ctx.send(":anger: No more terms.")
+            return
+
+        listing = ", ".join(terms[start : start + 50])
+        remaining = len(terms) - (start + 50)
+
+        if remaining > 0:
+            prefix = self.bot.config_prefix
+            listing += f"\nAnd {remaining} more. Use `{prefix}automod terms {page + 1}`"
+
+        await ctx.author.send(f"Banned terms in {ctx.guild.name}:\n{listing}")
+
+    @automod.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def automod_stats(self, ctx: Context):
+        """See how many messages automod has checked and acted on, and what it costs.
+        Server administrator permission required.
+        """
+        checked = self.stats["checked"]
+        cost = self.stats["check_ns"] / checked / 1000 if checked else 0
+
+        embed = Embed(title="Automod Stats", color=0x7289DA)
+        embed.add_field(name="Checked", value=str(checked))
+        embed.add_field(name="Matched", value=str(self.stats["matched"]))
+        embed.add_field(name="Actions", value=str(self.stats["actions"]))
+        embed.add_field(name="Servers", value=str(len(self.matchers)))
+        embed.add_field(name="Cost Per Message", value=f"{cost:.1f}µs")
+        embed.set_footer(text=pretty_datetime(datetime.now()))
+
+        await ctx.send(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(Automod(bot))
+
+
+def teardown(bot):
+    bot.cogs["Automod"].sql_db.close()
+    bot.remove_cog("Automod")
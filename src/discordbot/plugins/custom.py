@@ -3,33 +3,61 @@ import shutil
 import json
 
 from datetime import datetime
+from typing import Dict, List, Tuple, Union
 from sqlitedict import SqliteDict
-from discord import Member, Embed, Message, ChannelType
+from discord import Member, Embed
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from discordbot.core.discord_bot import DiscordBot
 from discordbot.core.db_tools import update_db
 from discordbot.core.time_tools import pretty_datetime
+from discordbot.core.message_tools import MessageView
+from discordbot.core.match_tools import TriggerMatcher, validate_trigger
 
 VERSION = "1.2b8"
 
 
-class CommandUser:
-    """Class to avoid potential abuse from complex command scripting."""
+# Values a script template can use, limited to avoid potential abuse from scripting
+TEMPLATE_FIELDS = {
+    "id": lambda m: str(m.id),
+    "name": lambda m: m.name,
+    "discriminator": lambda m: m.discriminator,
+    "tag": lambda m: f"{m.name}#{m.discriminator}",
+    "mention": lambda m: f"<@{m.id}>",
+}
 
-    def __init__(self, member: Member):
-        self.name = member.name
-        self.discriminator = member.discriminator
-        self.id = str(member.id)
 
-        self.obj = {
-            "id": self.id,
-            "name": self.name,
-            "discriminator": self.discriminator,
-            "tag": f"{self.name}#{self.discriminator}",
-            "mention": f"<@{self.id}>",
-        }
+class Variable(str):
+    """A template segment replaced by a TEMPLATE_FIELDS value when rendered."""
+
+
+def compile_template(text: str) -> List[str]:
+    """Compile a script response into literal and Variable segments, once."""
+    segments = []
+    literal = []
+
+    for word in text.split(" "):
+        # Argument is a replacer, formatting mistakes are left as they are
+        if word.startswith("!{") and word.endswith("}") and word[2:-1] in TEMPLATE_FIELDS:
+            if literal:
+                segments.append(" ".join(literal))
+                literal = []
+
+            segments.append(Variable(word[2:-1]))
+        else:
+            literal.append(word)
+
+    if literal:
+        segments.append(" ".join(literal))
+
+    return segments
+
+
+def render_template(segments: List[str], member: Member) -> str:
+    return " ".join(
+        TEMPLATE_FIELDS[s](member) if isinstance(s, Variable) else s for s in segments
+    )
 
 
 class Custom(commands.Cog):
@@ -68,60 +96,92 @@ class Custom(commands.Cog):
 
         self.db = self.sql_db["servers"]
 
-    def parse_command(self, member: Member, command: str) -> str:
-        user = CommandUser(member)
+        # Server id -> first word -> text response or compiled script
+        self.index: Dict[str, Dict[str, Union[str, List[str]]]] = {}
+        # Server id -> (matcher, trigger -> compiled script)
+        self.matchers: Dict[str, Tuple[TriggerMatcher, Dict[str, List[str]]]] = {}
+
+        for sid in self.db:
+            self.rebuild(sid)
+
+    def rebuild(self, sid: str):
+        """Rebuild a server's trigger index after its commands or prefix change."""
+        data = self.db.get(sid, {})
+        index = {}
 
-        cmd = command.split(" ")
-        for i, word in enumerate(cmd):
-            # Argument is a replacer
-            if word.startswith("!{") and word.endswith("}"):
-                key = word[2:-1]
-                try:
-                    cmd[i] = user.obj[key]
-                except KeyError:
-                    # Ignore a formatting mistake
-                    pass
+        for trigger, text in data.get("complex", {}).items():
+            index[trigger] = compile_template(text)
 
-        return " ".join(cmd)
+        # Text commands win if a script uses the same trigger
+        prefix = data.get("prefix")
+
+        if prefix is not None:
+            for name, text in data.get("text", {}).items():
+                index[f"{prefix}{name}"] = text
+
+        self.bot.pipeline.unsubscribe(self.name, int(sid))
+
+        if index:
+            self.index[sid] = index
+            self.bot.pipeline.subscribe(
+                self.name, self.on_trigger, guild_id=int(sid), triggers=list(index)
+            )
+        else:
+            self.index.pop(sid, None)
+
+        # Match triggers can fire anywhere in a message, so they need every message
+        match = data.get("match", {})
+
+        if match:
+            matcher = TriggerMatcher({t: info["mode"] for t, info in match.items()})
+            responses = {t: compile_template(info["text"]) for t, info in match.items()}
+
+            self.matchers[sid] = (matcher, responses)
+            self.bot.pipeline.subscribe(self.name, self.on_match, guild_id=int(sid))
+        else:
+            self.matchers.pop(sid, None)
+
+    def cog_unload(self):
+        self.bot.pipeline.unsubscribe(self.name)
+
+    async def on_trigger(self, view: MessageView):
+        msg = view.message
 
-    @commands.Cog.listener()
-    async def on_message(self, msg: Message):
         if msg.author.id == self.bot.user.id:
             return
-        if msg.channel.type == ChannelType.private:
-            return
-
-        sid = str(msg.guild.id)
 
         try:
-            prefix = self.db[sid]["prefix"]
+            response = self.index[str(msg.guild.id)][view.first_token]
         except KeyError:
-            prefix = None
+            return
 
-        # Text command
-        if prefix is not None and msg.content.startswith(prefix):
-            command = msg.content.split(" ")[0].lstrip(prefix)
+        # Text commands are plain strings, scripts are compiled segment lists
+        if not isinstance(response, str):
+            response = render_template(response, msg.author)
 
-            try:
-                cmd_result = self.db[sid]["text"][command]
-                await msg.channel.send(cmd_result)
-                return
-            except KeyError:
-                return
+        await msg.channel.send(response)
+
+    async def on_match(self, view: MessageView):
+        msg = view.message
+
+        if msg.author.bot:
+            return
+
+        sid = str(msg.guild.id)
+
+        # Leave messages starting with a trigger to on_trigger
+        if view.first_token in self.index.get(sid, {}):
+            return
 
-        # Scripted responses
         try:
-            complex_cmds = self.db[sid]["complex"]
+            matcher, responses = self.matchers[sid]
         except KeyError:
-            # Nothing to respond to
             return
 
-        for trigger in complex_cmds:
-            if msg.content.split(" ")[0] == trigger:
-                await msg.channel.send(
-                    self.parse_command(msg.author, complex_cmds[trigger])
-                )
-                return
+        trigger = matcher.match(view.content)
+
+        if trigger is not None:
+            await msg.channel.send(render_template(responses[trigger], msg.author))
 
     @commands.group()
     @commands.guild_only()
@@ -154,6 +214,7 @@ class Custom(commands.Cog):
 
             self.db[sid]["prefix"] = prefix
             update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
             await ctx.send(":white_check_mark: Prefix updated!")
         except Exception as e:
             await ctx.send(f":anger: Something went wrong: {e}")
@@ -218,6 +279,7 @@ class Custom(commands.Cog):
         try:
             self.db[sid]["text"][name] = text
             update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
             await ctx.send(f":white_check_mark: Command {name} added!")
         except Exception as e:
             await ctx.send(f":anger: Something went wrong: {e}")
@@ -234,6 +296,7 @@ class Custom(commands.Cog):
         try:
             del self.db[sid]["text"][name]
             update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
             await ctx.send(f":white_check_mark: Command `{name}` removed.")
         except KeyError:
             await ctx.send(
@@ -304,6 +367,7 @@ class Custom(commands.Cog):
         try:
             self.db[sid]["complex"][prefix] = text
             update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
             await ctx.send(f":white_check_mark: Script response {prefix} added!")
         except Exception as e:
             await ctx.send(f":anger: Something went wrong: {e}")
@@ -320,6 +384,7 @@ class Custom(commands.Cog):
         try:
             del self.db[sid]["complex"][prefix]
             update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
             await ctx.send(f":white_check_mark: Script response `{prefix}` removed.")
         except KeyError:
             await ctx.send(
@@ -327,6 +392,99 @@ class Custom(commands.Cog):
                 "registered on this server."
             )
 
+    @custom.group(name="match")
+    @commands.guild_only()
+    async def match(self, ctx: Context):
+        """Create and remove scripted responses that trigger anywhere in a message.
+
+        Modes: `contains` (any substring), `word` (whole word) or `regex`.
+        Contains and word triggers are not case sensitive.
+        """
+        if ctx.invoked_subcommand is None:
+            await ctx.send_help("custom match")
+
+    @match.command(name="list")
+    @commands.guild_only()
+    async def match_list(self, ctx: Context, page: int = 1):
+        """See a paginated list of available match responses."""
+        sid = str(ctx.guild.id)
+
+        if sid not in self.db or len(self.db[sid].get("match", {})) <= 0:
+            await ctx.send(":anger: This server has no match responses.")
+            return
+
+        embed = Embed(title="Match Responses", color=0x7289DA)
+
+        items = [(t, info) for t, info in self.db[sid]["match"].items()]
+
+        start = (page - 1) * 6 if page > 1 else 0
+        for trigger, info in items[start : start + 6]:
+            embed.add_field(name=f"{trigger} ({info['mode']})", value=info["text"])
+
+        remaining = (len(items)) - (start + 6)
+        if remaining > 0:
+            prefix = self.bot.config_prefix
+            embed.add_field(
+                name=f"And {remaining} more. ",
+                value=f"Use `{prefix}custom match list {page + 1}`",
+                inline=False,
+            )
+
+        if len(embed.fields) > 0:
+            await ctx.send(embed=embed)
+        else:
+            await ctx.send(":anger: No more commands.")
+
+    @match.command(name="create", aliases=["c", "new", "make", "add"])
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def match_create(self, ctx: Context, mode: str, trigger: str, *, text: str):
+        """Create or update a match response.
+        Use quotes for triggers with spaces, e.g. `custom match create word "good bot" :)`
+        Manage messages permission required.
+        """
+        sid = str(ctx.guild.id)
+        mode = mode.lower()
+
+        error = validate_trigger(trigger, mode)
+
+        if error is not None:
+            await ctx.send(f":anger: {error}")
+            return
+
+        if sid not in self.db:
+            self.db[sid] = {"match": {}}
+        elif "match" not in self.db[sid]:
+            self.db[sid]["match"] = {}
+
+        try:
+            self.db[sid]["match"][trigger] = {"mode": mode, "text": text}
+            update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
+            await ctx.send(f":white_check_mark: Match response `{trigger}` added!")
+        except Exception as e:
+            await ctx.send(f":anger: Something went wrong: {e}")
+
+    @match.command(name="remove", aliases=["r", "del", "delete"])
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def match_remove(self, ctx: Context, *, trigger: str):
+        """Remove a match response.
+        Manage messages permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        try:
+            del self.db[sid]["match"][trigger]
+            update_db(self.sql_db, self.db, "servers")
+            self.rebuild(sid)
+            await ctx.send(f":white_check_mark: Match response `{trigger}` removed.")
+        except KeyError:
+            await ctx.send(
+                f":anger: There is no match response `{trigger}` "
+                "registered on this server."
+            )
+
 
 def setup(bot):
     bot.add_cog(Custom(bot))
@@ -334,4 +492,4 @@ def setup(bot):
 
 def teardown(bot):
     bot.cogs["Custom"].sql_db.close()
-    bot.remove_cog("Groups")
+    bot.remove_cog("Custom")
@@ -5,12 +5,13 @@ import json
 
 from datetime import datetime, timezone
 from sqlitedict import SqliteDict
-from discord import Embed, PermissionOverwrite, Member
+from discord import Embed, Member
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from discordbot.core.discord_bot import DiscordBot
 from discordbot.core.db_tools import update_db
+from discordbot.core.group_tools import GroupIndex, provision_group
 from discordbot.core.time_tools import pretty_datetime
 
 VERSION = "2.0b2"
@@ -67,6 +68,7 @@ class Groups(commands.Cog):
 
                         del self.db[sid][group]
                         update_db(self.sql_db, self.db, "servers")
+                        self.index.remove(int(sid), group)
                     except Exception as e:
                         self.bot.log.error(f"[ERROR][GROUPS]:\n    - {e}")
 
@@ -116,8 +118,49 @@ class Groups(commands.Cog):
 
         self.db = self.sql_db["servers"]
 
+        # Group lookups by category, role and member
+        self.index = GroupIndex()
+
+        # Loaded after startup, so on_ready has already happened
+        if self.bot.is_ready():
+            self.build_index()
+
         asyncio.create_task(self.task_scheduler())
 
+    def build_index(self):
+        """Index every group, taking memberships from the member cache."""
+        self.index = GroupIndex()
+
+        for sid, groups in self.db.items():
+            guild = self.bot.get_guild(int(sid))
+
+            for group, data in groups.items():
+                info = data["info"]
+                role = guild.get_role(int(info["role"])) if guild is not None else None
+                members = [m.id for m in role.members] if role is not None else []
+
+                self.index.add(
+                    int(sid), group, int(info["category"]), int(info["role"]), members
+                )
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Members are only cached once the bot is ready
+        self.build_index()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: Member, after: Member):
+        if before.roles == after.roles:
+            return
+
+        self.index.update_member(
+            after.id, {r.id for r in before.roles}, {r.id for r in after.roles}
+        )
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: Member):
+        self.index.remove_member(member.guild.id, member.id)
+
     @commands.group(aliases=["group", "gr"])
     @commands.guild_only()
     async def groups(self, ctx: Context):
@@ -130,14 +173,15 @@ class Groups(commands.Cog):
             return
 
         sid = str(ctx.guild.id)
+        groups = self.index.groups_of(ctx.guild.id, ctx.author.id)
 
-        if sid in self.db and len(self.db[sid]) > 0:
+        if groups:
             embed = Embed(title="Your groups:", color=0x7289DA)
 
             embed.set_author(name=ctx.author.name, icon_url=ctx.author.avatar_url)
 
-            for group, data in self.db[sid].items():
-                info = data["info"]
+            for group in groups:
+                info = self.db[sid][group]["info"]
 
                 embed.add_field(name=group, value=info["description"])
 
@@ -162,45 +206,30 @@ class Groups(commands.Cog):
         if sid not in self.db:
             self.db[sid] = {}
 
-        # Try to make a role, text, and voice channel for the group
+        # Try to make a role, text, and voice channel for the group, anything already
+        # made is deleted again if a later step fails
         try:
-            role = await ctx.guild.create_role(name=name, reason="Groups plugin")
-            ow = {
-                ctx.guild.default_role: PermissionOverwrite(read_messages=False),
-                role: PermissionOverwrite(read_messages=True),
-            }
-            category = await ctx.guild.create_category(
-                name=name, reason="Groups plugin", overwrites=ow
-            )
-            text = await ctx.guild.create_text_channel(
-                name=name.lower(),
-                reason="Groups plugin",
-                category=category,
-                topic=description,
-            )
-            voice = await ctx.guild.create_voice_channel(
-                name=name, reason="Groups plugin", category=category
+            role, category, text, voice = await provision_group(
+                ctx.guild, ctx.author, name, description
             )
-
-            self.db[sid][name] = {
-                "info": {
-                    "leader": str(ctx.author.id),
-                    "description": description,
-                    "category": str(category.id),
-                    "text_channel": str(text.id),
-                    "voice_channel": str(voice.id),
-                    "role": str(role.id),
-                }
-            }
-
-            update_db(self.sql_db, self.db, "servers")
-
-            await ctx.author.add_roles(role, reason="Group created.")
-
         except Exception as e:
             await ctx.send(f":anger: Something went wrong: `{e}`")
             return
 
+        self.db[sid][name] = {
+            "info": {
+                "leader": str(ctx.author.id),
+                "description": description,
+                "category": str(category.id),
+                "text_channel": str(text.id),
+                "voice_channel": str(voice.id),
+                "role": str(role.id),
+            }
+        }
+
+        update_db(self.sql_db, self.db, "servers")
+        self.index.add(ctx.guild.id, name, category.id, role.id, [ctx.author.id])
+
         await ctx.send(":white_check_mark: Group created!")
         await text.send(
             f"Welcome to your group {ctx.author.mention}! Try the `group invite` command!"
@@ -266,14 +295,15 @@ class Groups(commands.Cog):
         the group channel.
         """
         sid = str(ctx.guild.id)
+        group = self.index.by_category(ctx.channel.category_id)
 
-        try:
-            info = self.db[sid][ctx.channel.category.name]["info"]
-            role = ctx.guild.get_role(int(info["role"]))
-        except KeyError:
-            await ctx.send(f":anger: Unable to get info for {ctx.channel.category.name}")
+        if group is None:
+            await ctx.send(":anger: This isn't a group channel!")
             return
 
+        info = self.db[sid][group]["info"]
+        role = ctx.guild.get_role(int(info["role"]))
+
         if ctx.author.id != int(info["leader"]):
             await ctx.send(":anger: You are not the group leader!")
             return
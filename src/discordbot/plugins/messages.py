@@ -1,60 +1,101 @@
-from datetime import datetime
+import asyncio
 
-from discord import TextChannel, Member, Message, Embed, Role
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from discord import (
+    TextChannel,
+    Member,
+    Message,
+    Embed,
+    Role,
+    NotFound,
+    Forbidden,
+    RawBulkMessageDeleteEvent,
+    RawMessageDeleteEvent,
+    RawMessageUpdateEvent,
+)
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from discordbot.core.discord_bot import DiscordBot
+from discordbot.core.message_tools import MessageCache, parse_message_link
+from discordbot.core.purge_tools import PurgeJob
 from discordbot.core.time_tools import pretty_datetime
 
 VERSION = "3.3b3"
 
+# Channels sent to at once by a crosspost
+CROSSPOST_CONCURRENCY = 5
 
-def msg_op_or_permission():
-    """
-    Check if a user either is the original poster of the message, or has permission.
+# Channels scanned at once by a purge, the pause between deleting messages too old to
+# bulk delete, and how often the progress message is updated
+PURGE_CONCURRENCY = 3
+PURGE_SINGLE_DELAY = 1.0
+PURGE_PROGRESS = 3.0
+
+# Purge targets meaning every channel the bot can purge
+PURGE_EVERYWHERE = ("server", "guild", "everywhere")
+
+
+class CachedMessage(commands.Converter):
+    """Message converter sharing the Messages plugin's cache, so a message fetched in
+    the last few seconds by a repeated command isn't fetched again.
+    Anything that isn't a message link is left to the regular message converter.
     """
 
-    async def predicate(ctx: Context):
-        # Always show the command as available in help
-        if ctx.invoked_with == "help":
-            return True
+    async def convert(self, ctx: Context, argument: str) -> Message:
+        link = parse_message_link(argument)
+
+        if link is None:
+            return await commands.MessageConverter().convert(ctx, argument)
+
+        channel = ctx.bot.get_channel(link.channel_id)
+
+        if channel is None:
+            raise commands.ChannelNotFound(str(link.channel_id))
 
-        # Grab the destination channel by its #mention
         try:
-            dest_channel = ctx.message.channel_mentions[0]
-        except IndexError:
-            raise commands.BadArgument("Invalid target channel.")
+            return await ctx.cog.message_cache.fetch(channel, link.message_id)
+        except NotFound:
+            raise commands.MessageNotFound(argument)
+        except Forbidden:
+            raise commands.ChannelNotReadable(channel)
 
-        # Now check if the user has the manage messages permission in the destination
-        if ctx.author.permissions_in(dest_channel).manage_messages:
-            # If so we can skip any farther checks
-            return True
 
-        # Otherwise split the message into arguments
-        arguments = ctx.message.content.split(" ")[1:]
+def may_repost(member: Member, message: Message, targets: List[TextChannel]) -> bool:
+    """Check <member> may repost <message> to every channel in <targets>: either they
+    can manage messages in all of them, or it's their own message and they can send
+    messages in all of them.
+    """
+    if all(member.permissions_in(t).manage_messages for t in targets):
+        return True
 
-        # Ensure that the first argument is a Discord message link
-        prefaces = ("https://discord.com/channels/", "https://discordapp.com/channels/")
-        if not arguments[0].startswith(prefaces):
-            raise commands.BadArgument("Message must be a Discord message link.")
+    return message.author == member and all(
+        member.permissions_in(t).send_messages for t in targets
+    )
 
-        # Split the link and grab the destination channel and message id
-        split = arguments[0].split("/")
-        orig_channel = ctx.guild.get_channel(int(split[5]))
-        message_id = int(split[6])
 
-        try:
-            target_message = await orig_channel.fetch_message(message_id)
-        except Exception as e:
-            await ctx.send(f":anger: Unable to process: {e}")
-            return
+def may_cancel_purge(member: Member, starter_id: int) -> bool:
+    """Check <member> may stop a purge: only whoever started it or an administrator
+    can, as a purge may span channels they can't manage.
+    """
+    return member.id == starter_id or member.guild_permissions.administrator
+
+
+def crosspost_report(targets: List[TextChannel], results: list) -> str:
+    """Summarize a crosspost, <results> holds None or the error for each target."""
+    posted = [t.mention for t, r in zip(targets, results) if r is None]
+    lines = []
 
-        author = target_message.author
+    if posted:
+        lines.append(f":white_check_mark: Message crossposted to {', '.join(posted)}!")
 
-        return author == ctx.author and author.permissions_in(dest_channel).send_messages
+    for target, result in zip(targets, results):
+        if result is not None:
+            lines.append(f":anger: Unable to crosspost to {target.mention}: {result}")
 
-    return commands.check(predicate)
+    return "\n".join(lines)
 
 
 class Messages(commands.Cog):
@@ -68,28 +109,33 @@ class Messages(commands.Cog):
         self.name = "messages"
         self.version = VERSION
 
+        self.message_cache = MessageCache()
+
+        # Guild id -> purge running there
+        self.purges: Dict[int, PurgeJob] = {}
+        # Guild id -> id of whoever started the purge running there
+        self.purge_starters: Dict[int, int] = {}
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
+        self.message_cache.forget(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        self.message_cache.forget(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.message_cache.forget(message_id)
+
     # Due to some really weird circular import errors, I'm just doing a paste of this here
     async def log_to_channel(self, ctx: Context, target: Member, info: str = None):
-        """Send an embed-formatted log of an event to a channel."""
-        sid = str(ctx.guild.id)
-        channel = None
-        enabled = True
+        """Send an embed-formatted log of an event to the Admin plugin's log channel."""
+        policy = self.bot.policies.get(ctx.guild)
         action = ctx.message.content
 
-        if sid in self.db:
-            try:
-                channel = ctx.guild.get_channel(int(self.db[sid]["log_channel"]))
-            except KeyError:
-                channel = None
-            try:
-                enabled = self.db[sid]["log"]
-            except KeyError:
-                enabled = False
-        else:
-            channel = ctx.channel
-            enabled = False
-
-        if not enabled:
+        if not policy.mod_log or policy.mod_log_channel is None:
             return
 
         if info is None:
@@ -107,33 +153,18 @@ class Messages(commands.Cog):
         embed.add_field(name="Info", value=info)
         embed.set_footer(text=pretty_datetime(datetime.now()))
 
-        await channel.send(embed=embed)
-
-    @commands.command(aliases=["xpost", "x-post"])
-    @msg_op_or_permission()
-    @commands.guild_only()
-    async def crosspost(self, ctx: Context, message: Message, target: TextChannel):
-        """Cross-post <message> to <target>.
-        Message must be a Discord message link.
-
-        Must be the message OP or have manage messages permission.
-        """
-        # Avoid posting to the same channel
-        if message.channel == target:
-            await ctx.send(":anger: Target must be a different channel.")
-            return
+        self.bot.log_embed(policy.mod_log_channel, embed, immediate=True)
 
+    @staticmethod
+    def message_embed(message: Message, title: str) -> Embed:
+        """Build the embed reposting <message> elsewhere."""
         content = message.content
 
         # Add placeholder content if the message was only an embed
         if len(content) <= 1:
             content = "-"
 
-        embed = Embed(
-            title=f"X-Post from #{message.channel.name}",
-            url=message.jump_url,
-            color=0x7289DA,
-        )
+        embed = Embed(title=title, url=message.jump_url, color=0x7289DA)
         embed.set_author(name=message.author.name, icon_url=message.author.avatar_url)
         embed.add_field(name="Posted:", value=content)
 
@@ -145,16 +176,48 @@ class Messages(commands.Cog):
             items = message.content.split(" ")
             embed.set_image(url=items[len(items) - 1])
 
-        try:
-            await target.send(embed=embed)
-            await ctx.send(":white_check_mark: Message crossposted!")
-        except Exception as error:
-            await ctx.send(f":anger: Unable to crosspost: {error}")
+        return embed
+
+    @commands.command(aliases=["xpost", "x-post"])
+    @commands.guild_only()
+    async def crosspost(
+        self, ctx: Context, message: CachedMessage, *targets: TextChannel
+    ):
+        """Cross-post <message> to one or more <targets>.
+        Message must be a Discord message link.
+        e.g. `crosspost <link> #announcements #general`
+
+        Must be the message OP or have manage messages permission.
+        """
+        # Avoid posting to the same channel, or to one channel twice
+        targets = [t for t in dict.fromkeys(targets) if t != message.channel]
+
+        if not targets:
+            await ctx.send(":anger: Targets must be different channels.")
+            return
+
+        # Checked against the converted channels, as targets can be ids or names too
+        if not may_repost(ctx.author, message, targets):
+            await ctx.send(
+                ":anger: You must be the message OP, or have manage messages permission "
+                "in every target."
+            )
+            return
+
+        embed = self.message_embed(message, f"X-Post from #{message.channel.name}")
+        semaphore = asyncio.Semaphore(CROSSPOST_CONCURRENCY)
+
+        async def send(target: TextChannel):
+            async with semaphore:
+                await target.send(embed=embed)
+
+        results = await asyncio.gather(*map(send, targets), return_exceptions=True)
+
+        await ctx.send(crosspost_report(targets, results))
 
     @commands.command(aliases=["mv", "->"])
-    @msg_op_or_permission()
     @commands.guild_only()
-    async def move(self, ctx: Context, message: Message, target: TextChannel):
+    async def move(self, ctx: Context, message: CachedMessage, target: TextChannel):
         """Move a <message> to a different channel.
         Message must be a Discord message link.
 
@@ -165,28 +228,14 @@ class Messages(commands.Cog):
             await ctx.send(":anger: Target must be a different channel.")
             return
 
-        content = message.content
-
-        # Add placeholder content if the message was only an embed
-        if len(content) <= 1:
-            content = "-"
-
-        # Set up the embed
-        embed = Embed(
-            title=f"Moved message from #{message.channel.name}",
-            url=message.jump_url,
-            color=0x7289DA,
-        )
-        embed.set_author(name=message.author.name, icon_url=message.author.avatar_url)
-        embed.add_field(name="Posted:", value=content)
+        if not may_repost(ctx.author, message, [target]):
+            await ctx.send(
+                ":anger: You must be the message OP, or have manage messages permission "
+                "in the target."
+            )
+            return
 
-        # Set the embedded image to the first image attachment of the message if any exist
-        if len(message.attachments) > 0:
-            embed.set_image(url=message.attachments[0].url)
-        # Else check if the message ends in an image link and add that instead
-        elif message.content.endswith(("jpg", "jpeg", "png", "gif", "bmp")):
-            items = message.content.split(" ")
-            embed.set_image(url=items[len(items) - 1])
+        embed = self.message_embed(message, f"Moved message from #{message.channel.name}")
 
         try:
             await target.send(embed=embed)
@@ -194,103 +243,230 @@ class Messages(commands.Cog):
         except Exception as error:
             await ctx.send(f":anger: Unable to send message: {error}")
             return
+        self.message_cache.forget(message.id)
+
         try:
             await message.delete()
         except Exception as error:
             await ctx.send(f":anger: Unable to delete message: {error}")
             return
 
+    async def purge_channels(self, ctx: Context, targets: Tuple[str, ...]) -> List:
+        """Work out the channels a purge covers from its trailing arguments."""
+        if not targets:
+            return [ctx.channel]
+
+        if targets[0].lower() in PURGE_EVERYWHERE:
+            me = ctx.guild.me
+
+            return [
+                c
+                for c in ctx.guild.text_channels
+                if c.permissions_for(me).manage_messages
+                and c.permissions_for(me).read_message_history
+            ]
+
+        converter = commands.TextChannelConverter()
+        return [await converter.convert(ctx, target) for target in targets]
+
+    async def run_purge(
+        self,
+        ctx: Context,
+        count: int,
+        targets: Tuple[str, ...],
+        authors: Optional[Set[int]] = None,
+    ) -> Optional[PurgeJob]:
+        """Purge the latest <count> messages in each target channel, showing progress
+        as it goes. Returns None if the purge couldn't start.
+        """
+        if ctx.guild.id in self.purges:
+            await ctx.send(":anger: A purge is already running on this server.")
+            return None
+
+        channels = await self.purge_channels(ctx, targets)
+
+        if not channels:
+            await ctx.send(":anger: No channels to purge.")
+            return None
+
+        # Messages before this one are purged, so it can be edited to show progress
+        progress = await ctx.send(f"Purging {len(channels)} channel(s)...")
+
+        job = PurgeJob(
+            self.bot.http,
+            channels,
+            count,
+            authors,
+            before=progress,
+            concurrency=PURGE_CONCURRENCY,
+            single_delay=PURGE_SINGLE_DELAY,
+        )
+        self.purges[ctx.guild.id] = job
+        self.purge_starters[ctx.guild.id] = ctx.author.id
+
+        try:
+            task = asyncio.create_task(job.run())
+
+            while not task.done():
+                await asyncio.wait({task}, timeout=PURGE_PROGRESS)
+
+                if not task.done():
+                    await progress.edit(content=self.purge_progress(job))
+
+            # Raise anything the purge itself ran into
+            task.result()
+        finally:
+            del self.purges[ctx.guild.id]
+            del self.purge_starters[ctx.guild.id]
+
+        await progress.delete()
+
+        for channel, error in job.errors:
+            await ctx.send(f":anger: Unable to purge {channel.mention}: {error}")
+
+        return job
+
+    @staticmethod
+    def purge_progress(job: PurgeJob) -> str:
+        stats = job.stats
+        failed = f", {stats['failed']} failed" if stats["failed"] else ""
+
+        return (
+            f"Purging: {stats['deleted']} deleted from {stats['scanned']} scanned, "
+            f"{stats['channels']}/{len(job.channels)} channels done{failed}."
+        )
+
+    @staticmethod
+    def purge_result(job: PurgeJob, whose: str = "") -> str:
+        channels = len(job.channels)
+        where = f" across {channels} channels" if channels > 1 else ""
+        cancelled = " Cancelled." if job.cancelled else ""
+
+        return (
+            f":white_check_mark: Purged {job.stats['deleted']} messages{whose} "
+            f"in {job.stats['scanned']}{where}.{cancelled}"
+        )
+
     @commands.group(aliases=["clear"])
-    @commands.has_permissions(administrator=True)
+    @commands.has_permissions(manage_messages=True)
     @commands.guild_only()
     async def purge(self, ctx: Context):
-        """Purge messages."""
+        """Purge messages.
+        Every purge looks through the latest <count> messages of the current channel.
+        Add channels after the count to purge those instead, or `server` for every
+        channel, e.g. `purge member @user 500 #general #memes`.
+        Manage messages permission required, purging other people's messages needs
+        administrator.
+        """
         if ctx.invoked_subcommand is None:
             await ctx.send_help("purge")
 
+    @purge.command(name="cancel", aliases=["stop"])
+    @commands.has_permissions(manage_messages=True)
+    @commands.guild_only()
+    async def purge_cancel(self, ctx: Context):
+        """Stop the purge running on this server.
+        Manage messages permission required, and only whoever started the purge or an
+        administrator can stop it.
+        """
+        job = self.purges.get(ctx.guild.id)
+
+        if job is None:
+            await ctx.send(":anger: No purge is running.")
+            return
+
+        if not may_cancel_purge(ctx.author, self.purge_starters[ctx.guild.id]):
+            await ctx.send(":anger: Only whoever started the purge can stop it.")
+            return
+
+        job.cancel()
+        await ctx.send(":white_check_mark: Purge cancelled.")
+
     @purge.command(name="self", aliases=["me"])
     @commands.has_permissions(manage_messages=True)
     @commands.guild_only()
-    async def purge_self(self, ctx: Context, count: int = 10):
+    async def purge_self(self, ctx: Context, count: int = 10, *channels: str):
         """Purge messages from yourself.
         Manage messages permission required.
         """
-        result = len(
-            await ctx.channel.purge(limit=count, check=lambda m: m.author == ctx.author)
-        )
+        job = await self.run_purge(ctx, count, channels, {ctx.author.id})
+
+        if job is None:
+            return
 
         await self.log_to_channel(ctx, ctx.author)
 
-        await ctx.send(
-            f":white_check_mark: Purged {result} messages from you in {count}."
-        )
+        await ctx.send(self.purge_result(job, " from you"))
 
     @purge.command(name="bot")
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
-    async def purge_bot(self, ctx: Context, count: int = 10):
+    async def purge_bot(self, ctx: Context, count: int = 10, *channels: str):
         """Purge messages sent by the bot.
         Manage messages permission required.
         """
-        result = len(
-            await ctx.channel.purge(
-                limit=count, check=lambda m: m.author.id == ctx.bot.user.id
-            )
-        )
+        job = await self.run_purge(ctx, count, channels, {ctx.bot.user.id})
+
+        if job is None:
+            return
 
         await self.log_to_channel(ctx, ctx.author)
 
-        await ctx.send(
-            f":white_check_mark: Purged {result} messages from the bot in {count}."
-        )
+        await ctx.send(self.purge_result(job, " from the bot"))
 
     @purge.command(name="all", aliases=["everyone"])
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
-    async def purge_all(self, ctx: Context, count: int = 10):
+    async def purge_all(self, ctx: Context, count: int = 10, *channels: str):
         """Purge all messages.
         Manage messages permission required.
         """
-        result = len(await ctx.channel.purge(limit=count))
+        job = await self.run_purge(ctx, count, channels)
+
+        if job is None:
+            return
 
         await self.log_to_channel(ctx, ctx.author)
 
-        await ctx.send(f":white_check_mark: Purged {result} messages.")
+        await ctx.send(self.purge_result(job))
 
     @purge.command(name="member", aliases=["user", "target"])
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
-    async def purge_member(self, ctx: Context, target: Member, count: int = 10):
+    async def purge_member(
+        self, ctx: Context, target: Member, count: int = 10, *channels: str
+    ):
         """Purge messages from a member.
         Manage messages permission required.
         """
-        result = len(
-            await ctx.channel.purge(limit=count, check=lambda m: m.author == target)
-        )
+        job = await self.run_purge(ctx, count, channels, {target.id})
+
+        if job is None:
+            return
 
         await self.log_to_channel(ctx, target)
 
-        mention = target.mention
-        await ctx.send(
-            f":white_check_mark: Purged {result} messages from {mention} in {count}."
-        )
+        await ctx.send(self.purge_result(job, f" from {target.mention}"))
 
     @purge.command(name="role", aliases=["group"])
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
-    async def purge_group(self, ctx: Context, role: Role, count: int = 10):
+    async def purge_group(
+        self, ctx: Context, role: Role, count: int = 10, *channels: str
+    ):
         """Purge messages from a role.
+        Only members who currently have the role are matched.
         Manage messages permission required.
         """
-        result = len(
-            await ctx.channel.purge(limit=count, check=lambda m: role in m.author.roles)
-        )
+        members = {member.id for member in role.members}
+        job = await self.run_purge(ctx, count, channels, members)
+
+        if job is None:
+            return
 
         await self.log_to_channel(ctx, ctx.author)
 
-        await ctx.send(
-            f":white_check_mark: Purged {result} messages from {role.mention} in {count}."
-        )
+        await ctx.send(self.purge_result(job, f" from {role.mention}"))
 
 
 def setup(bot):
@@ -3,18 +3,61 @@ import shutil
 import asyncio
 import json
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
 from sqlitedict import SqliteDict
-from discord import Role, Embed, Message, Emoji, PartialEmoji
+from discord import (
+    Role,
+    Embed,
+    Message,
+    Emoji,
+    PartialEmoji,
+    NotFound,
+    Forbidden,
+    HTTPException,
+)
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from discordbot.core.discord_bot import DiscordBot
 from discordbot.core.db_tools import update_db
 from discordbot.core.time_tools import pretty_datetime
+from discordbot.core.send_tools import Priority
+from discordbot.core.role_tools import (
+    RoleChangeQueue,
+    batched,
+    reaction_diff,
+    select_members,
+    split_role_names,
+)
 
 VERSION = "2.4b3"
 
+# Role changes made per batch while reconciling, and the pause between batches
+SYNC_BATCH = 5
+SYNC_DELAY = 2.0
+
+# Concurrent role edits in a mass role job, the pause between rounds of them, and how
+# often the progress message is updated and progress is saved
+MASS_CONCURRENCY = 3
+MASS_DELAY = 1.0
+MASS_PROGRESS = 5.0
+MASS_CHECKPOINT = 10.0
+
+# Ways to pick members for a mass role job
+MASS_SELECTORS = ("all", "role", "joined", "before", "bots", "humans")
+
+
+def emoji_key(emoji: Union[Emoji, PartialEmoji, str]) -> str:
+    """Identify an emoji by id if it's a custom emoji, otherwise by its unicode."""
+    if isinstance(emoji, str):
+        return emoji
+
+    if emoji.id is not None:
+        return str(emoji.id)
+
+    return emoji.name
+
 
 class Roles(commands.Cog):
     """Add assignable roles to your server.
@@ -59,7 +102,313 @@ class Roles(commands.Cog):
         if "servers" not in self.sql_db:
             self.sql_db["servers"] = {}
 
+        if "mass" not in self.sql_db:
+            self.sql_db["mass"] = {}
+
         self.db = self.sql_db["servers"]
+        # Server id -> mass role job in progress
+        self.mass_db = self.sql_db["mass"]
+        self.mass_tasks: Dict[str, asyncio.Task] = {}
+
+        # (message id, emoji key) -> role id, for every reaction role
+        self.react_index: Dict[Tuple[int, str], int] = {}
+        # Message id -> its emoji keys, so reactions on other messages cost one lookup
+        self.react_keys: Dict[int, List[str]] = {}
+
+        for sid, data in self.db.items():
+            for mid in data.get("reacts", {}):
+                self.index_message(sid, mid)
+
+        self.sync_task = None
+        # Reaction role changes, paced per server with reversals cancelled out
+        self.react_queue = RoleChangeQueue(self.apply_react, self.notify_react)
+
+        # Loaded after startup, so on_ready has already happened
+        if self.bot.is_ready():
+            self.start_sync()
+            self.start_mass_jobs()
+
+    def index_message(self, sid: str, mid: str):
+        """Update the reaction index for one message after its reaction roles change."""
+        message_id = int(mid)
+
+        for key in self.react_keys.pop(message_id, ()):
+            self.react_index.pop((message_id, key), None)
+
+        entries = self.db.get(sid, {}).get("reacts", {}).get(mid, {})
+
+        for entry in entries.values():
+            # Entries from older versions only stored the emoji's name
+            key = entry.get("emoji", entry["reaction"])
+
+            self.react_index[(message_id, key)] = int(entry["id"])
+            self.react_keys.setdefault(message_id, []).append(key)
+
+    def react_role(self, payload) -> Optional[int]:
+        """Get the role id for a raw reaction event, or None if it isn't a react role."""
+        if payload.message_id not in self.react_keys:
+            return None
+
+        role_id = self.react_index.get((payload.message_id, emoji_key(payload.emoji)))
+
+        if role_id is not None or payload.emoji.id is None:
+            return role_id
+
+        # A custom emoji on an entry from before emoji ids were stored, matched by name
+        # once and then upgraded to its id
+        role_id = self.react_index.get((payload.message_id, payload.emoji.name))
+
+        if role_id is not None:
+            sid = str(payload.guild_id)
+            mid = str(payload.message_id)
+
+            for entry in self.db[sid]["reacts"][mid].values():
+                if "emoji" not in entry and entry["reaction"] == payload.emoji.name:
+                    entry["emoji"] = str(payload.emoji.id)
+
+            update_db(self.sql_db, self.db, "servers")
+            self.index_message(sid, mid)
+
+        return role_id
+
+    def start_sync(self):
+        """Start a reaction role reconciliation pass if one isn't already running."""
+        if self.sync_task is None or self.sync_task.done():
+            self.sync_task = asyncio.create_task(self.sync_reactions())
+
+    def start_mass_jobs(self):
+        """Start or resume every saved mass role job that isn't running."""
+        for sid in list(self.mass_db):
+            task = self.mass_tasks.get(sid)
+
+            if task is None or task.done():
+                self.mass_tasks[sid] = asyncio.create_task(self.run_mass_job(sid))
+
+    def cog_unload(self):
+        if self.sync_task is not None:
+            self.sync_task.cancel()
+
+        self.react_queue.cancel()
+
+        # Jobs stay saved and resume when the plugin is loaded again
+        for task in self.mass_tasks.values():
+            task.cancel()
+
+    def end_mass_job(self, sid: str) -> Optional[dict]:
+        """Forget a mass role job and its member list, returning the job if there was one."""
+        job = self.mass_db.pop(sid, None)
+        update_db(self.sql_db, self.mass_db, "mass")
+
+        if f"mass-{sid}" in self.sql_db:
+            del self.sql_db[f"mass-{sid}"]
+
+        return job
+
+    async def run_mass_job(self, sid: str):
+        """Work through a mass role job, saving how far it got every MASS_CHECKPOINT
+        seconds. The member list is saved once when the job starts, so a checkpoint is
+        only the job's counters. Members changed again after a restart are skipped.
+        """
+        job = self.mass_db[sid]
+        pending = self.sql_db.get(f"mass-{sid}", [])
+        guild = self.bot.get_guild(int(sid))
+        role = guild.get_role(job["role"]) if guild is not None else None
+
+        if role is None:
+            self.end_mass_job(sid)
+            return
+
+        progress = None
+        channel = guild.get_channel(job["channel"])
+
+        try:
+            progress = await channel.fetch_message(job["message"])
+        except Exception:
+            # Progress just won't be shown if the message is gone
+            pass
+
+        loop = asyncio.get_event_loop()
+        last_update = last_checkpoint = loop.time()
+
+        while job["done"] < len(pending):
+            # Deleted part way through, nothing left can succeed
+            if guild.get_role(role.id) is None:
+                break
+
+            batch = pending[job["done"] : job["done"] + MASS_CONCURRENCY]
+            results = await asyncio.gather(
+                *(self.mass_apply(guild, role, uid, job["give"]) for uid in batch)
+            )
+
+            job["done"] += len(batch)
+            job["failed"] += results.count(False)
+
+            if loop.time() - last_checkpoint > MASS_CHECKPOINT:
+                last_checkpoint = loop.time()
+                update_db(self.sql_db, self.mass_db, "mass")
+
+            if progress is not None and loop.time() - last_update > MASS_PROGRESS:
+                last_update = loop.time()
+                progress = await self.mass_edit(progress, self.mass_progress(job, role))
+
+            await asyncio.sleep(MASS_DELAY)
+
+        self.end_mass_job(sid)
+
+        if progress is not None:
+            await self.mass_edit(progress, f"{self.mass_progress(job, role)} Done!")
+
+    async def mass_edit(self, progress: Message, content: str) -> Optional[Message]:
+        """Update a mass role job's progress message, returns None once it's gone."""
+        try:
+            await progress.edit(content=content)
+        except NotFound:
+            return None
+        except HTTPException as e:
+            self.bot.log.warning(f"[ROLES] Unable to update mass role progress: {e}")
+
+        return progress
+
+    async def mass_apply(self, guild, role: Role, member_id: int, give: bool) -> bool:
+        member = guild.get_member(member_id)
+
+        # Left the server, or already changed by someone else since the job started
+        if member is None or (role in member.roles) == give:
+            return True
+
+        try:
+            if give:
+                await member.add_roles(role, reason="Mass role")
+            else:
+                await member.remove_roles(role, reason="Mass role")
+        except Exception as e:
+            self.bot.log.warning(f"[ROLES] Mass role failed for {member}: {e}")
+            return False
+
+        return True
+
+    @staticmethod
+    def mass_progress(job: dict, role: Optional[Role]) -> str:
+        action = "Giving" if job["give"] else "Removing"
+        name = role.name if role is not None else "a deleted role"
+        failed = f", {job['failed']} failed" if job["failed"] else ""
+
+        return f"{action} {name}: {job['done']}/{job['total']}{failed}."
+
+    async def sync_reactions(self):
+        """Apply reactions added or removed while the bot was offline.
+
+        Progress is checkpointed after every message, so an interrupted pass picks up
+        where it left off next time.
+        """
+        state = self.sql_db.get("sync")
+
+        if state is None:
+            pending = [
+                [sid, mid]
+                for sid, data in self.db.items()
+                for mid in data.get("reacts", {})
+            ]
+            state = {"pending": pending, "total": len(pending), "added": 0, "removed": 0}
+            self.sql_db["sync"] = state
+        else:
+            self.bot.log.info(
+                f"[ROLES] Resuming reaction sync, {len(state['pending'])} left"
+            )
+
+        while state["pending"]:
+            sid, mid = state["pending"][0]
+
+            # Skipped where the plugin is off, checked per message as it can be turned
+            # off part way through
+            if not self.bot.plugin_switches.is_disabled(int(sid), self.name):
+                try:
+                    added, removed = await self.sync_message(sid, mid)
+                    state["added"] += added
+                    state["removed"] += removed
+                except Exception as e:
+                    self.bot.log.warning(
+                        f"[ROLES] Unable to sync reactions on {mid}: {e}"
+                    )
+
+            state["pending"].pop(0)
+            self.sql_db["sync"] = state
+
+            done = state["total"] - len(state["pending"])
+            self.bot.log.info(
+                f"[ROLES] Reaction sync {done}/{state['total']}, "
+                f"{state['added']} added, {state['removed']} removed"
+            )
+
+        del self.sql_db["sync"]
+
+    async def sync_message(self, sid: str, mid: str) -> Tuple[int, int]:
+        """Reconcile one message's reaction roles, returns (added, removed)."""
+        guild = self.bot.get_guild(int(sid))
+        entries = self.db.get(sid, {}).get("reacts", {}).get(mid)
+
+        if guild is None or not entries:
+            return 0, 0
+
+        channel = guild.get_channel(int(next(iter(entries.values()))["channel"]))
+
+        if channel is None:
+            return 0, 0
+
+        try:
+            message = await channel.fetch_message(int(mid))
+        except (NotFound, Forbidden):
+            return 0, 0
+
+        reactions = {}
+
+        for reaction in message.reactions:
+            reactions[emoji_key(reaction.emoji)] = reaction
+
+            # Entries from older versions are indexed by custom emoji name
+            if not isinstance(reaction.emoji, str):
+                reactions.setdefault(reaction.emoji.name, reaction)
+
+        removals = self.db[sid].get("react_sync", False)
+        added = removed = 0
+
+        for key in self.react_keys.get(message.id, []):
+            role = guild.get_role(self.react_index[(message.id, key)])
+
+            if role is None:
+                continue
+
+            reactors = set()
+
+            if key in reactions:
+                # Paginated 100 users at a time by discord.py
+                async for user in reactions[key].users():
+                    if not user.bot:
+                        reactors.add(user.id)
+
+            holders = {m.id for m in role.members}
+            add, remove = reaction_diff(reactors, holders, removals)
+
+            changes = [(uid, True) for uid in add] + [(uid, False) for uid in remove]
+
+            for batch in batched(changes, SYNC_BATCH):
+                for uid, give in batch:
+                    member = guild.get_member(uid)
+
+                    # Left the server since reacting
+                    if member is None:
+                        continue
+
+                    if give:
+                        await member.add_roles(role, reason="Reaction role sync")
+                        added += 1
+                    else:
+                        await member.remove_roles(role, reason="Reaction role sync")
+                        removed += 1
+
+                await asyncio.sleep(SYNC_DELAY)
+
+        return added, removed
 
     async def roles_check(self, ctx: Context) -> bool:
         if "roles" in self.db[str(ctx.guild.id)]:
@@ -80,93 +429,109 @@ class Roles(commands.Cog):
             # Don't delete messages
             return
 
-        await asyncio.sleep(5)
-
+        # Both messages are handed to the bot's scheduler so they go out in one bulk delete
         if not self.delete_cmds:
-            try:
-                await invoke.delete()
-            except Exception as e:
-                self.bot.log.error(f"[ROLES] Unable to delete invoke: {e}")
+            self.bot.deleter.schedule(invoke, 5)
 
-        try:
-            await response.delete()
-        except Exception as e:
-            self.bot.log.error(f"[ROLES] Unable to delete response: {e}")
+        self.bot.deleter.schedule(response, 5)
 
     @commands.Cog.listener()
-    async def on_raw_message_delete(self, payload):
-        try:
-            del self.db[str(payload.guild_id)]["reacts"][str(payload.message_id)]
-            update_db(self.sql_db, self.db, "servers")
-        except KeyError:
-            pass
+    async def on_ready(self):
+        # Also fires after reconnecting, when reactions may have been missed
+        self.start_sync()
+        self.start_mass_jobs()
 
     @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload):
+    async def on_raw_message_delete(self, payload):
+        if payload.message_id not in self.react_keys:
+            return
+
         sid = str(payload.guild_id)
         mid = str(payload.message_id)
 
-        try:
-            info = self.db[sid]["reacts"]
+        self.db[sid]["reacts"].pop(mid, None)
+        update_db(self.sql_db, self.db, "servers")
+        self.index_message(sid, mid)
 
-            if mid not in info:
-                return
-            else:
-                info = info[mid]
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        if self.bot.plugin_switches.is_disabled(payload.guild_id, self.name):
+            return
 
-            emoji_name = payload.emoji.name
+        role_id = self.react_role(payload)
 
-            for _, data in info.items():
-                if data["reaction"] == emoji_name:
-                    role = payload.member.guild.get_role(int(data["id"]))
+        if role_id is None or payload.user_id == self.bot.user.id:
+            return
 
-                    await payload.member.add_roles(role, reason="Self-Assign")
-                    await payload.member.send(
-                        f"You have been the role {role.name} in "
-                        f"{payload.member.guild.name}"
-                    )
-        except KeyError:
-            # We want to ignore KeyErrors as this means there are no reactions set
-            pass
-        except Exception as e:
-            await payload.member.send(
-                ":anger: There was an error assigning the role. Please let the "
-                f"server admin know so this can be fixed: `{e}`"
-            )
+        self.queue_react(payload.guild_id, payload.user_id, role_id, True)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload):
-        sid = str(payload.guild_id)
-        mid = str(payload.message_id)
+        if self.bot.plugin_switches.is_disabled(payload.guild_id, self.name):
+            return
 
-        try:
-            info = self.db[sid]["reacts"]
+        role_id = self.react_role(payload)
 
-            if mid not in info:
-                return
-            else:
-                info = info[mid]
+        if role_id is None or payload.user_id == self.bot.user.id:
+            return
 
-            emoji_name = payload.emoji.name
+        self.queue_react(payload.guild_id, payload.user_id, role_id, False)
 
-            for _, data in info.items():
-                if data["reaction"] == emoji_name:
-                    guild = self.bot.get_guild(payload.guild_id)
-                    member = guild.get_member(payload.user_id)
-                    role = member.guild.get_role(int(data["id"]))
+    def queue_react(self, guild_id: int, member_id: int, role_id: int, give: bool):
+        notify = self.db.get(str(guild_id), {}).get("react_dms", True)
+        self.react_queue.put(guild_id, member_id, role_id, give, notify)
 
-                    await member.remove_roles(role, reason="Self-Assign")
-                    await member.send(
-                        f"You no longer have the role {role.name} in "
-                        f"{member.guild.name}"
-                    )
-        except KeyError:
-            pass
+    async def apply_react(self, guild_id: int, member_id: int, role_id: int, give: bool):
+        """Give or take a reaction role, returns False if there was nothing to do."""
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild is not None else None
+        role = guild.get_role(role_id) if guild is not None else None
+
+        if member is None or role is None or (role in member.roles) == give:
+            return False
+
+        try:
+            if give:
+                await member.add_roles(role, reason="Self-Assign")
+            else:
+                await member.remove_roles(role, reason="Self-Assign")
         except Exception as e:
-            await self.bot.get_channel(payload.channel_id).send(
-                ":anger: There was an error removing the role. Please let the "
-                f"server admin know so this can be fixed: `{e}`"
+            self.bot.log.warning(
+                f"[ROLES] Unable to update {role.name} for {member}: {e}"
             )
+            self.bot.queue_send(
+                member,
+                f":anger: There was an error updating the role {role.name}. Please let "
+                f"the server admin know so this can be fixed: `{e}`",
+                priority=Priority.LOW,
+            )
+            return False
+
+        return True
+
+    async def notify_react(
+        self, guild_id: int, member_id: int, given: List[int], taken: List[int]
+    ):
+        """DM a member one summary of their recent reaction role changes."""
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild is not None else None
+
+        if member is None:
+            return
+
+        lines = []
+        names = [r.name for r in map(guild.get_role, given) if r is not None]
+
+        if names:
+            lines.append(f"You have been given {', '.join(names)} in {guild.name}")
+
+        names = [r.name for r in map(guild.get_role, taken) if r is not None]
+
+        if names:
+            lines.append(f"You no longer have {', '.join(names)} in {guild.name}")
+
+        if lines:
+            self.bot.queue_send(member, "\n".join(lines), priority=Priority.LOW)
 
     @commands.group(aliases=["roles"])
     @commands.guild_only()
@@ -200,60 +565,61 @@ class Roles(commands.Cog):
 
     @role.command(name="add", aliases=["a", "get", "give", "+"])
     @commands.guild_only()
-    async def role_add(self, ctx: Context, *, role_name: str):
-        """Get a role from the assignable roles list."""
-        sid = str(ctx.guild.id)
-
-        response = None
+    async def role_add(self, ctx: Context, *, role_names: str):
+        """Get roles from the assignable roles list.
+        Separate names with commas to get several at once, e.g. `role add red, games`
+        """
+        await self.change_own_roles(ctx, role_names, True)
 
-        role_name = role_name.lower()
+    @role.command(name="remove", aliases=["r", "lose", "take", "-"])
+    @commands.guild_only()
+    async def role_remove(self, ctx: Context, *, role_names: str):
+        """Remove assignable roles from yourself.
+        Separate names with commas to remove several at once.
+        """
+        await self.change_own_roles(ctx, role_names, False)
 
+    async def change_own_roles(self, ctx: Context, role_names: str, give: bool):
+        """Add or remove any number of assignable roles in a single member edit."""
         if not await self.roles_check(ctx):
             return
 
-        if role_name not in self.db[sid]["roles"]:
-            response = await ctx.send(
-                ":anger: That is not an assignable role on this server."
-            )
-        else:
-            role = ctx.guild.get_role(int(self.db[sid]["roles"][role_name]["id"]))
+        assignable = self.db[str(ctx.guild.id)]["roles"]
+        names, unknown = split_role_names(role_names, assignable)
 
-            if role in ctx.author.roles:
-                response = await ctx.send(":anger: You already have that role.")
-            else:
-                await ctx.author.add_roles(role, reason="Self-assign")
-                response = await ctx.send(":white_check_mark: Role added!")
+        roles = [ctx.guild.get_role(int(assignable[n]["id"])) for n in names]
+        roles = [r for r in roles if r is not None]
 
-        if response is not None:
-            await self.delete_invokes(ctx.message, response)
+        current = set(ctx.author.roles)
+        changes = [r for r in roles if (r in current) != give]
+        unchanged = [r for r in roles if (r in current) == give]
 
-    @role.command(name="remove", aliases=["r", "lose", "take", "-"])
-    @commands.guild_only()
-    async def role_remove(self, ctx: Context, *, role_name: str):
-        """Remove an assignable role from yourself."""
-        sid = str(ctx.guild.id)
-
-        response = None
+        # Not atomic, so all the roles go in one request instead of one per role
+        if changes and give:
+            await ctx.author.add_roles(*changes, reason="Self-assign", atomic=False)
+        elif changes:
+            await ctx.author.remove_roles(*changes, reason="Self-remove", atomic=False)
 
-        role_name = role_name.lower()
+        lines = []
 
-        if not await self.roles_check(ctx):
-            return
-        elif role_name not in self.db[sid]["roles"]:
-            response = await ctx.send(
-                ":anger: That is not an assignable role on this server."
+        if changes:
+            done = "Added" if give else "Removed"
+            lines.append(
+                f":white_check_mark: {done}: {', '.join(r.name for r in changes)}"
             )
-        else:
-            role = ctx.guild.get_role(int(self.db[sid]["roles"][role_name]["id"]))
 
-            if role not in ctx.author.roles:
-                response = await ctx.send(":anger: You don't have that role.")
-            else:
-                await ctx.author.remove_roles(role, reason="Self-remove")
-                response = await ctx.send(":white_check_mark: Role removed!")
+        if unchanged:
+            state = "You already have" if give else "You don't have"
+            lines.append(f":anger: {state}: {', '.join(r.name for r in unchanged)}")
 
-        if response is not None:
-            await self.delete_invokes(ctx.message, response)
+        if unknown:
+            lines.append(f":anger: Not assignable on this server: {', '.join(unknown)}")
+
+        if not lines:
+            lines.append(":anger: No role names given.")
+
+        response = await ctx.send("\n".join(lines))
+        await self.delete_invokes(ctx.message, response)
 
     @role.group(name="admin")
     @commands.has_permissions(administrator=True)
@@ -282,6 +648,139 @@ class Roles(commands.Cog):
         else:
             await ctx.send(":anger: This server has no assignable roles.")
 
+    @role_admin.group(name="mass")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_mass(self, ctx: Context):
+        """Give a role to or take it from many members at once.
+        Running the command without arguments shows the progress of the current job.
+        Server administrator permission required.
+        """
+        if ctx.invoked_subcommand is not None:
+            return
+
+        job = self.mass_db.get(str(ctx.guild.id))
+
+        if job is None:
+            await ctx.send("No mass role job is running.")
+        else:
+            role = ctx.guild.get_role(job["role"])
+            await ctx.send(self.mass_progress(job, role))
+
+    @role_mass.command(name="give", aliases=["add"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_mass_give(
+        self, ctx: Context, role: Role, selector: str = "all", value: str = None
+    ):
+        """Give a role to every member picked by the selector:
+        `all`, `role <role>` (members with a role), `joined <days>` (joined within the
+        last days), `before <days>` (joined longer ago), `bots` or `humans`.
+        e.g. `role admin mass give @Member role @Verified`
+        Server administrator permission required.
+        """
+        await self.start_mass_job(ctx, role, True, selector, value)
+
+    @role_mass.command(name="take", aliases=["remove"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_mass_take(
+        self, ctx: Context, role: Role, selector: str = "all", value: str = None
+    ):
+        """Take a role from every member picked by the selector.
+        Selectors are the same as `role admin mass give`.
+        Server administrator permission required.
+        """
+        await self.start_mass_job(ctx, role, False, selector, value)
+
+    @role_mass.command(name="cancel", aliases=["stop"])
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_mass_cancel(self, ctx: Context):
+        """Cancel the current mass role job. Changes already made are kept.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        if sid not in self.mass_db:
+            await ctx.send(":anger: No mass role job is running.")
+            return
+
+        job = self.end_mass_job(sid)
+        task = self.mass_tasks.pop(sid, None)
+
+        if task is not None:
+            task.cancel()
+
+        await ctx.send(
+            f":white_check_mark: Cancelled after {job['done']}/{job['total']} members."
+        )
+
+    async def start_mass_job(
+        self, ctx: Context, role: Role, give: bool, selector: str, value: str
+    ):
+        sid = str(ctx.guild.id)
+        selector = selector.lower()
+
+        if sid in self.mass_db:
+            await ctx.send(":anger: A mass role job is already running on this server.")
+            return
+
+        if selector not in MASS_SELECTORS:
+            await ctx.send(
+                f":anger: Selector must be one of: {', '.join(MASS_SELECTORS)}"
+            )
+            return
+
+        if role >= ctx.guild.me.top_role:
+            await ctx.send(":anger: That role is above my highest role.")
+            return
+
+        filters = {}
+
+        try:
+            if selector == "role":
+                filters["has_role"] = (
+                    await commands.RoleConverter().convert(ctx, value)
+                ).id
+            elif selector in ("joined", "before"):
+                since = datetime.utcnow() - timedelta(days=int(value))
+                filters["joined_after" if selector == "joined" else "joined_before"] = (
+                    since
+                )
+            elif selector in ("bots", "humans"):
+                filters["bots"] = selector == "bots"
+        except (commands.BadArgument, TypeError, ValueError):
+            await ctx.send(f":anger: Invalid or missing value for `{selector}`.")
+            return
+
+        selected = select_members(ctx.guild.members, **filters)
+        pending = [
+            m.id for m in map(ctx.guild.get_member, selected) if (role in m.roles) != give
+        ]
+
+        if not pending:
+            await ctx.send(":anger: No members need changing.")
+            return
+
+        job = {
+            "role": role.id,
+            "give": give,
+            "total": len(pending),
+            "done": 0,
+            "failed": 0,
+            "channel": ctx.channel.id,
+            "message": None,
+        }
+        progress = await ctx.send(self.mass_progress(job, role))
+        job["message"] = progress.id
+
+        # Saved once in its own row, progress is tracked by the job's "done" count
+        self.sql_db[f"mass-{sid}"] = pending
+        self.mass_db[sid] = job
+        update_db(self.sql_db, self.mass_db, "mass")
+        self.start_mass_jobs()
+
     @role_admin.command(name="invokes")
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
@@ -424,6 +923,8 @@ class Roles(commands.Cog):
         if mid not in self.db[sid]["reacts"]:
             self.db[sid]["reacts"][mid] = {}
 
+        key = emoji_key(reaction.emoji)
+
         # Convert the reaction emoji to a string if needed
         if isinstance(reaction.emoji, (Emoji, PartialEmoji)):
             reaction = reaction.emoji.name
@@ -434,14 +935,63 @@ class Roles(commands.Cog):
             "description": description,
             "id": role_get.id,
             "reaction": reaction,
+            "emoji": key,
             "channel": message.channel.id,
             "message": message.id,
         }
 
         update_db(self.sql_db, self.db, "servers")
+        self.index_message(sid, mid)
 
         await ctx.send(f":white_check_mark: Role {role_get.name} added with {reaction}.")
 
+    @role_admin_react.command(name="sync")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_react_sync(self, ctx: Context, removals: bool = None):
+        """Show the progress of syncing reactions missed while the bot was offline.
+        Set removals to also take reaction roles from members without the reaction.
+        Leave it off if the roles are also given out some other way.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        if removals is not None:
+            self.db.setdefault(sid, {})["react_sync"] = removals
+            update_db(self.sql_db, self.db, "servers")
+
+        state = self.sql_db.get("sync")
+
+        if state is None:
+            progress = "Up to date"
+        else:
+            done = state["total"] - len(state["pending"])
+            progress = f"{done}/{state['total']} messages"
+
+        embed = Embed(title="Reaction Sync", color=0x7289DA)
+        embed.add_field(name="Progress", value=progress)
+        embed.add_field(
+            name="Removals", value=str(self.db.get(sid, {}).get("react_sync", False))
+        )
+        embed.add_field(name="Queued Changes", value=str(self.react_queue.depth))
+
+        await ctx.send(embed=embed)
+
+    @role_admin_react.command(name="dms")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    async def role_react_dms(self, ctx: Context, enabled: bool):
+        """Enable or disable DMs confirming reaction role changes.
+        Changes close together are confirmed in a single DM.
+        Server administrator permission required.
+        """
+        sid = str(ctx.guild.id)
+
+        self.db.setdefault(sid, {})["react_dms"] = enabled
+        update_db(self.sql_db, self.db, "servers")
+
+        await ctx.send(f":white_check_mark: Reaction role DMs enabled: {enabled}.")
+
     @role_admin_react.command(name="remove", aliases=["delete"])
     @commands.has_permissions(administrator=True)
     @commands.guild_only()
@@ -469,6 +1019,9 @@ class Roles(commands.Cog):
             if len(self.db[sid]["reacts"][mid]) <= 0:
                 del self.db[sid]["reacts"][mid]
 
+            update_db(self.sql_db, self.db, "servers")
+            self.index_message(sid, mid)
+
             await ctx.send(
                 f":white_check_mark: {role_get.name} removed from {message.id}"
             )
@@ -0,0 +1,109 @@
+import asyncio
+
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+from discordbot.core.audit_tools import AuditLogCache
+
+now = datetime.utcnow()
+
+
+def entry(id: int, channel: int, target: int, count: int, age: int = 0):
+    return SimpleNamespace(
+        id=id,
+        user=SimpleNamespace(id=99),
+        target=SimpleNamespace(id=target),
+        extra=SimpleNamespace(channel=SimpleNamespace(id=channel), count=count),
+        created_at=now - timedelta(seconds=age),
+    )
+
+
+def test_match_by_channel_target_and_count():
+    cache = AuditLogCache()
+    entries = [entry(1, 10, 100, 2), entry(2, 20, 100, 1)]
+    cache.remember(1, entries, now)
+
+    assert cache.match(1, entries, 10, 100).id == 1
+    assert cache.match(1, entries, 10, 100).id == 1
+    # Both deletes counted by entry 1 have been attributed
+    assert cache.match(1, entries, 10, 100) is None
+    assert cache.match(1, entries, 20, 100).id == 2
+    assert cache.match(1, entries, 20, 200) is None
+
+
+def test_old_entries_are_baseline():
+    cache = AuditLogCache()
+    old = entry(1, 10, 100, 3, age=600)
+    cache.remember(1, [old], now)
+
+    assert cache.match(1, [old], 10, 100) is None
+
+    # The same entry counting a new delete later on is attributed
+    old.extra.count = 4
+    cache.remember(1, [old], now)
+    assert cache.match(1, [old], 10, 100).id == 1
+
+
+def test_concurrent_lookups_share_request():
+    class Guild:
+        id = 1
+        calls = 0
+
+        def audit_logs(self, **kwargs):
+            Guild.calls += 1
+
+            class Iterator:
+                async def flatten(self):
+                    await asyncio.sleep(0.01)
+                    return [entry(1, 10, 100, 2)]
+
+            return Iterator()
+
+    async def run():
+        cache = AuditLogCache()
+        guild = Guild()
+        results = await asyncio.gather(
+            *(cache.find_deleter(guild, 10, 100) for _ in range(3))
+        )
+        return results, cache.stats
+
+    results, stats = asyncio.run(run())
+
+    assert Guild.calls == 1
+    assert stats["shared"] == 2
+    assert [r.id if r else None for r in results] == [99, 99, None]
+
+
+def test_count_raised_within_ttl_refetches():
+    class Guild:
+        id = 1
+        calls = 0
+
+        def __init__(self):
+            self.entry = entry(1, 10, 100, 1)
+
+        def audit_logs(self, **kwargs):
+            Guild.calls += 1
+            logged = self.entry
+
+            class Iterator:
+                async def flatten(self):
+                    return [logged]
+
+            return Iterator()
+
+    async def run():
+        cache = AuditLogCache()
+        guild = Guild()
+        first = await cache.find_deleter(guild, 10, 100)
+
+        # A second delete by the same moderator raises the entry's count in place
+        guild.entry = entry(1, 10, 100, 2)
+        second = await cache.find_deleter(guild, 10, 100)
+
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.id == 99 and second.id == 99
+    assert Guild.calls == 2
@@ -0,0 +1,50 @@
+import time
+
+from discordbot.core.block_tools import Blocklist
+
+
+def test_global_and_guild_blocks(tmp_path):
+    blocklist = Blocklist(None, str(tmp_path / "test.sql"))
+
+    blocklist.add(1)
+    blocklist.add(2, 100)
+
+    assert blocklist.is_blocked(1) and blocklist.is_blocked(1, 100)
+    assert blocklist.is_blocked(2, 100)
+    assert not blocklist.is_blocked(2) and not blocklist.is_blocked(2, 200)
+
+    assert blocklist.remove(2, 100)
+    assert not blocklist.remove(2, 100)
+    assert not blocklist.is_blocked(2, 100)
+
+    # Reloaded from the stored rows
+    blocklist.sql_db.close()
+    reloaded = Blocklist(None, str(tmp_path / "test.sql"))
+
+    assert reloaded.counts() == {"global": 1, "guild": 0}
+    reloaded.sql_db.close()
+
+
+def test_timed_blocks_expire(tmp_path):
+    blocklist = Blocklist(None, str(tmp_path / "test.sql"))
+    now = time.time()
+
+    blocklist.add(1, expires=now + 10)
+    blocklist.add(2, 100, expires=now + 20)
+    # Made permanent, so the queued expiry no longer applies
+    blocklist.add(3, expires=now + 10)
+    blocklist.add(3)
+
+    assert blocklist.expire(now) == []
+    assert blocklist.expire(now + 15) == ["1"]
+    assert blocklist.expire(now + 30) == ["2:100"]
+    assert blocklist.is_blocked(3) and len(blocklist) == 1
+    blocklist.sql_db.close()
+
+
+def test_migrate_legacy_list(tmp_path):
+    blocklist = Blocklist(None, str(tmp_path / "test.sql"))
+
+    assert blocklist.migrate(["1", "2", "2"]) == 2
+    assert blocklist.is_blocked(2)
+    blocklist.sql_db.close()
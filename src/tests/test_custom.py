@@ -0,0 +1,84 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from discordbot.plugins.custom import Custom, Variable, compile_template, render_template
+
+member = SimpleNamespace(id=42, name="Ann", discriminator="0001")
+
+
+class Pipeline:
+    def __init__(self):
+        self.triggers = {}
+
+    def subscribe(self, owner, handler, *, guild_id=None, triggers=None):
+        if triggers is not None:
+            self.triggers[guild_id] = sorted(triggers)
+
+    def unsubscribe(self, owner, guild_id=None):
+        self.triggers.pop(guild_id, None)
+
+
+def custom_with(db: dict):
+    """Just the state Custom's trigger index uses, without a bot or database."""
+    bot = SimpleNamespace(pipeline=Pipeline(), user=SimpleNamespace(id=1))
+    custom = SimpleNamespace(
+        db=db, index={}, matchers={}, name="custom", bot=bot, on_trigger=None
+    )
+
+    for sid in db:
+        Custom.rebuild(custom, sid)
+
+    return custom
+
+
+def trigger(custom, content: str):
+    """Run Custom's handler on a message, returns what it sent."""
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    channel = SimpleNamespace(send=send)
+    message = SimpleNamespace(
+        content=content, guild=SimpleNamespace(id=1), author=member, channel=channel
+    )
+    view = SimpleNamespace(message=message, first_token=content.split(" ")[0])
+
+    asyncio.run(Custom.on_trigger(custom, view))
+    return sent
+
+
+def test_compile_template():
+    segments = compile_template("Hi !{name} , you are !{tag} !{bogus} !{mention}!")
+
+    # Known fields become variables, unknown ones and mistakes stay as written
+    assert segments == ["Hi", "name", ", you are", "tag", "!{bogus} !{mention}!"]
+    assert [isinstance(s, Variable) for s in segments] == [0, 1, 0, 1, 0]
+
+    assert render_template(segments, member) == (
+        "Hi Ann , you are Ann#0001 !{bogus} !{mention}!"
+    )
+    assert render_template(compile_template("!{mention}  !{id}"), member) == "<@42>  42"
+
+
+def test_prefixed_scripts():
+    custom = custom_with(
+        {
+            "1": {
+                "prefix": "!",
+                "text": {"rules": "Be nice", "hello": "Text wins"},
+                "complex": {"!wave": "*waves at* !{mention}", "!hello": "Script"},
+            }
+        }
+    )
+
+    assert custom.bot.pipeline.triggers[1] == ["!hello", "!rules", "!wave"]
+
+    # A script starting with the text prefix still runs when no text command matches
+    assert trigger(custom, "!wave please") == ["*waves at* <@42>"]
+    # A text command with the same trigger takes priority
+    assert trigger(custom, "!hello") == ["Text wins"]
+    assert trigger(custom, "!rules") == ["Be nice"]
+    # Names must follow the prefix exactly, repeated prefix characters don't count
+    assert trigger(custom, "!!rules") == []
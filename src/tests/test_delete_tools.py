@@ -0,0 +1,56 @@
+import time
+
+from discordbot.core.delete_tools import DeleteScheduler, snowflake_timestamp, BULK_MAX
+
+# A snowflake from 2020-08-31
+old_id = 750000000000000000
+
+
+def new_id(offset: int = 0) -> int:
+    return ((int(time.time() * 1000) - 1420070400000) << 22) + offset
+
+
+def test_snowflake_timestamp():
+    assert int(snowflake_timestamp(old_id)) == 1598884334
+
+
+def test_pop_due_groups_channels(tmp_path):
+    scheduler = DeleteScheduler(None, str(tmp_path / "test.sql"))
+
+    scheduler.schedule_ids(1, 10)
+    scheduler.schedule_ids(1, 11)
+    scheduler.schedule_ids(2, 20)
+    scheduler.schedule_ids(2, 21, delay=60)
+
+    due = scheduler.pop_due()
+
+    assert due == {1: [10, 11], 2: [20]}
+    assert scheduler.depth == 1
+    scheduler.sql_db.close()
+
+
+def test_pending_survives_restart(tmp_path):
+    filename = str(tmp_path / "test.sql")
+
+    scheduler = DeleteScheduler(None, filename)
+    scheduler.schedule_ids(1, 10, delay=60)
+    scheduler.schedule_ids(1, 11)
+    scheduler.forget(1, [11])
+    scheduler.sql_db.close()
+
+    restored = DeleteScheduler(None, filename)
+
+    assert restored.depth == 1
+    assert restored.pending[0][1:] == (1, 10)
+    restored.sql_db.close()
+
+
+def test_split_bulk(tmp_path):
+    scheduler = DeleteScheduler(None, str(tmp_path / "test.sql"))
+
+    recent = [new_id(i) for i in range(BULK_MAX + 1)]
+    chunks, single = scheduler.split_bulk(recent + [old_id])
+
+    assert len(chunks) == 1 and len(chunks[0]) == BULK_MAX
+    assert sorted(single) == sorted([recent[-1], old_id])
+    scheduler.sql_db.close()
@@ -0,0 +1,36 @@
+import time
+
+from discordbot.core.edit_tools import EditRerunGuard
+
+
+def new_id(offset: int = 0) -> int:
+    return ((int(time.time() * 1000) - 1420070400000) << 22) + offset
+
+
+def test_only_changed_text_reruns():
+    guard = EditRerunGuard()
+    message_id = new_id()
+
+    # A link preview unfurling, the text is the same
+    assert not guard.should_rerun(message_id, "~xkcd 100", "~xkcd 100")
+    assert guard.should_rerun(message_id, "~xkcd 100", "~xkcd 101")
+    # The original event still has the old text, but 101 already ran
+    assert not guard.should_rerun(message_id, "~xkcd 100", "~xkcd 101 ")
+    assert guard.should_rerun(message_id, "~xkcd 101", "~xkcd 100")
+
+    assert guard.stats == {"reruns": 2, "unchanged": 2, "expired": 0}
+
+
+def test_window_and_bound():
+    guard = EditRerunGuard(window=60, max_size=2)
+    message_id = new_id()
+
+    assert not guard.should_rerun(message_id, "~a", "~b", now=time.time() + 120)
+    assert guard.stats["expired"] == 1
+
+    ids = [new_id(i + 1) for i in range(3)]
+
+    for i in ids:
+        guard.should_rerun(i, "~a", "~b")
+
+    assert list(guard.seen) == ids[1:]
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from typing import NamedTuple
+
+from discordbot.core.ghost_tools import GhostReporter, removed_mentions
+
+
+# Discord users and roles hash and compare by id
+class Mentionable(NamedTuple):
+    id: int
+    name: str
+    discriminator: str = "0001"
+
+
+def user(id: int):
+    return Mentionable(id, f"user{id}")
+
+
+def message(mentions=(), roles=(), everyone=False):
+    return SimpleNamespace(
+        mentions=list(mentions), role_mentions=list(roles), mention_everyone=everyone
+    )
+
+
+class Queue:
+    def __init__(self):
+        self.sent = []
+
+    def put(self, destination, content, priority):
+        self.sent.append(content)
+
+
+def test_removed_mentions():
+    a, b = user(1), user(2)
+    mods = Mentionable(3, "mods")
+
+    assert removed_mentions(message([a, b]), message([b, a])) is None
+
+    removed = removed_mentions(message([a, b], [mods]), message([b]))
+    assert removed.users == {a} and removed.roles == {mods}
+    assert removed.describe() == "user1#0001, @mods"
+
+    assert removed_mentions(message(everyone=True)).everyone
+
+
+def test_reports_are_aggregated_and_capped():
+    queue = Queue()
+    reporter = GhostReporter(queue, rate=1, per=60)
+    channel = SimpleNamespace(id=10, guild=SimpleNamespace(id=1))
+    author = SimpleNamespace(mention="<@5>")
+    removed = removed_mentions(message([user(1)]))
+
+    # Timers are never started outside an event loop, so flush by hand
+    reporter.timers[10] = None
+    for _ in range(3):
+        reporter.report(channel, author, "deleted", removed)
+
+    reporter.flush(10, now=0)
+    assert len(queue.sent) == 1
+    assert queue.sent[0].count("<@5> deleted a message mentioning user1#0001") == 3
+
+    reporter.timers[10] = None
+    reporter.report(channel, author, "deleted", removed)
+    reporter.flush(10, now=30)
+    assert len(queue.sent) == 1 and reporter.stats["dropped"] == 1
+
+    reporter.timers[10] = None
+    reporter.report(channel, author, "edited", removed)
+    reporter.flush(10, now=61)
+    assert queue.sent[1].endswith("...and 1 more not shown.")
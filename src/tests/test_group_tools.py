@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from discordbot.core.group_tools import GroupIndex, provision_group
+
+
+class Created:
+    def __init__(self, guild, kind: str, **options):
+        self.guild = guild
+        self.kind = kind
+        self.options = options
+
+    async def delete(self, reason=None):
+        self.guild.deleted.append(self.kind)
+
+
+class FakeGuild:
+    def __init__(self, fail: str = None):
+        self.fail = fail
+        self.default_role = object()
+        self.deleted = []
+
+    async def make(self, kind: str, **options):
+        await asyncio.sleep(0)
+
+        if kind == self.fail:
+            raise RuntimeError(f"{kind} failed")
+
+        return Created(self, kind, **options)
+
+    def create_role(self, **options):
+        return self.make("role", **options)
+
+    def create_category(self, **options):
+        return self.make("category", **options)
+
+    def create_text_channel(self, **options):
+        return self.make("text", **options)
+
+    def create_voice_channel(self, **options):
+        return self.make("voice", **options)
+
+
+class FakeMember:
+    def __init__(self):
+        self.roles = []
+
+    async def add_roles(self, role, reason=None):
+        self.roles.append(role)
+
+
+def test_provision_group():
+    guild = FakeGuild()
+    leader = FakeMember()
+
+    group = asyncio.run(provision_group(guild, leader, "Raid", "Tuesday raids"))
+
+    assert [r.kind for r in group] == ["role", "category", "text", "voice"]
+    assert group.text.options["category"] is group.category
+    assert group.text.options["name"] == "raid"
+    assert leader.roles == [group.role]
+    assert guild.deleted == []
+
+
+def test_provision_group_rolls_back():
+    guild = FakeGuild(fail="voice")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(provision_group(guild, FakeMember(), "Raid", "Tuesday raids"))
+
+    # The text channel finished before the error was raised, so it's cleaned up too
+    assert guild.deleted == ["text", "category", "role"]
+
+
+def test_group_index():
+    index = GroupIndex()
+    index.add(1, "Raid", category_id=10, role_id=20, member_ids=[100, 101])
+    index.add(1, "Chess", category_id=11, role_id=21, member_ids=[100])
+
+    assert index.by_category(10) == "Raid"
+    assert index.by_category(99) is None
+    assert index.groups_of(1, 100) == ["Chess", "Raid"]
+
+    # Joining Chess and leaving Raid, unrelated roles are ignored
+    index.update_member(101, before={20, 5}, after={21, 5})
+    assert index.groups_of(1, 101) == ["Chess"]
+
+    index.remove(1, "Chess")
+    assert index.groups_of(1, 100) == ["Raid"]
+    assert index.groups_of(1, 101) == []
+    assert index.by_category(11) is None
+
+    index.remove_member(1, 100)
+    assert index.groups_of(1, 100) == [] and index.role_members[20] == set()
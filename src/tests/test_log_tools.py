@@ -0,0 +1,49 @@
+import io
+import gzip
+import logging
+
+from discordbot.core.log_tools import LogPipeline
+
+
+def make_logger(pipeline: LogPipeline) -> logging.Logger:
+    log = logging.getLogger("test_log_tools")
+    log.propagate = False
+    log.handlers = [pipeline.handler]
+    log.setLevel(logging.INFO)
+    return log
+
+
+def test_pipeline_writes_and_rotates(tmp_path):
+    path = tmp_path / "bot.log"
+    pipeline = LogPipeline(str(path), max_bytes=100, stream=io.StringIO())
+    log = make_logger(pipeline)
+
+    pipeline.start()
+    for i in range(20):
+        log.info(f"Message number {i}")
+    pipeline.stop()
+
+    segments = list(tmp_path.glob("*_bot.log*.gz"))
+    assert pipeline.stats["written"] == 20
+    assert pipeline.stats["rotations"] == len(segments) >= 1
+
+    text = "".join(gzip.open(s, "rt").read() for s in segments) + path.read_text()
+    assert all(f"Message number {i}\n" in text for i in range(20))
+
+
+def test_pipeline_drops_when_full(tmp_path):
+    stream = io.StringIO()
+    pipeline = LogPipeline(str(tmp_path / "bot.log"), queue_size=5, stream=stream)
+    log = make_logger(pipeline)
+
+    # Not started yet, so nothing drains the queue
+    for i in range(8):
+        log.info(f"Message {i}")
+
+    assert pipeline.queued == 5
+    assert pipeline.dropped == 3
+
+    pipeline.start()
+    pipeline.stop()
+
+    assert "dropped 3 record(s)" in stream.getvalue()
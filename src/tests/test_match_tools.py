@@ -0,0 +1,75 @@
+from discordbot.core.match_tools import (
+    AhoCorasick,
+    TriggerMatcher,
+    normalize_text,
+    validate_trigger,
+)
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    matches = sorted(
+        (start, automaton.patterns[i]) for start, i in automaton.iter_matches("ushers")
+    )
+
+    assert matches == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_trigger_modes():
+    matcher = TriggerMatcher(
+        {"cat": "word", "dog": "contains", r"\bfo+\b": "regex", "": "contains"}
+    )
+
+    assert matcher.match("I have a Cat.") == "cat"
+    assert matcher.match("concatenate") is None
+    assert matcher.match("hotDOGS") == "dog"
+    assert matcher.match("well fooo then") == r"\bfo+\b"
+    # The earliest match in the message wins
+    assert matcher.match("foo and a cat") == r"\bfo+\b"
+    assert matcher.match("nothing here") is None
+
+
+def test_uncombinable_regexes_fall_back():
+    matcher = TriggerMatcher({"(?P<a>x)": "regex", "(?P<a>y)": "regex"})
+
+    assert matcher.combined is None
+    assert matcher.match("zy") == "(?P<a>y)"
+
+
+def test_regex_flags_stay_scoped():
+    flagged = r"(?i)free\s+nitro"
+    matcher = TriggerMatcher({flagged: "regex", r"\bABC\b": "regex"})
+
+    assert matcher.combined is not None
+    assert matcher.match("get FREE  Nitro here") == flagged
+    assert matcher.match("ABC") == r"\bABC\b"
+    # The other trigger's (?i) must not make this one case-insensitive
+    assert matcher.match("abc") is None
+
+    verbose = TriggerMatcher({"(?x) a b  # spaced out": "regex"})
+    assert verbose.match("xaby") is not None
+
+
+def test_validate_trigger():
+    assert validate_trigger("hello", "word") is None
+    assert validate_trigger("hello", "fuzzy") is not None
+    assert validate_trigger("(unclosed", "regex") is not None
+    assert validate_trigger(r"(?i)free\s+nitro", "regex") is None
+    assert validate_trigger(r"\b(ab|cd)+\w{2,5}", "regex") is None
+    # Too long, nested repeats, and too many repeats
+    assert validate_trigger("a" * 500, "regex") is not None
+    assert validate_trigger("(a+)+$", "regex") is not None
+    assert validate_trigger("(?:x|(y*))*z", "regex") is not None
+    assert validate_trigger("a?" * 20, "regex") is not None
+
+
+def test_normalize_text():
+    assert normalize_text("B4D W0rd") == "bad word"
+    # Fullwidth, zero-width spaces, accents and Cyrillic look-alikes
+    assert normalize_text("ｂａｄ") == "bad"
+    assert normalize_text("b\u200ba\u200dd") == "bad"
+    assert normalize_text("bàd") == "bad"
+    assert normalize_text("ВАD") == "bad"
+
+    matcher = TriggerMatcher({normalize_text("bad"): "word"})
+    assert matcher.match(normalize_text("so b\u200bà\u200bd")) == "bad"
@@ -0,0 +1,127 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from discordbot.core.message_tools import (
+    MessageCache,
+    MessageLink,
+    MessagePipeline,
+    MessageView,
+    parse_message_link,
+)
+
+
+def message(content: str, guild_id: int = 1):
+    return SimpleNamespace(
+        content=content,
+        guild=SimpleNamespace(id=guild_id) if guild_id else None,
+        raw_mentions=[5, 5, 6],
+        raw_role_mentions=[],
+    )
+
+
+def test_message_view_is_lazy():
+    view = MessageView(message("!hello there"))
+
+    assert view.first_token == "!hello"
+    assert view.command_name("!") == "hello"
+    assert view.command_name("?") is None
+    assert view.mention_ids == {5, 6}
+
+
+def test_pipeline_routing():
+    calls = []
+
+    def handler(name):
+        async def handle(view):
+            calls.append((name, view.content))
+
+        return handle
+
+    pipeline = MessagePipeline(None)
+    pipeline.subscribe("all", handler("all"))
+    pipeline.subscribe("guild", handler("guild"), guild_id=1)
+    pipeline.subscribe("trigger", handler("trigger"), guild_id=2, triggers=["hi"])
+
+    async def run():
+        for msg in ("hi", "hi there", "bye"):
+            await pipeline.dispatch(message(msg, 2))
+        await pipeline.dispatch(message("hi", 1))
+        await pipeline.dispatch(message("hi", None))
+
+    asyncio.run(run())
+
+    assert [c for c in calls if c[0] == "trigger"] == [
+        ("trigger", "hi"),
+        ("trigger", "hi there"),
+    ]
+    assert [c for c in calls if c[0] == "guild"] == [("guild", "hi")]
+    assert len([c for c in calls if c[0] == "all"]) == 5
+
+    pipeline.unsubscribe("trigger")
+    assert pipeline.triggers == {}
+
+
+def test_pipeline_skips_disabled_plugins():
+    async def handle(view):
+        pass
+
+    disabled = {}
+    pipeline = MessagePipeline(None, disabled)
+    pipeline.subscribe("custom", handle, guild_id=1)
+    pipeline.subscribe("automod", handle, guild_id=1)
+
+    assert len(pipeline.handlers_for(MessageView(message("hi")))) == 2
+
+    disabled[1] = frozenset({"custom"})
+    assert len(pipeline.handlers_for(MessageView(message("hi")))) == 1
+
+
+def test_parse_message_link():
+    link = "https://discord.com/channels/1/2/3"
+
+    assert parse_message_link(link) == MessageLink(1, 2, 3)
+    assert parse_message_link("<https://canary.discordapp.com/channels/@me/2/3>") == (
+        MessageLink(None, 2, 3)
+    )
+    assert parse_message_link("https://discord.com/channels/1/2") is None
+    assert parse_message_link("3") is None
+
+
+def test_message_cache_single_flight():
+    class Channel:
+        fetches = 0
+
+        async def fetch_message(self, message_id):
+            Channel.fetches += 1
+            await asyncio.sleep(0)
+            return SimpleNamespace(id=message_id)
+
+    async def run():
+        cache = MessageCache(ttl=30)
+        channel = Channel()
+
+        first, second = await asyncio.gather(
+            cache.fetch(channel, 10), cache.fetch(channel, 10)
+        )
+        assert first is second and Channel.fetches == 1
+
+        assert await cache.fetch(channel, 10) is first
+        assert cache.stats == {"hits": 1, "misses": 1, "shared": 1}
+
+        cache.forget(10)
+        await cache.fetch(channel, 10)
+        assert Channel.fetches == 2
+
+    asyncio.run(run())
+
+
+def test_message_cache_expiry():
+    cache = MessageCache(ttl=30, max_size=2)
+
+    for message_id in (1, 2, 3):
+        cache.put(SimpleNamespace(id=message_id), now=0)
+
+    assert cache.get(1, now=10) is None
+    assert cache.get(2, now=10).id == 2
+    assert cache.get(3, now=31) is None
@@ -0,0 +1,109 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from discordbot.core.message_tools import MessageCache
+from discordbot.plugins.messages import (
+    Messages,
+    crosspost_report,
+    may_cancel_purge,
+    may_repost,
+)
+
+
+class Channel(SimpleNamespace):
+    def __hash__(self):
+        return hash(self.id)
+
+
+class Member(SimpleNamespace):
+    def permissions_in(self, channel):
+        return SimpleNamespace(
+            manage_messages=channel.id in self.manage,
+            send_messages=channel.id in self.send,
+        )
+
+
+def channel(channel_id: int) -> Channel:
+    return Channel(id=channel_id, mention=f"<#{channel_id}>")
+
+
+def message(content: str, author=None, attachments=()):
+    return SimpleNamespace(
+        content=content,
+        jump_url="https://discord.com/channels/1/2/3",
+        author=author or SimpleNamespace(name="poster", avatar_url="https://a/b.png"),
+        attachments=list(attachments),
+    )
+
+
+def test_message_embed():
+    embed = Messages.message_embed(message("look at this https://x/cat.png"), "X-Post")
+
+    assert embed.title == "X-Post"
+    assert embed.url == "https://discord.com/channels/1/2/3"
+    assert embed.fields[0].value == "look at this https://x/cat.png"
+    assert embed.image.url == "https://x/cat.png"
+
+    attached = message("", attachments=[SimpleNamespace(url="https://x/dog.jpg")])
+    embed = Messages.message_embed(attached, "Moved")
+
+    # Empty content gets a placeholder, and the attachment is shown
+    assert embed.fields[0].value == "-"
+    assert embed.image.url == "https://x/dog.jpg"
+
+
+def test_crosspost_report():
+    targets = [channel(1), channel(2), channel(3)]
+    report = crosspost_report(targets, [None, RuntimeError("Missing Access"), None])
+
+    assert report.splitlines() == [
+        ":white_check_mark: Message crossposted to <#1>, <#3>!",
+        ":anger: Unable to crosspost to <#2>: Missing Access",
+    ]
+    assert crosspost_report(targets[:1], [RuntimeError("No")]) == (
+        ":anger: Unable to crosspost to <#1>: No"
+    )
+
+
+def test_may_repost_checks_every_target():
+    mod = Member(manage={1, 2}, send={1, 2, 3})
+    poster = Member(manage=set(), send={1, 2})
+    own = message("mine", author=poster)
+    other = message("theirs")
+
+    assert may_repost(mod, other, [channel(1), channel(2)])
+    # Managing one target doesn't cover the others
+    assert not may_repost(mod, other, [channel(1), channel(3)])
+
+    assert may_repost(poster, own, [channel(1), channel(2)])
+    assert not may_repost(poster, own, [channel(1), channel(4)])
+    assert not may_repost(poster, other, [channel(1)])
+
+
+def test_may_cancel_purge():
+    def member(member_id: int, administrator: bool = False):
+        return SimpleNamespace(
+            id=member_id,
+            guild_permissions=SimpleNamespace(administrator=administrator),
+        )
+
+    assert may_cancel_purge(member(1), 1)
+    assert may_cancel_purge(member(2, administrator=True), 1)
+    # Managing messages here isn't enough to stop a purge spanning other channels
+    assert not may_cancel_purge(member(2), 1)
+
+
+def test_edited_and_deleted_messages_are_forgotten():
+    cog = SimpleNamespace(message_cache=MessageCache())
+
+    for message_id in (1, 2, 3, 4):
+        cog.message_cache.put(SimpleNamespace(id=message_id))
+
+    asyncio.run(Messages.on_raw_message_edit(cog, SimpleNamespace(message_id=1)))
+    asyncio.run(Messages.on_raw_message_delete(cog, SimpleNamespace(message_id=2)))
+    asyncio.run(
+        Messages.on_raw_bulk_message_delete(cog, SimpleNamespace(message_ids={3}))
+    )
+
+    assert list(cog.message_cache.entries) == [4]
@@ -0,0 +1,36 @@
+from discordbot.core.plugin_tools import PluginSwitches
+
+
+def test_enable_and_disable(tmp_path):
+    switches = PluginSwitches(str(tmp_path / "test.sql"))
+
+    switches.set_enabled(1, "roles", False)
+    switches.set_enabled(1, "custom", False)
+
+    assert switches.is_disabled(1, "roles")
+    assert not switches.is_disabled(2, "roles")
+
+    switches.set_enabled(1, "roles", True)
+    switches.set_enabled(1, "custom", True)
+
+    # Servers using every plugin have no entry at all
+    assert switches.disabled == {}
+    assert "1" not in switches.sql_db
+    switches.sql_db.close()
+
+
+def test_migrate_servers_toggles(tmp_path):
+    servers = {
+        "1": {"log_edits": False, "roles": False, "custom": True, "log_channel": "5"},
+        "2": {},
+    }
+    switches = PluginSwitches(str(tmp_path / "test.sql"))
+
+    assert switches.migrate(servers) == 2
+    assert servers == {"1": {"log_edits": False, "log_channel": "5"}, "2": {}}
+    assert switches.disabled == {1: frozenset({"roles"})}
+    switches.sql_db.close()
+
+    reloaded = PluginSwitches(str(tmp_path / "test.sql"))
+    assert reloaded.is_disabled(1, "roles")
+    reloaded.sql_db.close()
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from discordbot.core.policy_tools import PolicyCache
+
+
+class Guild:
+    def __init__(self, id: int):
+        self.id = id
+        self.channels = {10: "log channel"}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+def test_policy_snapshot_and_invalidation():
+    bot = SimpleNamespace(servers={"1": {"log_edits": True, "log_channel": "10"}})
+    cache = PolicyCache(bot)
+    guild = Guild(1)
+
+    policy = cache.get(guild)
+
+    assert policy.log_edits and not policy.log_deletes
+    assert policy.log_channel == "log channel"
+    assert cache.get(guild) is policy
+
+    bot.servers["1"]["log_deletes"] = True
+    # Unchanged until the guild's config is invalidated
+    assert not cache.get(guild).log_deletes
+
+    cache.invalidate("1")
+    updated = cache.get(guild)
+
+    assert updated.log_deletes
+    assert updated.version == policy.version + 1
+
+
+def test_policy_providers():
+    bot = SimpleNamespace(servers={})
+    cache = PolicyCache(bot)
+    guild = Guild(2)
+
+    assert cache.get(guild).mod_log is False
+
+    cache.add_provider("admin", lambda g: {"mod_log": True})
+    assert cache.get(guild).mod_log is True
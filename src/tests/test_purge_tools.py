@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from types import SimpleNamespace
+
+from discordbot.core.purge_tools import PurgeJob
+
+# A snowflake from 2020-08-31
+old_id = 750000000000000000
+
+
+def new_id(offset: int = 0) -> int:
+    return ((int(time.time() * 1000) - 1420070400000) << 22) + offset
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, messages: list):
+        self.id = channel_id
+        self.messages = messages
+
+    async def history(self, limit: int, before=None):
+        for message in self.messages[:limit]:
+            yield message
+
+
+class FakeHTTP:
+    def __init__(self, error: Exception = None):
+        self.bulk = []
+        self.single = []
+        self.error = error
+
+    async def delete_messages(self, channel_id, message_ids):
+        self.bulk.append((channel_id, list(message_ids)))
+
+    async def delete_message(self, channel_id, message_id):
+        if self.error is not None:
+            raise self.error
+
+        self.single.append((channel_id, message_id))
+
+
+def message(message_id: int, author_id: int):
+    return SimpleNamespace(id=message_id, author=SimpleNamespace(id=author_id))
+
+
+def test_purge_splits_bulk_and_single():
+    recent = [message(new_id(i), 1 + i % 2) for i in range(250)]
+    old = [message(old_id + i, 1) for i in range(3)]
+    lone = message(new_id(), 1)
+    channels = [FakeChannel(1, recent + old), FakeChannel(2, [lone])]
+
+    http = FakeHTTP()
+    job = PurgeJob(http, channels, limit=1000, authors={1}, single_delay=0)
+    stats = asyncio.run(job.run())
+
+    # 125 recent matches in channel 1 make one full chunk and one partial one
+    assert [len(ids) for _, ids in http.bulk] == [100, 25]
+    # The old messages and channel 2's lone match can't be bulk deleted
+    assert sorted(http.single) == sorted([(1, m.id) for m in old] + [(2, lone.id)])
+    assert stats == {"scanned": 254, "deleted": 129, "failed": 0, "channels": 2}
+
+
+def test_purge_limit_and_cancel():
+    channel = FakeChannel(1, [message(new_id(i), 1) for i in range(10)])
+
+    http = FakeHTTP()
+    job = PurgeJob(http, [channel], limit=4, single_delay=0)
+    asyncio.run(job.run())
+
+    assert http.bulk == [(1, [m.id for m in channel.messages[:4]])]
+
+    http = FakeHTTP()
+    job = PurgeJob(http, [channel], limit=10, single_delay=0)
+    job.cancel()
+    stats = asyncio.run(job.run())
+
+    assert http.bulk == [] and stats["deleted"] == 0
+
+
+def test_purge_survives_transport_errors():
+    channel = FakeChannel(1, [message(old_id + i, 1) for i in range(3)])
+
+    http = FakeHTTP(error=asyncio.TimeoutError())
+    job = PurgeJob(http, [channel], limit=10, single_delay=0)
+    stats = asyncio.run(asyncio.wait_for(job.run(), timeout=1))
+
+    # Every single delete failed, but the purge still finished
+    assert stats["failed"] == 3 and stats["deleted"] == 0
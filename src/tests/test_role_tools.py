@@ -0,0 +1,81 @@
+import asyncio
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from discordbot.core.role_tools import (
+    RoleChangeQueue,
+    batched,
+    reaction_diff,
+    select_members,
+    split_role_names,
+)
+
+
+def test_reaction_diff():
+    reactors = {1, 2, 3}
+    holders = {3, 4}
+
+    assert reaction_diff(reactors, holders) == ([1, 2], [])
+    assert reaction_diff(reactors, holders, removals=True) == ([1, 2], [4])
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_role_queue_cancels_reversals():
+    applied = []
+    notified = []
+
+    async def apply(guild_id, member_id, role_id, give):
+        applied.append((member_id, role_id, give))
+        return True
+
+    async def notify(guild_id, member_id, given, taken):
+        notified.append((member_id, given, taken))
+
+    async def run():
+        queue = RoleChangeQueue(apply, notify, interval=0, digest=0.01)
+
+        queue.put(1, 10, 100, True, notify=True)
+        queue.put(1, 11, 100, True, notify=True)
+        # Un-reacted before the worker got to it
+        queue.put(1, 11, 100, False, notify=True)
+        queue.put(1, 10, 101, True, notify=False)
+
+        await asyncio.sleep(0.05)
+        return queue
+
+    queue = asyncio.run(run())
+
+    assert applied == [(10, 100, True), (10, 101, True)]
+    assert notified == [(10, [100], [])]
+    assert queue.stats["cancelled"] == 1 and queue.depth == 0
+
+
+def test_split_role_names():
+    assignable = {"red": {}, "games": {}, "rock, paper": {}}
+
+    assert split_role_names("Red, games ,red, blue", assignable) == (
+        ["red", "games"],
+        ["blue"],
+    )
+    assert split_role_names("Rock, Paper", assignable) == (["rock, paper"], [])
+
+
+def test_select_members():
+    mods = SimpleNamespace(id=5)
+    now = datetime(2021, 1, 10)
+    members = [
+        SimpleNamespace(id=1, bot=False, roles=[mods], joined_at=datetime(2021, 1, 9)),
+        SimpleNamespace(id=2, bot=False, roles=[], joined_at=datetime(2020, 6, 1)),
+        SimpleNamespace(id=3, bot=True, roles=[mods], joined_at=None),
+    ]
+
+    assert select_members(members) == [1, 2, 3]
+    assert select_members(members, has_role=5, bots=False) == [1]
+    assert select_members(members, joined_after=now - timedelta(days=7)) == [1]
+    assert select_members(members, joined_before=now - timedelta(days=7)) == [2]
+    assert select_members(members, bots=True) == [3]
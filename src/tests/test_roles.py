@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from discord import PartialEmoji
+
+from discordbot.plugins.roles import Roles, emoji_key
+
+
+def roles_with(db: dict):
+    """Just the state Roles' reaction index methods use, without a bot or database."""
+    roles = SimpleNamespace(db=db, sql_db={}, react_index={}, react_keys={})
+    roles.index_message = lambda sid, mid: Roles.index_message(roles, sid, mid)
+
+    for sid, data in db.items():
+        for mid in data.get("reacts", {}):
+            roles.index_message(sid, mid)
+
+    return roles
+
+
+def reaction(message_id: int, emoji: PartialEmoji, guild_id: int = 1):
+    return SimpleNamespace(message_id=message_id, guild_id=guild_id, emoji=emoji)
+
+
+def test_emoji_key():
+    assert emoji_key("🙂") == "🙂"
+    assert emoji_key(PartialEmoji(name="🙂")) == "🙂"
+    # Custom emoji are keyed by id, so renaming them doesn't break anything
+    assert emoji_key(PartialEmoji(name="blob", id=123)) == "123"
+
+
+def test_index_message():
+    roles = roles_with(
+        {
+            "1": {
+                "reacts": {
+                    "50": {
+                        "a": {"id": "7", "reaction": "🙂", "emoji": "🙂"},
+                        "b": {"id": "8", "reaction": "blob", "emoji": "123"},
+                    }
+                }
+            }
+        }
+    )
+
+    assert roles.react_index == {(50, "🙂"): 7, (50, "123"): 8}
+    assert sorted(roles.react_keys[50]) == ["123", "🙂"]
+
+    assert Roles.react_role(roles, reaction(50, PartialEmoji(name="blob", id=123))) == 8
+    assert Roles.react_role(roles, reaction(50, PartialEmoji(name="🙃"))) is None
+    assert Roles.react_role(roles, reaction(51, PartialEmoji(name="🙂"))) is None
+
+    # Removing an entry drops its keys on reindex
+    del roles.db["1"]["reacts"]["50"]["b"]
+    roles.index_message("1", "50")
+
+    assert roles.react_index == {(50, "🙂"): 7}
+    assert roles.react_keys[50] == ["🙂"]
+
+
+def test_legacy_entry_upgraded_to_emoji_id():
+    # Saved before emoji ids were stored, only the custom emoji's name is known
+    roles = roles_with({"1": {"reacts": {"50": {"a": {"id": "7", "reaction": "blob"}}}}})
+
+    assert roles.react_index == {(50, "blob"): 7}
+
+    assert Roles.react_role(roles, reaction(50, PartialEmoji(name="blob", id=123))) == 7
+
+    entry = roles.db["1"]["reacts"]["50"]["a"]
+    assert entry["emoji"] == "123"
+    assert roles.sql_db["servers"] is roles.db
+    assert roles.react_index == {(50, "123"): 7}
+
+    # A renamed emoji still matches by id after the upgrade
+    renamed = PartialEmoji(name="blobby", id=123)
+    assert Roles.react_role(roles, reaction(50, renamed)) == 7
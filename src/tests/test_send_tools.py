@@ -0,0 +1,117 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from discord import Embed
+
+from discordbot.core.send_tools import (
+    SendQueue,
+    EmbedBatcher,
+    Priority,
+    batch_embeds,
+    clamp_embed,
+    FIELD_VALUE_LIMIT,
+    EMBED_TOTAL_LIMIT,
+)
+
+
+class Destination:
+    def __init__(self, id: int, sent: list):
+        self.id = id
+        self.sent = sent
+
+    async def send(self, content=None, *, embed=None):
+        self.sent.append((self.id, content))
+        return content
+
+
+def test_priority_order_and_coalescing():
+    async def run():
+        sent = []
+        queue = SendQueue(None, concurrency=1)
+        a = Destination(1, sent)
+        b = Destination(2, sent)
+
+        queue.put(a, "low", priority=Priority.LOW)
+        queue.put(b, "one")
+        queue.put(b, "two")
+        high = queue.put(a, "high", priority=Priority.HIGH)
+
+        queue.start()
+        assert await high == "high"
+        await asyncio.sleep(0.01)
+        queue.task.cancel()
+
+        return sent, queue.stats
+
+    sent, stats = asyncio.run(run())
+
+    assert sent == [(1, "high"), (2, "one\ntwo"), (1, "low")]
+    assert stats["coalesced"] == 1
+
+
+def test_full_queue_drops_low_priority():
+    async def run():
+        queue = SendQueue(None, max_size=1)
+        dest = Destination(1, [])
+
+        low = queue.put(dest, "low", priority=Priority.LOW)
+        queue.put(Destination(2, []), "normal")
+        extra = queue.put(Destination(3, []), "normal")
+
+        return await low, await extra, queue.stats["dropped"], queue.depth
+
+    assert asyncio.run(run()) == (None, None, 2, 1)
+
+
+def test_flush_all_and_drain():
+    async def run():
+        sent = []
+
+        async def request(route, json):
+            sent.append(len(json["embeds"]))
+
+        queue = SendQueue(SimpleNamespace(http=SimpleNamespace(request=request)))
+        batcher = EmbedBatcher(queue, window=60)
+        channel = Destination(1, [])
+        queue.start()
+
+        for i in range(3):
+            batcher.add(channel, Embed(title=str(i)))
+
+        # Still inside the batch window, nothing is queued yet
+        assert queue.depth == 0
+        batcher.flush_all()
+        drained = await queue.drain(timeout=1)
+        queue.task.cancel()
+
+        return drained, sent, batcher.timers
+
+    drained, sent, timers = asyncio.run(run())
+
+    assert drained and sent == [3] and timers == {}
+
+
+def test_batch_embeds_limits():
+    small = [Embed(title=str(i)) for i in range(25)]
+    assert [len(b) for b in batch_embeds(small)] == [10, 10, 5]
+
+    large = []
+    for _ in range(4):
+        embed = Embed(title="Large")
+        for _ in range(3):
+            embed.add_field(name="Field", value="x" * 1000)
+        large.append(embed)
+
+    # Each embed is just over 3000 characters, so only one fits per message
+    assert [len(b) for b in batch_embeds(large)] == [1, 1, 1, 1]
+
+
+def test_clamp_embed():
+    embed = Embed(title="Clamp")
+    embed.add_field(name="Value", value="x" * 3000)
+
+    clamp_embed(embed)
+
+    assert len(embed.fields[0].value) == FIELD_VALUE_LIMIT
+    assert len(embed) <= EMBED_TOTAL_LIMIT
@@ -0,0 +1,67 @@
+from discordbot.core.spam_tools import SpamDetector, SpamRule
+
+rule = SpamRule(messages=3, messages_per=5.0, mentions=5, duplicates=2)
+
+
+def check(detector: SpamDetector, now: float, content: str, mentions: int = 0, user=1):
+    return detector.check((1, user), rule, now, 10, int(now * 10), mentions, content)
+
+
+def test_message_rate():
+    detector = SpamDetector()
+
+    assert check(detector, 0.0, "a") is None
+    assert check(detector, 1.0, "b") is None
+    # Three messages, but spread over more than the window
+    assert check(detector, 6.0, "c") is None
+    assert check(detector, 6.5, "d") is None
+    assert check(detector, 7.0, "e") == "3 messages in 5s"
+    assert detector.windows[(1, 1)].recent() == [(10, 60), (10, 65), (10, 70)]
+
+
+def test_mentions_and_duplicates():
+    detector = SpamDetector()
+
+    assert check(detector, 0.0, "hi @a @b", mentions=2) is None
+    assert check(detector, 10.0, "hi @c @d @e", mentions=3) == "5 mentions in 15s"
+
+    assert check(detector, 0.0, "Buy now", user=2) is None
+    assert check(detector, 20.0, "buy NOW ", user=2) == "2 duplicate messages in 30s"
+
+
+def test_empty_messages_are_not_duplicates():
+    detector = SpamDetector()
+
+    # Attachments, stickers and embeds one after another have no text to compare
+    assert check(detector, 0.0, "") is None
+    assert check(detector, 10.0, "  ") is None
+    assert check(detector, 20.0, "") is None
+    assert len(detector.windows[(1, 1)].duplicates) == 0
+
+
+def test_interleaved_duplicates():
+    detector = SpamDetector()
+
+    assert check(detector, 0.0, "A", user=2) is None
+    assert check(detector, 6.0, "B", user=2) is None
+    assert check(detector, 12.0, "A", user=2) == "2 duplicate messages in 30s"
+
+    # Copies that left the window are dropped from the buffer
+    assert check(detector, 50.0, "B", user=2) is None
+    assert len(detector.windows[(1, 2)].duplicates) == 1
+
+
+def test_idle_eviction():
+    detector = SpamDetector(idle=10.0, max_users=2)
+
+    for user in range(3):
+        check(detector, 0.0, "hello", user=user)
+
+    # Over the cap, so the least recently active user goes
+    assert len(detector) == 2 and (1, 0) not in detector.windows
+
+    check(detector, 20.0, "hello", user=5)
+
+    assert list(detector.windows) == [(1, 5)]
+    assert detector.stats["evicted"] == 3
+    assert detector.memory() > 0
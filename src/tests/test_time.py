@@ -1,4 +1,9 @@
-from discordbot.core.time_tools import pretty_datetime, pretty_timedelta, time_parser
+from discordbot.core.time_tools import (
+    length_error,
+    pretty_datetime,
+    pretty_timedelta,
+    time_parser,
+)
 from datetime import datetime
 
 sample = datetime.utcfromtimestamp(1501959629)
@@ -30,3 +35,10 @@ def test_time_parser():
     result = pretty_datetime(case)
 
     assert result == "2017-8-5 20:0"
+
+def test_length_error():
+    assert length_error(10, "minutes") is None
+    assert length_error(1, "day") is None
+    assert length_error(0, "days") is not None
+    assert length_error(5, "fortnights") is not None
+    assert length_error(10 ** 12, "years") is not None